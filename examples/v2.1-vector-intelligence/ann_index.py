@@ -0,0 +1,376 @@
+"""
+ann_index.py
+Local in-process approximate-nearest-neighbour mirror of the SemanticVector index
+
+Keeps SemanticVector.embedding values in a float32 memory-mapped matrix on
+local disk and answers top-k cosine queries in process, without a network hop
+to Neo4j. Search is an IVF (inverted file) index: k-means centroids partition
+the rows and each query scans only the n_probe closest partitions. Small
+indexes (fewer than `ivf_threshold` rows) are scanned exhaustively.
+
+- Incremental sync: SemanticVector.text_hash (written by the incremental
+  vectorizer) decides which rows changed; only those embeddings are fetched.
+  Changed and deleted rows are tombstoned, new rows are appended to the
+  memory-mapped file, and the file is compacted once tombstones pile up.
+- Same metadata as Neo4jVector: concept_id, label, domain, source
+- Same score scale as the Neo4j cosine index: (1 + cosine) / 2
+- Measurable recall: recall_at_k() compares IVF results with brute-force cosine
+
+USAGE:
+    index = LocalVectorIndex(".ann_index")
+    index.sync_from_neo4j(driver)
+    hits = index.query(embeddings.embed_query("vacuum pump equipment failure"), k=3)
+    print(index.recall_at_k(sample_queries, k=10))
+"""
+
+import json
+import os
+
+import numpy as np
+
+DEFAULT_INDEX_DIR = ".ann_index"
+METADATA_FIELDS = ("concept_id", "label", "domain", "source", "text_hash")
+
+
+def normalize_rows(matrix):
+    """L2-normalize rows so dot products are cosine similarities"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def kmeans(vectors, n_clusters, iterations=10, seed=0):
+    """Spherical k-means returning unit-norm centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(n_clusters):
+            members = vectors[assignments == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+            else:
+                # Re-seed empty clusters from random rows
+                centroids[c] = vectors[rng.integers(len(vectors))]
+        centroids = normalize_rows(centroids)
+    return centroids
+
+
+class LocalVectorIndex:
+    """IVF index over a float32 memory-mapped embedding matrix"""
+
+    def __init__(self, directory=DEFAULT_INDEX_DIR, n_probe=8, ivf_threshold=20000,
+                 compact_ratio=0.25):
+        self.directory = directory
+        self.n_probe = n_probe
+        self.ivf_threshold = ivf_threshold
+        self.compact_ratio = compact_ratio
+        os.makedirs(directory, exist_ok=True)
+
+        self.dimensions = None
+        self.metadata = []
+        self.alive = np.zeros(0, dtype=bool)
+        self.row_of = {}
+        self.matrix = None
+        self.centroids = None
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self.trained_rows = 0
+        self._lists = None
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _load(self):
+        if not os.path.exists(self._path("index.json")):
+            # Vectors without index state are unusable leftovers of an interrupted build
+            if os.path.exists(self._path("vectors.f32")):
+                os.remove(self._path("vectors.f32"))
+            return
+        with open(self._path("index.json")) as f:
+            state = json.load(f)
+        self.dimensions = state["dimensions"]
+        self.metadata = state["metadata"]
+        self.trained_rows = state.get("trained_rows", 0)
+        self.alive = np.load(self._path("alive.npy"))
+        self.assignments = np.load(self._path("assignments.npy"))
+        if os.path.exists(self._path("centroids.npy")):
+            self.centroids = np.load(self._path("centroids.npy"))
+        self.row_of = {m["concept_id"]: i for i, m in enumerate(self.metadata) if self.alive[i]}
+        self._truncate_vectors()
+        self._open_matrix()
+
+    def _truncate_vectors(self):
+        """Drop rows appended after the last save (an interrupted sync) so rows match metadata"""
+        path = self._path("vectors.f32")
+        expected = len(self.metadata) * (self.dimensions or 0) * np.dtype(np.float32).itemsize
+        actual = os.path.getsize(path) if os.path.exists(path) else 0
+        if actual < expected:
+            raise ValueError(f"{path} holds {actual} bytes but index.json describes {expected}; "
+                             f"delete {self.directory} and sync again")
+        if actual > expected:
+            with open(path, "r+b") as f:
+                f.truncate(expected)
+
+    def _save(self):
+        with open(self._path("index.json"), "w") as f:
+            json.dump({
+                "dimensions": self.dimensions,
+                "metadata": self.metadata,
+                "trained_rows": self.trained_rows,
+            }, f)
+        np.save(self._path("alive.npy"), self.alive)
+        np.save(self._path("assignments.npy"), self.assignments)
+        if self.centroids is not None:
+            np.save(self._path("centroids.npy"), self.centroids)
+        elif os.path.exists(self._path("centroids.npy")):
+            os.remove(self._path("centroids.npy"))
+
+    def _open_matrix(self):
+        rows = len(self.metadata)
+        if rows == 0 or self.dimensions is None:
+            self.matrix = np.zeros((0, self.dimensions or 0), dtype=np.float32)
+            return
+        self.matrix = np.memmap(self._path("vectors.f32"), dtype=np.float32, mode="r",
+                                shape=(rows, self.dimensions))
+
+    # ------------------------------------------------------------------
+    # Mutation
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        return len(self.row_of)
+
+    def upsert(self, rows):
+        """Append or replace rows: dicts with metadata fields plus `embedding`"""
+        rows = list(rows)
+        if not rows:
+            return
+        # A concept_id repeated within one batch keeps only its last row
+        rows = list({row["concept_id"]: row for row in rows}.values())
+        missing = [row["concept_id"] for row in rows if row.get("embedding") is None]
+        if missing:
+            raise ValueError(f"{len(missing)} rows have no embedding (e.g. {missing[0]})")
+        vectors = normalize_rows([row["embedding"] for row in rows])
+        if self.dimensions is None:
+            self.dimensions = vectors.shape[1]
+        elif vectors.shape[1] != self.dimensions:
+            raise ValueError(f"Expected {self.dimensions}-dimension embeddings, got {vectors.shape[1]}")
+
+        for row in rows:
+            old = self.row_of.pop(row["concept_id"], None)
+            if old is not None:
+                self.alive[old] = False
+
+        start = len(self.metadata)
+        with open(self._path("vectors.f32"), "ab") as f:
+            f.write(vectors.tobytes())
+        for i, row in enumerate(rows):
+            self.metadata.append({field: row.get(field) for field in METADATA_FIELDS})
+            self.row_of[row["concept_id"]] = start + i
+        self.alive = np.concatenate([self.alive, np.ones(len(rows), dtype=bool)])
+
+        new_assignments = np.zeros(len(rows), dtype=np.int32)
+        if self.centroids is not None:
+            new_assignments = np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+        self.assignments = np.concatenate([self.assignments, new_assignments])
+        self._open_matrix()
+        self._lists = None
+
+    def delete(self, concept_ids):
+        """Tombstone rows by concept_id"""
+        for concept_id in concept_ids:
+            row = self.row_of.pop(concept_id, None)
+            if row is not None:
+                self.alive[row] = False
+        self._lists = None
+
+    def compact(self):
+        """Rewrite the memory-mapped file without tombstoned rows"""
+        keep = np.flatnonzero(self.alive)
+        vectors = np.asarray(self.matrix[keep]) if len(keep) else np.zeros((0, self.dimensions or 0), np.float32)
+        self.matrix = None
+        tmp = self._path("vectors.f32.tmp")
+        vectors.tofile(tmp)
+        os.replace(tmp, self._path("vectors.f32"))
+        self.metadata = [self.metadata[i] for i in keep]
+        self.assignments = self.assignments[keep]
+        self.alive = np.ones(len(keep), dtype=bool)
+        self.row_of = {m["concept_id"]: i for i, m in enumerate(self.metadata)}
+        self._open_matrix()
+        self._lists = None
+
+    def train(self, n_lists=None, sample_size=50000, seed=0):
+        """Fit IVF centroids on (a sample of) live rows and reassign every row"""
+        live = np.flatnonzero(self.alive)
+        if len(live) < self.ivf_threshold:
+            self.centroids = None
+            self.assignments = np.zeros(len(self.metadata), dtype=np.int32)
+            self.trained_rows = len(live)
+            self._lists = None
+            return
+        n_lists = n_lists or max(1, int(np.sqrt(len(live))))
+        rng = np.random.default_rng(seed)
+        sample = live if len(live) <= sample_size else rng.choice(live, sample_size, replace=False)
+        self.centroids = kmeans(np.asarray(self.matrix[np.sort(sample)]), n_lists, seed=seed)
+
+        assignments = np.empty(len(self.metadata), dtype=np.int32)
+        for start in range(0, len(self.metadata), 65536):
+            block = np.asarray(self.matrix[start:start + 65536])
+            assignments[start:start + len(block)] = np.argmax(block @ self.centroids.T, axis=1)
+        self.assignments = assignments
+        self.trained_rows = len(live)
+        self._lists = None
+
+    def _maintain(self):
+        """Compact after heavy churn and retrain once the index has doubled"""
+        if len(self.metadata) and (~self.alive).mean() > self.compact_ratio:
+            self.compact()
+        if len(self) >= self.ivf_threshold and len(self) >= 2 * max(self.trained_rows, 1):
+            self.train()
+        elif len(self) < self.ivf_threshold and self.centroids is not None:
+            self.train()
+
+    def sync_from_neo4j(self, driver, database=None, batch_size=1000):
+        """Mirror SemanticVector nodes, fetching embeddings only for new or changed rows"""
+        with driver.session(database=database) as session:
+            remote = {
+                record["concept_id"]: record["text_hash"]
+                for record in session.run(
+                    "MATCH (sv:SemanticVector) "
+                    "RETURN sv.concept_id AS concept_id, coalesce(sv.text_hash, sv.id) AS text_hash"
+                )
+            }
+
+            local = {cid: self.metadata[row]["text_hash"] for cid, row in self.row_of.items()}
+            changed = [cid for cid, h in remote.items() if h is None or local.get(cid) != h]
+            removed = [cid for cid in local if cid not in remote]
+            missing = 0
+
+            for start in range(0, len(changed), batch_size):
+                records = session.run(
+                    """
+                    UNWIND $concept_ids AS concept_id
+                    MATCH (sv:SemanticVector {concept_id: concept_id})
+                    RETURN sv.concept_id AS concept_id, sv.label AS label, sv.domain AS domain,
+                           sv.source AS source, coalesce(sv.text_hash, sv.id) AS text_hash,
+                           sv.embedding AS embedding
+                    """,
+                    concept_ids=changed[start:start + batch_size],
+                )
+                rows = [dict(record) for record in records]
+                # Nodes without a float list (not vectorized yet) are reported, not mirrored
+                missing += sum(row["embedding"] is None for row in rows)
+                self.upsert(row for row in rows if row["embedding"] is not None)
+
+        self.delete(removed)
+        self._maintain()
+        self._save()
+        return {"upserted": len(changed) - missing, "deleted": len(removed),
+                "missing_embeddings": missing, "total": len(self)}
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _inverted_lists(self):
+        if self._lists is None:
+            order = np.argsort(self.assignments, kind="stable")
+            bounds = np.searchsorted(self.assignments[order], np.arange(len(self.centroids) + 1))
+            self._lists = [order[bounds[c]:bounds[c + 1]] for c in range(len(self.centroids))]
+        return self._lists
+
+    def _top_k(self, rows, query, k):
+        rows = rows[self.alive[rows]]
+        if len(rows) == 0:
+            return []
+        scores = np.asarray(self.matrix[rows]) @ query
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {**{f: self.metadata[rows[i]][f] for f in METADATA_FIELDS if f != "text_hash"},
+             "score": float((1.0 + scores[i]) / 2.0)}
+            for i in top
+        ]
+
+    def brute_force(self, embedding, k=3):
+        """Exact top-k by cosine over every live row"""
+        query = normalize_rows(embedding)
+        return self._top_k(np.arange(len(self.metadata)), query, k)
+
+    def query(self, embedding, k=3, n_probe=None):
+        """Approximate top-k: scan only the n_probe partitions nearest the query"""
+        if self.centroids is None:
+            return self.brute_force(embedding, k)
+        query = normalize_rows(embedding)
+        n_probe = min(n_probe or self.n_probe, len(self.centroids))
+        nearest = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+        lists = self._inverted_lists()
+        rows = np.concatenate([lists[c] for c in nearest])
+        return self._top_k(rows, query, k)
+
+    def search(self, text, embeddings, k=3):
+        """Embed `text` with a LangChain Embeddings object and query the local index"""
+        return self.query(embeddings.embed_query(text), k)
+
+    def recall_at_k(self, query_embeddings, k=10, n_probe=None):
+        """Mean fraction of brute-force top-k concept_ids also returned by query()"""
+        recalls = []
+        for embedding in query_embeddings:
+            exact = {hit["concept_id"] for hit in self.brute_force(embedding, k)}
+            if exact:
+                approx = {hit["concept_id"] for hit in self.query(embedding, k, n_probe)}
+                recalls.append(len(exact & approx) / len(exact))
+        return float(np.mean(recalls)) if recalls else 1.0
+
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from dotenv import load_dotenv
+    from neo4j import GraphDatabase
+
+    load_dotenv()
+
+    password = os.getenv("NEO4J_PASSWORD")
+    if not password:
+        print("❌ ERROR: NEO4J_PASSWORD is not set - create a .env file first")
+        sys.exit(1)
+
+    driver = GraphDatabase.driver(
+        os.getenv("NEO4J_URI", "neo4j://localhost:7687"),
+        auth=(os.getenv("NEO4J_USERNAME", "neo4j"), password),
+    )
+    try:
+        index = LocalVectorIndex(os.getenv("ANN_INDEX_DIR", DEFAULT_INDEX_DIR))
+        started = time.perf_counter()
+        stats = index.sync_from_neo4j(driver)
+        print(f"🔄 Synced local ANN index in {time.perf_counter() - started:.2f}s")
+        print(f"   Upserted: {stats['upserted']}  Deleted: {stats['deleted']}  Total: {stats['total']}")
+        if stats["missing_embeddings"]:
+            print(f"   ⚠️  {stats['missing_embeddings']} SemanticVector nodes have no sv.embedding - "
+                  f"run semantic-vectorization.py --incremental (cached embeddings are reused)")
+
+        if len(index):
+            live = np.flatnonzero(index.alive)[:100]
+            queries = np.asarray(index.matrix[live])
+            recall = index.recall_at_k(queries, k=min(10, len(index)))
+            print(f"🎯 Recall@10 vs brute-force cosine: {recall:.3f}")
+            started = time.perf_counter()
+            for q in queries:
+                index.query(q, k=3)
+            print(f"⚡ Mean local query latency: "
+                  f"{(time.perf_counter() - started) / len(queries) * 1000:.3f}ms")
+    finally:
+        driver.close()
@@ -0,0 +1,202 @@
+"""
+bulk_graph_writer.py
+UNWIND-based bulk loader for the predictive maintenance knowledge graph
+
+Writes lists of fabs, areas, tools, chambers, pumps, Weibull models and RUL
+assessments with parameterized UNWIND batches: one managed write transaction
+per chunk, counters taken from the result summary (no records are pulled back).
+MERGE keys follow the unique constraints in docs/implementation/neo4j-schema.cypher,
+so re-running a load updates nodes in place instead of duplicating them.
+
+Each entity is a dict of its node properties (as named in the graph) plus the
+key of its parent in the equipment hierarchy or owning pump:
+
+    writer = BulkGraphWriter(driver, chunk_size=1000)
+    writer.ensure_constraints()
+    writer.load(
+        fabs=[{"fabId": "FAB2", "fabLocation": "Dresden, Germany"}],
+        areas=[{"areaId": "CVD_DEPOSITION", "fabId": "FAB2"}],
+        tools=[{"toolId": "PECVD_05", "areaId": "CVD_DEPOSITION"}],
+        chambers=[{"chamberId": "CH2", "toolId": "PECVD_05"}],
+        pumps=[{"pumpIdentifier": "P002", "currentAge": 285, "chamberId": "CH2"}],
+        weibull_models=[{"modelId": "WEIBULL_P002_v2.1", "weibullShape": 1.68,
+                         "weibullScale": 612.35, "pumpIdentifier": "P002"}],
+        rul_assessments=[{"rulId": "RUL_P002_20250721", "remainingUsefulLife": 142,
+                          "healthIndex": 0.28, "pumpIdentifier": "P002"}],
+    )
+"""
+
+COUNTER_NAMES = (
+    "nodes_created",
+    "nodes_deleted",
+    "relationships_created",
+    "relationships_deleted",
+    "properties_set",
+    "labels_added",
+)
+
+# (constraint name, label, key property) triples matching the unique constraints in neo4j-schema.cypher
+UNIQUE_KEYS = (
+    ("pump_id_unique", "DryPump", "pumpIdentifier"),
+    ("chamber_id_unique", "ProcessChamber", "chamberId"),
+    ("tool_id_unique", "SemiconductorTool", "toolId"),
+    ("area_id_unique", "FabArea", "areaId"),
+    ("fab_id_unique", "Fab", "fabId"),
+    ("weibull_model_id_unique", "WeibullSurvivalFunction", "modelId"),
+    ("rul_id_unique", "RemainingUsefulLife", "rulId"),
+    ("hazard_id_unique", "BlendedHazardFunction", "hazardId"),
+    ("prediction_id_unique", "ThirtyDayFailureProbability", "predictionId"),
+    ("report_id_unique", "MaintenanceReport", "reportId"),
+)
+
+FAB_QUERY = """
+UNWIND $rows AS row
+MERGE (f:Fab {fabId: row.key})
+SET f += row.props
+"""
+
+AREA_QUERY = """
+UNWIND $rows AS row
+MERGE (a:FabArea {areaId: row.key})
+SET a += row.props
+WITH a, row WHERE row.parent IS NOT NULL
+MATCH (f:Fab {fabId: row.parent})
+MERGE (f)-[:CONTAINS]->(a)
+"""
+
+TOOL_QUERY = """
+UNWIND $rows AS row
+MERGE (t:SemiconductorTool {toolId: row.key})
+SET t += row.props
+WITH t, row WHERE row.parent IS NOT NULL
+MATCH (a:FabArea {areaId: row.parent})
+MERGE (t)-[:LOCATED_IN]->(a)
+"""
+
+CHAMBER_QUERY = """
+UNWIND $rows AS row
+MERGE (c:ProcessChamber {chamberId: row.key})
+SET c += row.props
+WITH c, row WHERE row.parent IS NOT NULL
+MATCH (t:SemiconductorTool {toolId: row.parent})
+MERGE (c)-[:PART_OF]->(t)
+"""
+
+PUMP_QUERY = """
+UNWIND $rows AS row
+MERGE (p:DryPump {pumpIdentifier: row.key})
+SET p += row.props
+WITH p, row WHERE row.parent IS NOT NULL
+MATCH (c:ProcessChamber {chamberId: row.parent})
+MERGE (p)-[:SERVES]->(c)
+"""
+
+WEIBULL_QUERY = """
+UNWIND $rows AS row
+MERGE (w:WeibullSurvivalFunction {modelId: row.key})
+SET w += row.props
+WITH w, row WHERE row.parent IS NOT NULL
+MATCH (p:DryPump {pumpIdentifier: row.parent})
+MERGE (p)-[sm:HAS_SURVIVAL_MODEL]->(w)
+SET sm.isActive = true, sm.modelVersion = row.props.modelVersion
+"""
+
+RUL_QUERY = """
+UNWIND $rows AS row
+MERGE (r:RemainingUsefulLife {rulId: row.key})
+SET r += row.props
+WITH r, row WHERE row.parent IS NOT NULL
+MATCH (p:DryPump {pumpIdentifier: row.parent})
+MERGE (p)-[ra:HAS_RUL_ASSESSMENT]->(r)
+SET ra.assessmentTimestamp = row.props.lastTelemetryUpdate
+"""
+
+
+def entity_rows(entities, key, parent_key=None):
+    """Split entity dicts into UNWIND rows of {key, parent, props}"""
+    rows = []
+    for entity in entities:
+        props = {k: v for k, v in entity.items() if k != parent_key}
+        rows.append({
+            "key": entity[key],
+            "parent": entity.get(parent_key) if parent_key else None,
+            "props": props,
+        })
+    return rows
+
+
+class BulkGraphWriter:
+    """Chunked UNWIND writer returning aggregated result-summary counters"""
+
+    def __init__(self, driver, chunk_size=1000, database=None):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be >= 1")
+        self.driver = driver
+        self.chunk_size = chunk_size
+        self.database = database
+
+    def ensure_constraints(self):
+        """Create the unique constraints MERGE relies on (no-op when they exist)"""
+        with self.driver.session(database=self.database) as session:
+            for name, label, key in UNIQUE_KEYS:
+                session.run(
+                    f"CREATE CONSTRAINT {name} IF NOT EXISTS "
+                    f"FOR (n:{label}) REQUIRE n.{key} IS UNIQUE"
+                ).consume()
+
+    def write(self, query, rows, **parameters):
+        """Run `query` over `rows` (bound as $rows) in one write transaction per chunk"""
+        totals = dict.fromkeys(COUNTER_NAMES, 0)
+
+        def write_chunk(tx, chunk):
+            return tx.run(query, rows=chunk, **parameters).consume().counters
+
+        with self.driver.session(database=self.database) as session:
+            for start in range(0, len(rows), self.chunk_size):
+                counters = session.execute_write(write_chunk, rows[start:start + self.chunk_size])
+                for name in COUNTER_NAMES:
+                    totals[name] += getattr(counters, name)
+        return totals
+
+    def write_fabs(self, fabs):
+        return self.write(FAB_QUERY, entity_rows(fabs, "fabId"))
+
+    def write_areas(self, areas):
+        return self.write(AREA_QUERY, entity_rows(areas, "areaId", "fabId"))
+
+    def write_tools(self, tools):
+        return self.write(TOOL_QUERY, entity_rows(tools, "toolId", "areaId"))
+
+    def write_chambers(self, chambers):
+        return self.write(CHAMBER_QUERY, entity_rows(chambers, "chamberId", "toolId"))
+
+    def write_pumps(self, pumps):
+        return self.write(PUMP_QUERY, entity_rows(pumps, "pumpIdentifier", "chamberId"))
+
+    def write_weibull_models(self, models):
+        return self.write(WEIBULL_QUERY, entity_rows(models, "modelId", "pumpIdentifier"))
+
+    def write_rul_assessments(self, assessments):
+        return self.write(RUL_QUERY, entity_rows(assessments, "rulId", "pumpIdentifier"))
+
+    def load(self, fabs=(), areas=(), tools=(), chambers=(), pumps=(),
+             weibull_models=(), rul_assessments=()):
+        """Load a whole fleet top-down so every parent exists before its children"""
+        steps = (
+            ("Fab", self.write_fabs, fabs),
+            ("FabArea", self.write_areas, areas),
+            ("SemiconductorTool", self.write_tools, tools),
+            ("ProcessChamber", self.write_chambers, chambers),
+            ("DryPump", self.write_pumps, pumps),
+            ("WeibullSurvivalFunction", self.write_weibull_models, weibull_models),
+            ("RemainingUsefulLife", self.write_rul_assessments, rul_assessments),
+        )
+        summary = {}
+        for label, write, entities in steps:
+            entities = list(entities)
+            if entities:
+                summary[label] = write(entities)
+                print(f"   ✅ {label}: {len(entities)} rows, "
+                      f"{summary[label]['nodes_created']} nodes / "
+                      f"{summary[label]['relationships_created']} relationships created")
+        return summary
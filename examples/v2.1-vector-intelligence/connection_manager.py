@@ -0,0 +1,235 @@
+"""
+connection_manager.py
+One shared, pooled Neo4j driver for the vectorizer, the vector store and the agent
+
+SemanticVectorizer, Neo4jVector.from_embeddings / from_existing_index, the
+notebook's Neo4jGraph and the traversal code used to open one driver (and one
+connection pool) each from raw credentials. ConnectionManager owns a single
+driver and hands it to all of them:
+
+- driver / async_driver   created on first use; pool size, acquisition timeout
+                          and connection lifetime from arguments or NEO4J_* env vars
+- session(access)         thread-local session reused across calls, routed to
+                          readers ("read") or the leader ("write") on neo4j://
+                          clusters; all sessions share one bookmark manager, so
+                          a routed read still sees the writes made before it
+- read(work) / write(work)  managed transactions with the same routing
+- graph()                 LangChain Neo4jGraph running on the shared driver; pass
+                          it as graph= to Neo4jVector so the vector store shares it too
+
+LangChain is only imported inside graph(), so workers that only need the
+driver-level tools (hybrid_retrieval, cypher_templates, tool_cache) start
+without loading it.
+
+ENVIRONMENT (all optional):
+   NEO4J_URI=neo4j://localhost:7687   NEO4J_USERNAME=neo4j   NEO4J_PASSWORD
+   NEO4J_DATABASE=                    (unset = server default database)
+   NEO4J_MAX_POOL_SIZE=100            NEO4J_ACQUISITION_TIMEOUT=60
+   NEO4J_MAX_CONNECTION_LIFETIME=3600
+
+USAGE:
+    connections = ConnectionManager.from_env()
+    retriever = HybridRetriever(connections.driver, embeddings)
+    with connections.session("write") as session:
+        session.run(query, rows=rows).consume()
+    pumps = connections.read(lambda tx: tx.run("MATCH (p:DryPump) RETURN p").data())
+    graph = connections.graph()
+    store = Neo4jVector.from_existing_index(embeddings, index_name="semantic_concepts_vector_index",
+                                            graph=connections.graph(refresh_schema=False))
+    connections.close()
+"""
+
+from contextlib import contextmanager
+import os
+import threading
+
+from neo4j import READ_ACCESS, WRITE_ACCESS, AsyncGraphDatabase, GraphDatabase
+
+ACCESS_MODES = {"read": READ_ACCESS, "write": WRITE_ACCESS}
+
+
+def _shared_driver_graph(driver, database=None, timeout=None, sanitize=False,
+                         enhanced_schema=False):
+    """
+    Neo4jGraph that runs on an existing driver instead of opening its own.
+
+    Neo4jGraph.__init__ takes only credentials: it always opens a driver and
+    verifies connectivity. The subclass skips it and sets the state that
+    query() and refresh_schema() read, so no second connection is made.
+    Neo4jGraph has no public driver argument or accessor (Neo4jVector reads
+    graph._driver too), which is why the driver is set under that name.
+    """
+    from langchain_community.graphs import Neo4jGraph
+
+    class SharedDriverGraph(Neo4jGraph):
+        def __init__(self):
+            self._driver = driver
+            self._database = database
+            self.timeout = timeout
+            self.sanitize = sanitize
+            self._enhanced_schema = enhanced_schema
+            self.schema = ""
+            self.structured_schema = {}
+
+        def close(self):
+            """The driver belongs to its ConnectionManager, which closes it"""
+
+        def __del__(self):
+            pass
+
+    return SharedDriverGraph()
+
+
+class ConnectionManager:
+    """Single pooled driver with routed, reusable sessions"""
+
+    def __init__(self, uri="neo4j://localhost:7687", username="neo4j", password=None,
+                 database=None, max_pool_size=100, acquisition_timeout=60.0,
+                 max_connection_lifetime=3600.0, tracer=None):
+        self.uri = uri
+        self.username = username
+        self.password = password
+        self.database = database
+        self.pool_config = {
+            "max_connection_pool_size": max_pool_size,
+            "connection_acquisition_timeout": acquisition_timeout,
+            "max_connection_lifetime": max_connection_lifetime,
+        }
+        self.tracer = tracer
+
+        self._driver = None
+        self._async_driver = None
+        self._graph = None
+        self._graph_schema_loaded = False
+        self._bookmarks = GraphDatabase.bookmark_manager()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._sessions = []
+        self.counters = {"sessions_opened": 0, "sessions_reused": 0}
+
+    @classmethod
+    def from_env(cls, **overrides):
+        """Build a manager from NEO4J_* environment variables"""
+        settings = {
+            "uri": os.getenv("NEO4J_URI", "neo4j://localhost:7687"),
+            "username": os.getenv("NEO4J_USERNAME", "neo4j"),
+            "password": os.getenv("NEO4J_PASSWORD"),
+            "database": os.getenv("NEO4J_DATABASE") or None,
+            "max_pool_size": int(os.getenv("NEO4J_MAX_POOL_SIZE", "100")),
+            "acquisition_timeout": float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "60")),
+            "max_connection_lifetime": float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600")),
+        }
+        settings.update(overrides)
+        return cls(**settings)
+
+    @property
+    def driver(self):
+        """The shared sync driver (traced when the manager has a tracer)"""
+        if self._driver is None:
+            with self._lock:
+                if self._driver is None:
+                    driver = GraphDatabase.driver(
+                        self.uri, auth=(self.username, self.password), **self.pool_config
+                    )
+                    if self.tracer is not None:
+                        from tracing import TracedDriver
+                        driver = TracedDriver(driver, self.tracer)
+                    self._driver = driver
+        return self._driver
+
+    @property
+    def async_driver(self):
+        """The shared AsyncDriver for AsyncHybridRetriever"""
+        if self._async_driver is None:
+            with self._lock:
+                if self._async_driver is None:
+                    self._async_driver = AsyncGraphDatabase.driver(
+                        self.uri, auth=(self.username, self.password), **self.pool_config
+                    )
+        return self._async_driver
+
+    def _session(self, access, database):
+        sessions = self._local.__dict__.setdefault("sessions", {})
+        key = (database, access)
+        session = sessions.get(key)
+        if session is None:
+            session = self.driver.session(
+                database=database,
+                default_access_mode=ACCESS_MODES[access],
+                bookmark_manager=self._bookmarks,
+            )
+            sessions[key] = session
+            with self._lock:
+                self._sessions.append(session)
+                self.counters["sessions_opened"] += 1
+        else:
+            with self._lock:
+                self.counters["sessions_reused"] += 1
+        return key, session
+
+    def _discard(self, key, session):
+        self._local.sessions.pop(key, None)
+        with self._lock:
+            if session in self._sessions:
+                self._sessions.remove(session)
+        session.close()
+
+    @contextmanager
+    def session(self, access="read", database=None):
+        """
+        Reusable session for this thread, routed by access mode.
+
+        The session stays open after the block and is handed out again on the
+        next call from the same thread; it is discarded if the block raises.
+        """
+        if access not in ACCESS_MODES:
+            raise ValueError(f"access must be 'read' or 'write', not {access!r}")
+        key, session = self._session(access, database or self.database)
+        try:
+            yield session
+        except BaseException:
+            self._discard(key, session)
+            raise
+
+    def read(self, work, *args, database=None, **kwargs):
+        """Run `work(tx, ...)` in a managed read transaction"""
+        with self.session("read", database) as session:
+            return session.execute_read(work, *args, **kwargs)
+
+    def write(self, work, *args, database=None, **kwargs):
+        """Run `work(tx, ...)` in a managed write transaction"""
+        with self.session("write", database) as session:
+            return session.execute_write(work, *args, **kwargs)
+
+    def graph(self, refresh_schema=True, **kwargs):
+        """LangChain Neo4jGraph on the shared driver (LangChain imported lazily)"""
+        # Resolve the driver first: the property takes the same (non-reentrant) lock
+        driver = self.driver
+        with self._lock:
+            if self._graph is None:
+                self._graph = _shared_driver_graph(driver, self.database, **kwargs)
+        if refresh_schema and not self._graph_schema_loaded:
+            self._graph.refresh_schema()
+            self._graph_schema_loaded = True
+        return self._graph
+
+    def stats(self):
+        with self._lock:
+            return {**self.counters, "open_sessions": len(self._sessions), **self.pool_config}
+
+    async def aclose(self):
+        if self._async_driver is not None:
+            await self._async_driver.close()
+            self._async_driver = None
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        self._local = threading.local()
+        if self._driver is not None:
+            self._driver.close()
+            self._driver = None
+        self._graph = None
+        self._graph_schema_loaded = False
@@ -0,0 +1,821 @@
+"""
+constraint_validator.py
+Bulk, vectorized validation of the ontology constraints over the whole fleet
+
+docs/ontology/06-constraints.md defines the rules (C1.x-C6.x) and
+docs/implementation/neo4j-schema.cypher lists the value ranges, but Neo4j can
+only enforce uniqueness and existence; ranges, cross-node consistency and the
+blended-hazard math were only checked one pump at a time by hand-written
+Cypher. This module checks every rule against every node in bulk:
+
+- each validated label (DryPump, WeibullSurvivalFunction, RemainingUsefulLife,
+  BlendedHazardFunction, ThirtyDayFailureProbability, MaintenanceReport) is
+  split into key-range partitions that are read in parallel threads
+- each partition streams keyset pages (ORDER BY the unique key, LIMIT
+  page_size); a page becomes NumPy columns and every rule for the label is one
+  vectorized mask over the page
+- hazard pages are joined with their Weibull model, RUL assessment and
+  prediction, so H_30 = λ_W + k·λ_R, λ_W, λ_R, P_30 = 1 - exp(-H_30),
+  timestamp ordering (C4.3) and freshness (C6.1) are checked numerically
+- incremental mode revalidates only nodes whose timestamp property
+  (modelFitDate, lastTelemetryUpdate, calculationTimestamp,
+  predictionTimestamp, reportGenerationTime; latestPredictionTimestamp or a
+  newer RUL assessment or model for pumps) is newer than the start of the
+  last completed run minus an overlap window (INCREMENTAL_OVERLAP)
+- the result is a JSON report: run metadata, per-rule checked/violation counts
+  by severity (critical / important / recommended, as in 06-constraints.md)
+  and up to `sample` violating keys per rule with the offending values
+
+SETUP:
+1. Create .env file with NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD
+2. Install: pip install -r requirements.txt
+3. Run: python constraint_validator.py [--incremental] [--output validation_report.json]
+                                       [--workers 8] [--page-size 5000]
+   Offline benchmark (no database): python constraint_validator.py --synthetic 100000
+
+The exit status is 1 when a critical rule is violated, so the script can gate
+a nightly job.
+
+USAGE:
+    validator = ConstraintValidator(driver, workers=8, page_size=5000)
+    report = validator.validate()                   # full fleet
+    report = validator.validate(incremental=True)   # only nodes changed since the last run
+    validator.save(report, "validation_report.json")
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from fleet_hazard import (
+    DEFAULT_HORIZON_DAYS, classify_risk, condition_hazard,
+    weibull_cumulative_hazard,
+)
+
+SEVERITIES = ("critical", "important", "recommended")
+CRITICALITY_LEVELS = ("Level1", "Level2", "Level3", "Level4", "Level5")
+SERVICE_ROLES = ("Primary", "Backup", "Roughing")
+FRESHNESS_LIMIT = 7 * 86400.0
+WINDOW_TOLERANCE = 1.0
+STATE_PATH = "constraint_validation_state.json"
+# Incremental runs re-read this far before the last run's start, so nodes stamped
+# before it but committed while it was running are not skipped
+INCREMENTAL_OVERLAP = timedelta(minutes=15)
+
+# Relative / absolute tolerance for the hazard math; seed data is rounded to 3 decimals
+RELATIVE_TOLERANCE = 5e-3
+ABSOLUTE_TOLERANCE = 5e-4
+
+
+# =============================================================================
+# PAGES
+# =============================================================================
+
+def _number(value):
+    if value is None or isinstance(value, str):
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _epoch(value):
+    """Neo4j/Python temporal value → POSIX seconds (naive datetimes taken as UTC)"""
+    if hasattr(value, "to_native"):
+        value = value.to_native()
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return np.nan
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day, tzinfo=timezone.utc).timestamp()
+    return np.nan
+
+
+def _json_value(value):
+    if hasattr(value, "to_native"):
+        value = value.to_native()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None if np.isnan(value) else str(value)
+    if isinstance(value, (np.floating, np.integer)):
+        return _json_value(value.item())
+    return value
+
+
+class Page:
+    """One page of records exposed as NumPy columns, built on first use"""
+
+    def __init__(self, records):
+        self.records = records
+        self.keys = [record["key"] for record in records]
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def _column(self, kind, name, build):
+        column = self._columns.get((kind, name))
+        if column is None:
+            column = build([record.get(name) for record in self.records])
+            self._columns[(kind, name)] = column
+        return column
+
+    def num(self, name):
+        """Float column; missing and non-numeric values are NaN"""
+        return self._column("num", name, lambda values: np.array(
+            [_number(v) for v in values], dtype=np.float64
+        ))
+
+    def time(self, name):
+        """POSIX-seconds column; missing values are NaN"""
+        return self._column("time", name, lambda values: np.array(
+            [np.nan if v is None else _epoch(v) for v in values], dtype=np.float64
+        ))
+
+    def text(self, name):
+        """Object column of raw values (None where missing)"""
+        return self._column("text", name, lambda values: np.array(values, dtype=object))
+
+    def present(self, name):
+        return self.text(name) != None  # noqa: E711 - element-wise comparison
+
+    def one_of(self, name, allowed):
+        return np.isin(self.text(name), np.array(allowed, dtype=object))
+
+
+# =============================================================================
+# RULES
+# =============================================================================
+
+def rule(name, reference, severity, label, description, fields, check):
+    """One vectorized constraint: check(page) returns a boolean violation mask"""
+    return {
+        "rule": name,
+        "reference": reference,
+        "severity": severity,
+        "label": label,
+        "description": description,
+        "fields": fields,
+        "check": check,
+    }
+
+
+def _outside(values, low, high):
+    # NaN is not "outside": ranges apply to present values, existence is its own rule
+    return (values < low) | (values > high)
+
+
+def _mismatch(actual, expected, tolerance):
+    relative, absolute = tolerance
+    compared = ~np.isnan(actual) & ~np.isnan(expected)
+    with np.errstate(invalid="ignore"):
+        close = np.isclose(actual, expected, rtol=relative, atol=absolute)
+    return compared & ~close
+
+
+def _expected_blend(page):
+    k = page.num("blending_weight")
+    with np.errstate(invalid="ignore"):
+        return page.num("weibull_hazard") + np.where(k > 0, k * page.num("condition_hazard"), 0.0)
+
+
+def _expected_weibull(page):
+    shape, scale, age = page.num("weibull_shape"), page.num("weibull_scale"), page.num("pump_age")
+    horizon = np.where(np.isnan(page.num("target_days")), DEFAULT_HORIZON_DAYS, page.num("target_days"))
+    usable = (shape > 0) & (scale > 0) & (age >= 0)
+    expected = weibull_cumulative_hazard(
+        np.where(usable, age, 0.0), np.where(usable, shape, 1.0), np.where(usable, scale, 1.0), horizon
+    )
+    return np.where(usable, expected, np.nan)
+
+
+def _expected_condition(page):
+    rul = page.num("remaining_useful_life")
+    horizon = np.where(np.isnan(page.num("target_days")), DEFAULT_HORIZON_DAYS, page.num("target_days"))
+    # RUL = 0 is C2.3's problem, not a consistency mismatch
+    return np.where(rul > 0, condition_hazard(np.where(rul > 0, rul, 1.0), horizon), np.nan)
+
+
+def _expected_probability(page):
+    return -np.expm1(-page.num("blended_hazard"))
+
+
+def _prediction_time(page):
+    predicted = page.time("prediction_timestamp")
+    return np.where(np.isnan(predicted), page.time("calculation_timestamp"), predicted)
+
+
+def _risk_mismatch(page):
+    probability = page.num("failure_probability")
+    expected = classify_risk(np.nan_to_num(probability, nan=0.0)).astype(object)
+    return ~np.isnan(probability) & page.present("risk_classification") & (
+        page.text("risk_classification") != expected
+    )
+
+
+def _window_violation(page):
+    start, end = page.time("prediction_window_start"), page.time("prediction_window_end")
+    length = end - start
+    has_window = ~np.isnan(start) | ~np.isnan(end)
+    return has_window & ~(np.abs(length - DEFAULT_HORIZON_DAYS * 86400.0) <= WINDOW_TOLERANCE)
+
+
+def _anomaly_not_actioned(page):
+    flagged = page.text("anomaly_flag") == True  # noqa: E712 - element-wise comparison
+    recommendation = page.text("action_recommendation")
+    mentions = np.array(
+        ["investigate anomaly" in str(text).lower() for text in recommendation], dtype=bool
+    )
+    return flagged & ~mentions
+
+
+def build_rules(tolerance=(RELATIVE_TOLERANCE, ABSOLUTE_TOLERANCE)):
+    """All constraint rules; `tolerance` is (rtol, atol) for the hazard math checks"""
+    return [
+        # --- DryPump -------------------------------------------------------------
+        rule("pump_current_age_present", "C2.1", "critical", "DryPump",
+             "Pump must have currentAge", ["current_age"],
+             lambda p: np.isnan(p.num("current_age"))),
+        rule("pump_current_age_non_negative", "C4.1", "critical", "DryPump",
+             "currentAge >= 0", ["current_age"],
+             lambda p: p.num("current_age") < 0),
+        rule("pump_prediction_requires_weibull", "C2.2", "critical", "DryPump",
+             "A pump with failure predictions needs an active model with weibullShape and weibullScale",
+             ["prediction_count", "fitted_models"],
+             lambda p: (p.num("prediction_count") > 0) & ~(p.num("fitted_models") > 0)),
+        rule("pump_criticality_level", "C3.2", "important", "DryPump",
+             "criticalityLevel in Level1..Level5", ["criticality_level"],
+             lambda p: p.present("criticality_level") & ~p.one_of("criticality_level", CRITICALITY_LEVELS)),
+        rule("pump_service_role", "C3.3", "important", "DryPump",
+             "serviceRole in {Primary, Backup, Roughing}", ["service_role"],
+             lambda p: p.present("service_role") & ~p.one_of("service_role", SERVICE_ROLES)),
+
+        # --- WeibullSurvivalFunction ---------------------------------------------
+        rule("weibull_shape_positive", "C1.1", "critical", "WeibullSurvivalFunction",
+             "weibullShape > 0", ["weibull_shape"],
+             lambda p: ~(p.num("weibull_shape") > 0)),
+        rule("weibull_scale_positive", "C1.2", "critical", "WeibullSurvivalFunction",
+             "weibullScale > 0", ["weibull_scale"],
+             lambda p: ~(p.num("weibull_scale") > 0)),
+        rule("weibull_location_non_negative", "C1.3", "critical", "WeibullSurvivalFunction",
+             "weibullLocation >= 0", ["weibull_location"],
+             lambda p: p.num("weibull_location") < 0),
+        rule("weibull_parameter_confidence_range", "schema: parameter_confidence_range", "recommended",
+             "WeibullSurvivalFunction", "parameterConfidence in [0, 1]", ["parameter_confidence"],
+             lambda p: _outside(p.num("parameter_confidence"), 0.0, 1.0)),
+
+        # --- RemainingUsefulLife -------------------------------------------------
+        rule("rul_present_non_negative", "schema: rul_non_negative", "critical", "RemainingUsefulLife",
+             "remainingUsefulLife exists and >= 0", ["remaining_useful_life"],
+             lambda p: ~(p.num("remaining_useful_life") >= 0)),
+        rule("rul_health_index_range", "C1.6", "critical", "RemainingUsefulLife",
+             "healthIndex in [0, 1]", ["health_index"],
+             lambda p: _outside(p.num("health_index"), 0.0, 1.0)),
+        rule("rul_data_quality_threshold", "C6.2", "recommended", "RemainingUsefulLife",
+             "dataQualityScore >= 0.5 when present", ["data_quality_score"],
+             lambda p: (p.num("data_quality_score") < 0.5) | (p.num("data_quality_score") > 1.0)),
+
+        # --- BlendedHazardFunction (joined with model, RUL and prediction) --------
+        rule("hazard_blending_weight_range", "C1.4", "critical", "BlendedHazardFunction",
+             "blendingWeight exists and is in [0, 1]", ["blending_weight"],
+             lambda p: ~((p.num("blending_weight") >= 0) & (p.num("blending_weight") <= 1))),
+        rule("hazard_components_non_negative", "schema: *_hazard_non_negative", "critical",
+             "BlendedHazardFunction", "weibullHazard, conditionHazard and blendedHazard >= 0",
+             ["weibull_hazard", "condition_hazard", "blended_hazard"],
+             lambda p: (p.num("weibull_hazard") < 0) | (p.num("condition_hazard") < 0)
+             | (p.num("blended_hazard") < 0)),
+        rule("hazard_condition_requires_rul", "C2.3", "critical", "BlendedHazardFunction",
+             "blendingWeight > 0 requires remainingUsefulLife > 0",
+             ["blending_weight", "remaining_useful_life"],
+             lambda p: (p.num("blending_weight") > 0) & ~(p.num("remaining_useful_life") > 0)),
+        rule("hazard_blend_consistency", "H_30 = λ_W + k·λ_R", "critical", "BlendedHazardFunction",
+             "blendedHazard equals weibullHazard + blendingWeight · conditionHazard",
+             ["blended_hazard", "weibull_hazard", "condition_hazard", "blending_weight"],
+             lambda p: _mismatch(p.num("blended_hazard"), _expected_blend(p), tolerance)),
+        rule("hazard_weibull_consistency", "λ_W = ((t+30)^ρ - t^ρ)/β^ρ", "important",
+             "BlendedHazardFunction", "weibullHazard matches the linked model at pumpAge",
+             ["weibull_hazard", "pump_age", "weibull_shape", "weibull_scale"],
+             lambda p: _mismatch(p.num("weibull_hazard"), _expected_weibull(p), tolerance)),
+        rule("hazard_condition_consistency", "λ_R = 30/RUL", "important", "BlendedHazardFunction",
+             "conditionHazard matches the linked RUL assessment",
+             ["condition_hazard", "remaining_useful_life"],
+             lambda p: _mismatch(p.num("condition_hazard"), _expected_condition(p), tolerance)),
+        rule("hazard_probability_consistency", "P_30 = 1 - exp(-H_30)", "critical",
+             "BlendedHazardFunction", "Generated failureProbability equals 1 - exp(-blendedHazard)",
+             ["failure_probability", "blended_hazard"],
+             lambda p: _mismatch(p.num("failure_probability"), _expected_probability(p), tolerance)),
+        rule("hazard_telemetry_before_prediction", "C4.3", "important", "BlendedHazardFunction",
+             "lastTelemetryUpdate <= predictionTimestamp",
+             ["last_telemetry_update", "prediction_timestamp", "calculation_timestamp"],
+             lambda p: p.time("last_telemetry_update") > _prediction_time(p)),
+        rule("hazard_telemetry_freshness", "C6.1", "important", "BlendedHazardFunction",
+             "predictionTimestamp - lastTelemetryUpdate <= 7 days",
+             ["last_telemetry_update", "prediction_timestamp", "calculation_timestamp"],
+             lambda p: _prediction_time(p) - p.time("last_telemetry_update") > FRESHNESS_LIMIT),
+        rule("hazard_short_rul_probability", "C4.4", "recommended", "BlendedHazardFunction",
+             "0 < RUL < 30 days implies failureProbability > 0.99",
+             ["remaining_useful_life", "failure_probability"],
+             lambda p: (p.num("remaining_useful_life") > 0) & (p.num("remaining_useful_life") < 30)
+             & (p.num("failure_probability") <= 0.99)),
+
+        # --- ThirtyDayFailureProbability -----------------------------------------
+        rule("prediction_completeness", "C5.2", "critical", "ThirtyDayFailureProbability",
+             "failureProbability, riskClassification and predictionTimestamp exist",
+             ["failure_probability", "risk_classification", "prediction_timestamp"],
+             lambda p: np.isnan(p.num("failure_probability")) | ~p.present("risk_classification")
+             | np.isnan(p.time("prediction_timestamp"))),
+        rule("prediction_probability_range", "C1.5", "critical", "ThirtyDayFailureProbability",
+             "failureProbability in [0, 1]", ["failure_probability"],
+             lambda p: _outside(p.num("failure_probability"), 0.0, 1.0)),
+        rule("prediction_scores_range", "schema: risk_score_range / confidence_level_range",
+             "recommended", "ThirtyDayFailureProbability", "riskScore and confidenceLevel in [0, 1]",
+             ["risk_score", "confidence_level"],
+             lambda p: _outside(p.num("risk_score"), 0.0, 1.0) | _outside(p.num("confidence_level"), 0.0, 1.0)),
+        rule("prediction_risk_classification", "C3.1", "important", "ThirtyDayFailureProbability",
+             "riskClassification matches the failureProbability band",
+             ["failure_probability", "risk_classification"], _risk_mismatch),
+        rule("prediction_window", "C4.2", "critical", "ThirtyDayFailureProbability",
+             "predictionWindowEnd = predictionWindowStart + 30 days (when a window is stored)",
+             ["prediction_window_start", "prediction_window_end"], _window_violation),
+        rule("prediction_calculation_method", "C5.3", "recommended", "ThirtyDayFailureProbability",
+             "calculationMethod should be recorded", ["calculation_method"],
+             lambda p: ~p.present("calculation_method")),
+
+        # --- MaintenanceReport ---------------------------------------------------
+        rule("report_completeness", "C5.1", "critical", "MaintenanceReport",
+             "Report has reportGenerationTime and at least one prediction",
+             ["report_generation_time", "prediction_count"],
+             lambda p: np.isnan(p.time("report_generation_time")) | ~(p.num("prediction_count") > 0)),
+        rule("report_anomaly_action", "C6.3", "recommended", "MaintenanceReport",
+             "hasAnomalyFlag = true implies actionRecommendation includes 'Investigate anomaly'",
+             ["anomaly_flag", "action_recommendation"], _anomaly_not_actioned),
+    ]
+
+
+# =============================================================================
+# SOURCES
+# =============================================================================
+
+# label → (unique key, RETURN clause over n, incremental predicate over n and $since)
+SOURCES = {
+    "DryPump": ("pumpIdentifier", """
+    RETURN n.pumpIdentifier AS key,
+           n.currentAge AS current_age,
+           n.criticalityLevel AS criticality_level,
+           n.serviceRole AS service_role,
+           COUNT { (n)-[:HAS_FAILURE_PREDICTION]->(:ThirtyDayFailureProbability) } AS prediction_count,
+           size([(n)-[sm:HAS_SURVIVAL_MODEL]->(w:WeibullSurvivalFunction)
+                 WHERE coalesce(sm.isActive, true)
+                   AND w.weibullShape IS NOT NULL AND w.weibullScale IS NOT NULL | w]) AS fitted_models
+    """, "n.latestPredictionTimestamp > $since OR EXISTS {"
+         " MATCH (n)-[:HAS_RUL_ASSESSMENT|HAS_SURVIVAL_MODEL]->(x)"
+         " WHERE x.lastTelemetryUpdate > $since OR x.modelFitDate > $since }"),
+    "WeibullSurvivalFunction": ("modelId", """
+    RETURN n.modelId AS key,
+           n.weibullShape AS weibull_shape,
+           n.weibullScale AS weibull_scale,
+           n.weibullLocation AS weibull_location,
+           n.parameterConfidence AS parameter_confidence
+    """, "n.modelFitDate > $since"),
+    "RemainingUsefulLife": ("rulId", """
+    RETURN n.rulId AS key,
+           n.remainingUsefulLife AS remaining_useful_life,
+           n.healthIndex AS health_index,
+           n.dataQualityScore AS data_quality_score
+    """, "n.lastTelemetryUpdate > $since"),
+    "BlendedHazardFunction": ("hazardId", """
+    WITH n,
+         head([(n)-[:CALCULATED_FROM_SURVIVAL]->(w:WeibullSurvivalFunction) | w]) AS w,
+         head([(n)-[:CALCULATED_FROM_RUL]->(r:RemainingUsefulLife) | r]) AS r,
+         head([(n)-[:GENERATES_PREDICTION]->(pred:ThirtyDayFailureProbability) | pred]) AS pred
+    RETURN n.hazardId AS key,
+           n.blendingWeight AS blending_weight,
+           n.weibullHazard AS weibull_hazard,
+           n.conditionHazard AS condition_hazard,
+           n.blendedHazard AS blended_hazard,
+           n.pumpAge AS pump_age,
+           n.targetDays AS target_days,
+           n.calculationTimestamp AS calculation_timestamp,
+           w.weibullShape AS weibull_shape,
+           w.weibullScale AS weibull_scale,
+           r.remainingUsefulLife AS remaining_useful_life,
+           r.lastTelemetryUpdate AS last_telemetry_update,
+           pred.failureProbability AS failure_probability,
+           pred.predictionTimestamp AS prediction_timestamp
+    """, "n.calculationTimestamp > $since"),
+    "ThirtyDayFailureProbability": ("predictionId", """
+    RETURN n.predictionId AS key,
+           n.failureProbability AS failure_probability,
+           n.riskClassification AS risk_classification,
+           n.predictionTimestamp AS prediction_timestamp,
+           n.riskScore AS risk_score,
+           n.confidenceLevel AS confidence_level,
+           n.predictionWindowStart AS prediction_window_start,
+           n.predictionWindowEnd AS prediction_window_end,
+           n.calculationMethod AS calculation_method
+    """, "n.predictionTimestamp > $since"),
+    "MaintenanceReport": ("reportId", """
+    RETURN n.reportId AS key,
+           n.reportGenerationTime AS report_generation_time,
+           COUNT { (n)-[:INCLUDES_PREDICTION]->(:ThirtyDayFailureProbability) } AS prediction_count,
+           n.hasAnomalyFlag AS anomaly_flag,
+           n.actionRecommendation AS action_recommendation
+    """, "n.reportGenerationTime > $since"),
+}
+
+
+def page_query(label, incremental=False):
+    """Keyset page of one key-range partition: keys in ($after, $upper]"""
+    key, columns, changed = SOURCES[label]
+    where = f"n.{key} > $after AND ($upper IS NULL OR n.{key} <= $upper)"
+    if incremental:
+        where += f" AND ({changed})"
+    return f"MATCH (n:{label}) WHERE {where} WITH n ORDER BY n.{key} LIMIT $limit {columns}"
+
+
+def partition_query(label):
+    """
+    (count query, bound query) for splitting a label into equal key ranges.
+
+    The bound query reads the single key at offset $skip in index order, so
+    sampling the partition bounds never collects the label's keys into memory.
+    """
+    key = SOURCES[label][0]
+    return (
+        f"MATCH (n:{label}) WHERE n.{key} IS NOT NULL RETURN count(n) AS total",
+        f"MATCH (n:{label}) WHERE n.{key} IS NOT NULL "
+        f"WITH n.{key} AS key ORDER BY key SKIP $skip LIMIT 1 RETURN key",
+    )
+
+
+# =============================================================================
+# REPORT
+# =============================================================================
+
+def check_page(records, rules):
+    """
+    Run every rule against one page of records.
+
+    Returns:
+        ({rule name: violation count}, [violation dicts])
+    """
+    page = Page(records)
+    counts, violations = {}, []
+    for spec in rules:
+        mask = np.asarray(spec["check"](page), dtype=bool)
+        hits = np.flatnonzero(mask)
+        counts[spec["rule"]] = len(hits)
+        for i in hits:
+            violations.append({
+                "rule": spec["rule"],
+                "reference": spec["reference"],
+                "severity": spec["severity"],
+                "label": spec["label"],
+                "key": page.keys[i],
+                "values": {field: _json_value(records[i].get(field)) for field in spec["fields"]},
+            })
+    return counts, violations
+
+
+class ValidationReport:
+    """Thread-safe accumulator of page results, serialised as the JSON report"""
+
+    def __init__(self, rules, mode, since=None, sample=1000):
+        self.rules = rules
+        self.mode = mode
+        self.since = since
+        self.sample = sample
+        self.started_at = datetime.now(timezone.utc)
+        self.started = time.perf_counter()
+        self.sources = {}
+        self.counts = {spec["rule"]: 0 for spec in rules}
+        self.checked = {spec["rule"]: 0 for spec in rules}
+        self.violations = {spec["rule"]: [] for spec in rules}
+        self._lock = threading.Lock()
+
+    def add(self, label, records, counts, violations, seconds):
+        with self._lock:
+            source = self.sources.setdefault(label, {"checked": 0, "pages": 0, "seconds": 0.0})
+            source["checked"] += len(records)
+            source["pages"] += 1
+            source["seconds"] += seconds
+            for name, count in counts.items():
+                self.counts[name] += count
+                self.checked[name] += len(records)
+            for violation in violations:
+                kept = self.violations[violation["rule"]]
+                if self.sample is None or len(kept) < self.sample:
+                    kept.append(violation)
+
+    def to_dict(self):
+        summary = {severity: 0 for severity in SEVERITIES}
+        rules = []
+        for spec in self.rules:
+            summary[spec["severity"]] += self.counts[spec["rule"]]
+            rules.append({
+                "rule": spec["rule"],
+                "reference": spec["reference"],
+                "severity": spec["severity"],
+                "label": spec["label"],
+                "description": spec["description"],
+                "checked": self.checked[spec["rule"]],
+                "violations": self.counts[spec["rule"]],
+            })
+        return {
+            "run_id": f"VALIDATION_{self.started_at.strftime('%Y%m%d%H%M%S')}",
+            "mode": self.mode,
+            "since": self.since.isoformat() if self.since else None,
+            "started_at": self.started_at.isoformat(),
+            "duration_seconds": round(time.perf_counter() - self.started, 3),
+            "passed": summary["critical"] == 0,
+            "summary": summary,
+            "sources": {
+                label: {**source, "seconds": round(source["seconds"], 3)}
+                for label, source in sorted(self.sources.items())
+            },
+            "rules": rules,
+            "violations": [v for spec in self.rules for v in self.violations[spec["rule"]]],
+        }
+
+
+def print_report(report):
+    icon = "✅" if report["passed"] else "❌"
+    checked = sum(source["checked"] for source in report["sources"].values())
+    print(f"\n{icon} {report['mode'].capitalize()} validation: {checked} nodes "
+          f"in {report['duration_seconds']:.2f}s")
+    for label, source in report["sources"].items():
+        print(f"   • {label}: {source['checked']} nodes, {source['pages']} pages")
+    for severity in SEVERITIES:
+        print(f"   {severity.capitalize()} violations: {report['summary'][severity]}")
+    for spec in report["rules"]:
+        if spec["violations"]:
+            print(f"      ⚠️  {spec['reference']} {spec['rule']}: {spec['violations']}")
+
+
+# =============================================================================
+# VALIDATOR
+# =============================================================================
+
+class ConstraintValidator:
+    """Stream every validated label in parallel key-range partitions and check all rules"""
+
+    def __init__(self, driver, workers=8, page_size=5000, labels=None, sample=1000,
+                 tolerance=(RELATIVE_TOLERANCE, ABSOLUTE_TOLERANCE), state_path=STATE_PATH,
+                 overlap=INCREMENTAL_OVERLAP, database=None):
+        self.driver = driver
+        self.workers = workers
+        self.page_size = page_size
+        self.labels = tuple(labels or SOURCES)
+        self.sample = sample
+        self.rules = build_rules(tolerance)
+        self.state_path = state_path
+        self.overlap = overlap
+        self.database = database
+
+    def rules_for(self, label):
+        return [spec for spec in self.rules if spec["label"] == label]
+
+    def partitions(self, label):
+        """(after, upper) key ranges covering the label, one per worker"""
+        count_query, bound_query = partition_query(label)
+
+        def read(tx):
+            total = tx.run(count_query).single()["total"]
+            if not total:
+                return None
+            step = -(-total // self.workers)
+            keys = [tx.run(bound_query, skip=i - 1).single()
+                    for i in range(step, total, step)]
+            # A key deleted between reads could repeat a bound; ranges must stay strictly increasing
+            return sorted({record["key"] for record in keys if record is not None})
+
+        with self.driver.session(database=self.database) as session:
+            bounds = session.execute_read(read)
+        if bounds is None:
+            return []
+        lowers = [""] + bounds
+        uppers = bounds + [None]
+        return list(zip(lowers, uppers))
+
+    def _validate_partition(self, label, after, upper, since, report):
+        query = page_query(label, incremental=since is not None)
+        rules = self.rules_for(label)
+
+        def read(tx, after):
+            return [dict(record) for record in tx.run(
+                query, after=after, upper=upper, since=since, limit=self.page_size
+            )]
+
+        with self.driver.session(database=self.database) as session:
+            while True:
+                started = time.perf_counter()
+                records = session.execute_read(read, after)
+                if not records:
+                    return
+                counts, violations = check_page(records, rules)
+                report.add(label, records, counts, violations, time.perf_counter() - started)
+                if len(records) < self.page_size:
+                    return
+                after = records[-1]["key"]
+
+    def last_run(self):
+        """Start time of the last completed run (None when there is no state yet)"""
+        if not self.state_path or not os.path.exists(self.state_path):
+            return None
+        with open(self.state_path) as handle:
+            return datetime.fromisoformat(json.load(handle)["started_at"])
+
+    def validate(self, incremental=False, since=None):
+        """
+        Validate every label; incremental mode only reads nodes changed since `since`
+        (default: the start of the last completed run minus `overlap`, falling back
+        to a full run).
+
+        Returns:
+            The report dict (see ValidationReport.to_dict)
+        """
+        if incremental and since is None:
+            since = self.last_run()
+            if since is not None:
+                since -= self.overlap
+        mode = "incremental" if since is not None else "full"
+        report = ValidationReport(self.rules, mode, since, self.sample)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [
+                pool.submit(self._validate_partition, label, after, upper, since, report)
+                for label in self.labels
+                for after, upper in self.partitions(label)
+            ]
+            for future in futures:
+                future.result()
+
+        result = report.to_dict()
+        if self.state_path:
+            with open(self.state_path, "w") as handle:
+                json.dump({"started_at": result["started_at"], "run_id": result["run_id"]}, handle)
+        return result
+
+    @staticmethod
+    def save(report, path):
+        with open(path, "w") as handle:
+            json.dump(report, handle, indent=2, default=str)
+
+
+# =============================================================================
+# SYNTHETIC BENCHMARK
+# =============================================================================
+
+def synthetic_sources(pumps, seed=7, corrupt=0.001):
+    """
+    Validation records for a synthetic fleet (synthetic_fleet.generate_fleet +
+    fleet_hazard), with a `corrupt` fraction of values broken on purpose.
+
+    Returns:
+        {label: [record dicts in the shape the page queries return]}
+    """
+    from fleet_hazard import FleetHazardEngine, compute_fleet_hazard
+    from synthetic_fleet import BASE_TIME, fleet_arrays, generate_fleet
+
+    fleet = generate_fleet(pumps, seed=seed)
+    entities = fleet["entities"]
+    arrays = fleet_arrays(fleet)
+    results = compute_fleet_hazard(
+        arrays["weibull_shape"], arrays["weibull_scale"], arrays["current_age"],
+        arrays["remaining_useful_life"], arrays["blending_weight"],
+    )
+    rows = FleetHazardEngine(None).prediction_rows(arrays, results, BASE_TIME + timedelta(hours=1))
+
+    sources = {
+        "DryPump": [{
+            "key": p["pumpIdentifier"], "current_age": p["currentAge"],
+            "criticality_level": p["criticalityLevel"], "service_role": p["serviceRole"],
+            "prediction_count": 1, "fitted_models": 1,
+        } for p in entities["pumps"]],
+        "WeibullSurvivalFunction": [{
+            "key": w["modelId"], "weibull_shape": w["weibullShape"], "weibull_scale": w["weibullScale"],
+            "weibull_location": w["weibullLocation"], "parameter_confidence": w["parameterConfidence"],
+        } for w in entities["weibull_models"]],
+        "RemainingUsefulLife": [{
+            "key": r["rulId"], "remaining_useful_life": r["remainingUsefulLife"],
+            "health_index": r["healthIndex"], "data_quality_score": r["dataQualityScore"],
+        } for r in entities["rul_assessments"]],
+        "BlendedHazardFunction": [{
+            "key": row["hazard_id"], "blending_weight": row["blending_weight"],
+            "weibull_hazard": row["weibull_hazard"], "condition_hazard": row["condition_hazard"],
+            "blended_hazard": row["blended_hazard"], "pump_age": row["current_age"],
+            "target_days": row["horizon"], "calculation_timestamp": row["timestamp"],
+            "weibull_shape": float(arrays["weibull_shape"][i]),
+            "weibull_scale": float(arrays["weibull_scale"][i]),
+            "remaining_useful_life": float(arrays["remaining_useful_life"][i]),
+            "last_telemetry_update": entities["rul_assessments"][i]["lastTelemetryUpdate"],
+            "failure_probability": row["failure_probability"], "prediction_timestamp": row["timestamp"],
+        } for i, row in enumerate(rows)],
+        "ThirtyDayFailureProbability": [{
+            "key": row["prediction_id"], "failure_probability": row["failure_probability"],
+            "risk_classification": row["risk_classification"], "prediction_timestamp": row["timestamp"],
+            "risk_score": row["failure_probability"], "calculation_method": row["calculation_method"],
+        } for row in rows],
+        "MaintenanceReport": [],
+    }
+
+    rng = np.random.default_rng(seed + 1)
+    breaks = (
+        ("WeibullSurvivalFunction", "weibull_shape", -1.0),
+        ("RemainingUsefulLife", "health_index", 1.7),
+        ("BlendedHazardFunction", "blended_hazard", 9.9),
+        ("ThirtyDayFailureProbability", "risk_classification", "Z"),
+        ("DryPump", "service_role", "Standby"),
+    )
+    for label, field, value in breaks:
+        records = sources[label]
+        for i in rng.choice(len(records), size=int(len(records) * corrupt), replace=False):
+            records[i][field] = value
+    return sources
+
+
+def validate_records(sources, workers=8, page_size=5000, sample=1000,
+                     tolerance=(RELATIVE_TOLERANCE, ABSOLUTE_TOLERANCE)):
+    """Validate in-memory {label: records} with the same paging and thread pool (no database)"""
+    rules = build_rules(tolerance)
+    report = ValidationReport(rules, "full", sample=sample)
+
+    def run(label, records):
+        started = time.perf_counter()
+        counts, violations = check_page(records, [spec for spec in rules if spec["label"] == label])
+        report.add(label, records, counts, violations, time.perf_counter() - started)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(run, label, records[start:start + page_size])
+            for label, records in sources.items()
+            for start in range(0, len(records), page_size)
+        ]
+        for future in futures:
+            future.result()
+    return report.to_dict()
+
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+if __name__ == "__main__":
+    def option(name, default):
+        if name in sys.argv:
+            return sys.argv[sys.argv.index(name) + 1]
+        return default
+
+    workers = int(option("--workers", "8"))
+    page_size = int(option("--page-size", "5000"))
+    output = option("--output", "validation_report.json")
+
+    if "--synthetic" in sys.argv:
+        pumps = int(option("--synthetic", "100000"))
+        print(f"\n🧪 Validating a synthetic fleet of {pumps} pumps (no database)...")
+        generated = time.perf_counter()
+        sources = synthetic_sources(pumps)
+        print(f"   ✅ Generated records in {time.perf_counter() - generated:.2f}s")
+        report = validate_records(sources, workers=workers, page_size=page_size)
+        print_report(report)
+        ConstraintValidator.save(report, output)
+        print(f"   📄 Report written to {output}")
+        sys.exit(0)
+
+    from dotenv import load_dotenv
+    from neo4j import GraphDatabase
+
+    load_dotenv()
+
+    password = os.getenv("NEO4J_PASSWORD")
+    if not password:
+        print("❌ ERROR: NEO4J_PASSWORD is not set - create a .env file first")
+        sys.exit(1)
+
+    driver = GraphDatabase.driver(
+        os.getenv("NEO4J_URI", "neo4j://localhost:7687"),
+        auth=(os.getenv("NEO4J_USERNAME", "neo4j"), password),
+    )
+    try:
+        validator = ConstraintValidator(driver, workers=workers, page_size=page_size)
+        report = validator.validate(incremental="--incremental" in sys.argv)
+        print_report(report)
+        validator.save(report, output)
+        print(f"   📄 Report written to {output}")
+    finally:
+        driver.close()
+    sys.exit(0 if report["passed"] else 1)
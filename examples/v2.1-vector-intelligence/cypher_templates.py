@@ -0,0 +1,416 @@
+"""
+cypher_templates.py
+Parameterized Text2Cypher template cache for recognized question shapes
+
+Matches incoming agent questions against pre-validated Cypher templates that
+use the indexes from docs/implementation/neo4j-schema.cypher, so the common
+shapes never reach the Text2Cypher LLM:
+
+- "What is the pumping speed of DryPump P002?"  → pump_identifier_idx
+- "Which pumps are above 30% risk?"              → failure_prob_time_idx
+- "Which pumps are high risk?" / "risk class A"  → risk_time_idx
+- "Which pumps serve chamber CH2?"              → chamber_id_idx
+- "Which pumps are on tool PECVD_05?"          → tool_id_idx
+
+List questions that combine filters ("pumps in tool X with risk over 0.5",
+"pumps with more than 5% downtime") never match a template; they go to
+Text2Cypher rather than being answered with one filter dropped.
+
+Cypher generated by the LLM that executes successfully is generalized into a
+new template keyed by a normalized question signature (IDs and numbers become
+slots) and persisted, so the next question of the same shape is a cache hit.
+Only read-only Cypher in which every slot became a parameter is ever learned.
+
+USAGE:
+    templates = CypherTemplateLibrary(".cypher_templates.json")
+    answer = templates.answer(driver, question)       # None on a miss
+    if answer is None:
+        result = cypher_chain.invoke({"query": question})
+        templates.learn_from_chain(question, result)
+"""
+
+import json
+import os
+import re
+import threading
+
+from tool_cache import normalize_query
+
+DEFAULT_TEMPLATES_PATH = ".cypher_templates.json"
+
+# Question phrases → graph properties (property names are never taken from user text)
+PUMP_PROPERTIES = {
+    "pumping speed": "pumpingSpeed",
+    "speed": "pumpingSpeed",
+    "age": "currentAge",
+    "current age": "currentAge",
+    "criticality": "criticalityLevel",
+    "criticality level": "criticalityLevel",
+    "service role": "serviceRole",
+    "role": "serviceRole",
+    "operational status": "isOperational",
+    "status": "isOperational",
+    "operating hours": "operatingHours",
+    "model": "pumpModel",
+    "pump model": "pumpModel",
+    "manufacturer": "manufacturer",
+    "serial number": "serialNumber",
+    "ultimate vacuum": "ultimateVacuum",
+    "compression ratio": "compressionRatio",
+    "power consumption": "powerConsumption",
+    "installation date": "installationDate",
+    "last maintenance date": "lastMaintenanceDate",
+    "next scheduled maintenance": "nextScheduledMaintenance",
+}
+
+PREDICTION_PROPERTIES = {
+    "failure probability": "failureProbability",
+    "30-day failure probability": "failureProbability",
+    "thirty day failure probability": "failureProbability",
+    "risk": "riskScore",
+    "risk score": "riskScore",
+    "risk class": "riskClassification",
+    "risk classification": "riskClassification",
+}
+
+RUL_PROPERTIES = {
+    "rul": "remainingUsefulLife",
+    "remaining useful life": "remainingUsefulLife",
+    "health index": "healthIndex",
+    "health": "healthIndex",
+    "data quality score": "dataQualityScore",
+}
+
+PUMP_PROPERTY_QUERY = """
+MATCH (p:DryPump {pumpIdentifier: $pump_id})
+RETURN p.pumpIdentifier AS pump_id, $property AS property, p[$property] AS value
+"""
+
+# Undated nodes are skipped: DESC would sort their null timestamps first
+PREDICTION_PROPERTY_QUERY = """
+MATCH (p:DryPump {pumpIdentifier: $pump_id})-[:HAS_FAILURE_PREDICTION]->(pred:ThirtyDayFailureProbability)
+WHERE pred.predictionTimestamp IS NOT NULL
+RETURN p.pumpIdentifier AS pump_id, $property AS property, pred[$property] AS value,
+       pred.predictionTimestamp AS prediction_timestamp
+ORDER BY pred.predictionTimestamp DESC
+LIMIT 1
+"""
+
+RUL_PROPERTY_QUERY = """
+MATCH (p:DryPump {pumpIdentifier: $pump_id})-[:HAS_RUL_ASSESSMENT]->(rul:RemainingUsefulLife)
+WHERE rul.lastTelemetryUpdate IS NOT NULL
+RETURN p.pumpIdentifier AS pump_id, $property AS property, rul[$property] AS value,
+       rul.lastTelemetryUpdate AS last_telemetry_update
+ORDER BY rul.lastTelemetryUpdate DESC
+LIMIT 1
+"""
+
+# The latest dated prediction per pump is picked first and only then filtered, so a
+# pump whose old prediction was high but whose current one is low is not returned
+PUMPS_ABOVE_THRESHOLD_QUERY = """
+MATCH (p:DryPump)
+CALL {
+    WITH p
+    MATCH (p)-[:HAS_FAILURE_PREDICTION]->(pred:ThirtyDayFailureProbability)
+    WHERE pred.predictionTimestamp IS NOT NULL
+    RETURN pred AS latest ORDER BY pred.predictionTimestamp DESC LIMIT 1
+}
+WITH p, latest WHERE latest.failureProbability >= $threshold
+RETURN p.pumpIdentifier AS pump_id, latest.failureProbability AS failure_probability,
+       latest.riskClassification AS risk_classification,
+       latest.predictionTimestamp AS prediction_timestamp
+ORDER BY failure_probability DESC
+"""
+
+PUMPS_IN_RISK_CLASSES_QUERY = """
+MATCH (p:DryPump)
+CALL {
+    WITH p
+    MATCH (p)-[:HAS_FAILURE_PREDICTION]->(pred:ThirtyDayFailureProbability)
+    WHERE pred.predictionTimestamp IS NOT NULL
+    RETURN pred AS latest ORDER BY pred.predictionTimestamp DESC LIMIT 1
+}
+WITH p, latest WHERE latest.riskClassification IN $classes
+RETURN p.pumpIdentifier AS pump_id, latest.riskClassification AS risk_classification,
+       latest.failureProbability AS failure_probability,
+       latest.predictionTimestamp AS prediction_timestamp
+ORDER BY failure_probability DESC
+"""
+
+PUMPS_SERVING_CHAMBER_QUERY = """
+MATCH (c:ProcessChamber {chamberId: $chamber_id})<-[s:SERVES]-(p:DryPump)
+RETURN p.pumpIdentifier AS pump_id, p.serviceRole AS service_role,
+       p.isOperational AS is_operational, s.isPrimary AS is_primary
+ORDER BY pump_id
+"""
+
+PUMPS_ON_TOOL_QUERY = """
+MATCH (t:SemiconductorTool {toolId: $tool_id})<-[:PART_OF]-(c:ProcessChamber)<-[:SERVES]-(p:DryPump)
+RETURN p.pumpIdentifier AS pump_id, c.chamberId AS chamber_id,
+       p.serviceRole AS service_role, p.isOperational AS is_operational
+ORDER BY chamber_id, pump_id
+"""
+
+RISK_CLASS_WORDS = {
+    "critical": ["A"],
+    "high": ["A", "B"],
+    "high-risk": ["A", "B"],
+    "at-risk": ["A", "B", "C"],
+    "medium": ["C"],
+    "low": ["D", "E"],
+}
+
+WRITE_CLAUSE_PATTERN = re.compile(
+    r"\b(CREATE|MERGE|DELETE|DETACH|SET|REMOVE|DROP|FOREACH|LOAD\s+CSV|CALL\s+(?:dbms|apoc|db\.create))\b",
+    re.IGNORECASE,
+)
+
+SLOT_PATTERNS = (
+    ("pump_id", re.compile(r"\bP\d{2,}\b", re.IGNORECASE)),
+    ("chamber_id", re.compile(r"\bCH\d+\b", re.IGNORECASE)),
+    ("tool_id", re.compile(r"\b[A-Z][A-Z0-9]*_\d+\b")),
+    ("number", re.compile(r"(?<![\w.])\d+(?:\.\d+)?(?![\w.])")),
+)
+
+_PUMP = r"(?:dry\s*pump|vacuum\s+pump|pump)?\s*(?P<pump_id>P\d{2,})"
+PROPERTY_PATTERN = re.compile(
+    r"^(?:what\s+is|what's|whats|show(?:\s+me)?|get|give\s+me|tell\s+me)?\s*(?:the\s+)?(?:current\s+)?"
+    r"(?P<property>[a-z0-9\- ]+?)\s+(?:of|for)\s+(?:the\s+)?" + _PUMP + r"\b",
+    re.IGNORECASE,
+)
+POSSESSIVE_PATTERN = re.compile(
+    r"^(?:what\s+is|what's|whats|show(?:\s+me)?|get)?\s*(?:the\s+)?" + _PUMP +
+    r"(?:'s|s)?\s+(?P<property>[a-z0-9\- ]+?)$",
+    re.IGNORECASE,
+)
+# Threshold questions must be the whole question: a lead-in, one comparison whose
+# number is tied to a risk word ("risk of 0.3", "30% risk", "0.6 failure
+# probability") and nothing after it. "More than 5% downtime" or "in tool X with
+# risk over 0.5" carry another filter the template would silently drop.
+_RISK_WORD = r"(?:risk|failure\s+probability|probability|p_?30)"
+_COMPARISON = r"(?:above|over|exceeding|greater\s+than|more\s+than|>=?|at\s+least)"
+_PUMPS_LEAD = (
+    r"^(?:(?:which|what|show(?:\s+me)?|list|find|get|give\s+me)\s+)?(?:all\s+)?(?:the\s+)?"
+    r"(?:(?:dry|vacuum)\s+)?pumps?\s+(?:(?:that|which)\s+)?(?:(?:are|is|have|has|with|having)\s+)?"
+    r"(?:(?:an?|the)\s+)?(?:(?:30-day|thirty[\s-]day|current)\s+)?"
+)
+THRESHOLD_PATTERN = re.compile(
+    _PUMPS_LEAD + _COMPARISON + r"\s+(?:an?\s+)?"
+    r"(?:" + _RISK_WORD + r"\s+(?:threshold\s+)?(?:of\s+)?(?P<threshold>\d+(?:\.\d+)?)\s*(?P<percent>%|percent)?"
+    r"|(?P<value>\d+(?:\.\d+)?)\s*(?P<value_percent>%|percent)?\s+" + _RISK_WORD + r")$"
+)
+RISK_THRESHOLD_PATTERN = re.compile(
+    _PUMPS_LEAD + _RISK_WORD + r"\s+(?:is\s+|of\s+)?" + _COMPARISON + r"\s+"
+    r"(?P<value>\d+(?:\.\d+)?)\s*(?P<percent>%|percent)?$"
+)
+# Filter kinds a list question can mention; the list templates answer exactly one
+FILTER_KINDS = {
+    "risk": re.compile(r"\b(?:risk|probability|p_?30|critical|high-risk|at-risk)\b"),
+    "chamber": re.compile(r"\b(?:chambers?|ch\d+)\b"),
+    "tool": re.compile(r"\btools?\b"),
+    "other": re.compile(
+        r"\b(?:fab|area|downtime|utilization|uptime|age|(?<!-)days?|hours?|running|operational|speed"
+        r"|health|rul|temperature|pressure|vibration|model|manufacturer|installed|serviced"
+        r"|maintenance|role|criticality|backup|primary)\b"
+    ),
+}
+RISK_CLASS_PATTERN = re.compile(r"pumps?\b.*?\brisk\s+class(?:es|ification)?\s+(?P<classes>[a-e](?:\s*(?:,|or|and)\s*[a-e])*)\b")
+RISK_WORD_PATTERN = re.compile(r"\b(?P<word>critical|high-risk|high|at-risk|medium|low)\b(?:\s+risk)?\s+pumps?\b|pumps?\b.*?\b(?:are|at|with)\s+(?P<word2>critical|high|medium|low)\s+risk")
+CHAMBER_PATTERN = re.compile(r"pumps?\b.*?\b(?:serv(?:e|es|ing)|for|in|connected\s+to|attached\s+to)\s+(?:process\s+)?chamber\s+(?P<chamber_id>[a-z0-9_\-]+)")
+TOOL_PATTERN = re.compile(r"pumps?\b.*?\b(?:on|in|for|of|serving)\s+(?:semiconductor\s+)?tool\s+(?P<tool_id>[a-z0-9_\-]+)")
+
+
+def question_signature(question):
+    """Normalized question with IDs and numbers replaced by named slots"""
+    text = normalize_query(question)
+    original = re.sub(r"\s+", " ", str(question)).strip()
+    slots = {}
+    for name, pattern in SLOT_PATTERNS:
+        source = original if name == "tool_id" else text
+        for value in pattern.findall(source):
+            slot = name if name not in slots else f"{name}_{sum(k.startswith(name) for k in slots) + 1}"
+            slots[slot] = value.upper() if name in ("pump_id", "chamber_id") else value
+            text = re.sub(rf"(?<![\w.]){re.escape(value.lower())}(?![\w.])", "{" + slot + "}", text, count=1)
+    return text, slots
+
+
+def generalize_cypher(cypher, slots):
+    """Replace literal slot values in Cypher with $parameters"""
+    for slot, value in slots.items():
+        if slot.startswith("number"):
+            # Only numbers used as comparison operands or row counts become parameters
+            cypher = re.sub(rf"([<>=]\s*|\b(?:LIMIT|SKIP)\s+){re.escape(value)}(?![\w.])",
+                            rf"\g<1>${slot}", cypher, flags=re.IGNORECASE)
+        else:
+            cypher = re.sub(rf"(['\"]){re.escape(value)}\1", f"${slot}", cypher, flags=re.IGNORECASE)
+    return cypher
+
+
+def is_read_only(cypher):
+    return not WRITE_CLAUSE_PATTERN.search(cypher)
+
+
+def format_template_result(match, records):
+    """Render template results like the Text2Cypher tool output"""
+    rows = "\n".join(f"- {record}" for record in records) or "No matching records found."
+    return f"""**Generated Cypher Query:** (template: {match['name']})
+```cypher
+{match['cypher'].strip()}
+```
+
+**Parameters:** {match['params']}
+
+**Results:**
+{rows}"""
+
+
+class CypherTemplateLibrary:
+    """Built-in and learned Cypher templates keyed by question shape"""
+
+    def __init__(self, path=DEFAULT_TEMPLATES_PATH):
+        self.path = path
+        self.learned = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.learned = json.load(f)
+
+    def save(self):
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.learned, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def _builtin(self, question):
+        text = normalize_query(question)
+
+        for pattern in (PROPERTY_PATTERN, POSSESSIVE_PATTERN):
+            m = pattern.search(text)
+            if m:
+                phrase = m.group("property").strip()
+                pump_id = m.group("pump_id").upper()
+                for properties, cypher, name in (
+                    (PUMP_PROPERTIES, PUMP_PROPERTY_QUERY, "pump_property"),
+                    (PREDICTION_PROPERTIES, PREDICTION_PROPERTY_QUERY, "prediction_property"),
+                    (RUL_PROPERTIES, RUL_PROPERTY_QUERY, "rul_property"),
+                ):
+                    if phrase in properties:
+                        return name, cypher, {"pump_id": pump_id, "property": properties[phrase]}
+
+        # Below here every template lists pumps for one filter; more than one is left to the LLM
+        kinds = {kind for kind, pattern in FILTER_KINDS.items() if pattern.search(text)}
+        if len(kinds) > 1:
+            return None
+
+        m = THRESHOLD_PATTERN.search(text) or RISK_THRESHOLD_PATTERN.search(text)
+        if m:
+            groups = m.groupdict()
+            threshold = float(groups.get("threshold") or groups["value"])
+            if groups.get("percent") or groups.get("value_percent") or threshold > 1:
+                threshold /= 100.0
+            if 0 <= threshold <= 1:
+                return "pumps_above_threshold", PUMPS_ABOVE_THRESHOLD_QUERY, {"threshold": threshold}
+
+        m = RISK_CLASS_PATTERN.search(text)
+        if m:
+            classes = sorted({c.upper() for c in re.findall(r"[a-e]", m.group("classes"))})
+            return "pumps_in_risk_classes", PUMPS_IN_RISK_CLASSES_QUERY, {"classes": classes}
+
+        m = RISK_WORD_PATTERN.search(text)
+        if m:
+            word = m.group("word") or m.group("word2")
+            return "pumps_in_risk_classes", PUMPS_IN_RISK_CLASSES_QUERY, {"classes": RISK_CLASS_WORDS[word]}
+
+        m = CHAMBER_PATTERN.search(text)
+        if m:
+            return "pumps_serving_chamber", PUMPS_SERVING_CHAMBER_QUERY, {"chamber_id": m.group("chamber_id").upper()}
+
+        m = TOOL_PATTERN.search(text)
+        if m:
+            return "pumps_on_tool", PUMPS_ON_TOOL_QUERY, {"tool_id": m.group("tool_id").upper()}
+
+        return None
+
+    def match(self, question):
+        """Return {name, cypher, params, source} for a recognized question, else None"""
+        builtin = self._builtin(question)
+        if builtin:
+            name, cypher, params = builtin
+            self.hits += 1
+            return {"name": name, "cypher": cypher, "params": params, "source": "builtin"}
+
+        signature, slots = question_signature(question)
+        learned = self.learned.get(signature)
+        if learned:
+            params = {slot: slots[slot] for slot in learned["slots"] if slot in slots}
+            for slot, value in params.items():
+                if slot.startswith("number"):
+                    params[slot] = float(value) if "." in value else int(value)
+            self.hits += 1
+            return {"name": f"learned:{signature}", "cypher": learned["cypher"],
+                    "params": params, "source": "learned"}
+
+        self.misses += 1
+        return None
+
+    def learn(self, question, cypher):
+        """Store successfully executed LLM Cypher as a template for this question shape"""
+        if not cypher or not is_read_only(cypher):
+            return False
+        signature, slots = question_signature(question)
+        template = generalize_cypher(cypher, slots)
+        # A slot left as a literal would answer every later question of this shape
+        # with this question's value ("top 10" served the "top 5" Cypher)
+        if any(not re.search(rf"\${slot}(?!\w)", template) for slot in slots):
+            return False
+        with self._lock:
+            self.learned[signature] = {"cypher": template, "slots": list(slots), "example": question}
+            self.save()
+        return True
+
+    def learn_from_chain(self, question, result):
+        """Learn from a GraphCypherQAChain result that returned context rows"""
+        steps = result.get("intermediate_steps") or []
+        if len(steps) >= 2 and steps[1].get("context"):
+            return self.learn(question, steps[0].get("query"))
+        return False
+
+    def run(self, driver, match, database=None):
+        """Execute a matched template in a read transaction"""
+        def read(tx):
+            return tx.run(match["cypher"], **match["params"]).data()
+
+        with driver.session(database=database) as session:
+            return session.execute_read(read)
+
+    def answer(self, driver, question, database=None):
+        """Formatted template answer, or None when the LLM should handle the question"""
+        match = self.match(question)
+        if match is None:
+            return None
+        try:
+            records = self.run(driver, match, database)
+        except Exception:
+            # A learned template that no longer runs is dropped and the LLM takes over
+            if match["source"] == "learned":
+                with self._lock:
+                    self.learned.pop(match["name"].split(":", 1)[1], None)
+                    self.save()
+                return None
+            raise
+        if not records and match["source"] == "learned":
+            return None
+        return format_template_result(match, records)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "learned_templates": len(self.learned),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,88 @@
+"""
+embedding_cache.py
+Persistent content-hash → embedding cache backed by SQLite
+
+Embedding texts built by SemanticVectorizer.step2_create_embedding_texts are
+hashed (SHA-256 over model name + text) and their vectors stored as float32
+blobs, so unchanged concepts are never sent to the embedding API twice.
+
+USAGE:
+    cache = EmbeddingCache(".embedding_cache.sqlite", model="text-embedding-ada-002")
+    hashes = [cache.text_hash(text) for text in texts]
+    cached = cache.get_many(hashes)
+    cache.put_many({h: vector for h, vector in new_vectors.items()})
+"""
+
+import hashlib
+import sqlite3
+
+import numpy as np
+
+DEFAULT_CACHE_PATH = ".embedding_cache.sqlite"
+
+
+def content_hash(text, model=""):
+    """SHA-256 hex digest of an embedding text (scoped to the embedding model)"""
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed map of content hash → float32 embedding vector"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, model=""):
+        self.path = path
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                text_hash TEXT PRIMARY KEY,
+                dimensions INTEGER NOT NULL,
+                vector BLOB NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def text_hash(self, text):
+        """Hash an embedding text for this cache's model"""
+        return content_hash(text, self.model)
+
+    def get_many(self, hashes):
+        """Return {hash: vector} for every hash present in the cache"""
+        found = {}
+        hashes = list(dict.fromkeys(hashes))
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT text_hash, vector FROM embeddings WHERE text_hash IN ({placeholders})",
+                chunk,
+            )
+            for text_hash, blob in rows:
+                found[text_hash] = np.frombuffer(blob, dtype=np.float32).tolist()
+        self.hits += len(found)
+        self.misses += len(hashes) - len(found)
+        return found
+
+    def put_many(self, vectors):
+        """Store {hash: vector} pairs, replacing existing entries"""
+        rows = [
+            (text_hash, len(vector), np.asarray(vector, dtype=np.float32).tobytes())
+            for text_hash, vector in vectors.items()
+        ]
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (text_hash, dimensions, vector) VALUES (?, ?, ?)",
+            rows,
+        )
+        self._conn.commit()
+
+    def __len__(self):
+        return self._conn.execute("SELECT count(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        """Close the SQLite connection"""
+        self._conn.close()
@@ -0,0 +1,169 @@
+"""
+embedding_scheduler.py
+Batched, concurrent embedding scheduler with token-budget pacing and retries
+
+Splits a corpus into fixed-size batches and sends them to any
+`embed_documents(texts) -> vectors` callable (OpenAIEmbeddings, or the local
+stub in stub_embedding_server.py) from a bounded thread pool:
+
+- Token-budget pacing: a token bucket holds requests under tokens_per_minute
+- Per-batch retry: exponential backoff with jitter, failed batches never sink
+  the rest of the run
+- Checkpointing: each finished batch is written to the EmbeddingCache, so an
+  interrupted run resumes with only the unfinished batches
+- Throughput: stats report texts/sec for every run, counting only texts that
+  were actually embedded (cache hits would otherwise inflate the rate)
+
+USAGE:
+    scheduler = EmbeddingScheduler(embeddings.embed_documents, batch_size=100,
+                                   max_concurrency=4, cache=EmbeddingCache())
+    vectors = scheduler.embed(texts)
+    print(scheduler.stats["texts_per_second"])
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import random
+import threading
+import time
+
+
+def estimate_tokens(text):
+    """Rough token estimate (~4 characters per token for English text)"""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at tokens_per_minute"""
+
+    def __init__(self, tokens_per_minute):
+        self.capacity = float(tokens_per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens):
+        """Block until `tokens` are available (oversized requests wait for a full bucket)"""
+        tokens = min(float(tokens), self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class EmbeddingScheduler:
+    """Embed large corpora in paced, retried, checkpointed batches"""
+
+    def __init__(self, embed_documents, batch_size=100, max_concurrency=4,
+                 tokens_per_minute=None, max_retries=5, backoff_base=1.0,
+                 backoff_max=60.0, cache=None):
+        if batch_size < 1 or max_concurrency < 1:
+            raise ValueError("batch_size and max_concurrency must be >= 1")
+        self.embed_documents = embed_documents
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.cache = cache
+        self.stats = {}
+        self._retries = 0
+        self._lock = threading.Lock()
+
+    def _run_batch(self, texts):
+        """Embed one batch, pacing against the token budget and retrying on failure"""
+        if self.bucket:
+            self.bucket.acquire(sum(estimate_tokens(text) for text in texts))
+
+        attempt = 0
+        while True:
+            try:
+                vectors = self.embed_documents(texts)
+                if len(vectors) != len(texts):
+                    raise ValueError(f"Expected {len(texts)} embeddings, got {len(vectors)}")
+                return vectors
+            except Exception:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                with self._lock:
+                    self._retries += 1
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+                time.sleep(delay * random.uniform(0.5, 1.0))
+
+    def embed(self, texts):
+        """Return one vector per text, embedding only texts missing from the checkpoint cache"""
+        started = time.perf_counter()
+        texts = list(texts)
+        vectors = [None] * len(texts)
+        self._retries = 0
+
+        # Identical texts are embedded once and fanned out afterwards
+        positions = {}
+        for i, text in enumerate(texts):
+            positions.setdefault(text, []).append(i)
+
+        hashes = {}
+        if self.cache is not None:
+            hashes = {text: self.cache.text_hash(text) for text in positions}
+            cached = self.cache.get_many(hashes.values())
+            for text, text_hash in hashes.items():
+                if text_hash in cached:
+                    for i in positions[text]:
+                        vectors[i] = cached[text_hash]
+
+        pending = [text for text in positions if vectors[positions[text][0]] is None]
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+
+        failures = []
+        embedded = 0
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            futures = {pool.submit(self._run_batch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    batch_vectors = future.result()
+                except Exception as e:
+                    failures.append(e)
+                    continue
+                embedded += len(batch)
+                for text, vector in zip(batch, batch_vectors):
+                    for i in positions[text]:
+                        vectors[i] = vector
+                # Checkpoint: completed batches survive an interrupted run
+                if self.cache is not None:
+                    self.cache.put_many({hashes[text]: v for text, v in zip(batch, batch_vectors)})
+
+        elapsed = time.perf_counter() - started
+        self.stats = {
+            "texts": len(texts),
+            "unique_texts": len(positions),
+            "cached": len(positions) - len(pending),
+            "embedded": embedded,
+            "batches": len(batches),
+            "failed_batches": len(failures),
+            "retries": self._retries,
+            "elapsed_seconds": elapsed,
+            "texts_per_second": embedded / elapsed if elapsed > 0 else float("inf"),
+        }
+
+        if failures:
+            raise RuntimeError(
+                f"{len(failures)} of {len(batches)} embedding batches failed "
+                f"(completed batches were checkpointed): {failures[0]}"
+            ) from failures[0]
+        return vectors
+
+    def report(self):
+        """Print throughput statistics for the last run"""
+        stats = self.stats
+        print(f"   📈 Embedded {stats['embedded']} texts in {stats['batches']} batches "
+              f"({stats['cached']} from cache, {stats['retries']} retries)")
+        print(f"   ⏱️  {stats['elapsed_seconds']:.2f}s - {stats['texts_per_second']:.1f} texts/sec")
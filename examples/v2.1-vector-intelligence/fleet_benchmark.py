@@ -0,0 +1,420 @@
+"""
+fleet_benchmark.py
+Benchmark harness for the bulk-load, vectorization, retrieval and hazard paths
+
+Generates synthetic fleets (synthetic_fleet.py) at each requested scale, embeds
+the concept layer with the deterministic FakeEmbeddings model and measures:
+
+- bulk_load        per-chunk UNWIND write latency, entities/sec
+- embedding        per-batch embed_documents latency, texts/sec
+- fleet_recompute  full λ_W / λ_R / H_30 / P_30 recompute (+ write-back), pumps/sec
+- vector_topk      top-k vector query latency, queries/sec
+- hybrid           vector top-k + 2-hop graph expansion latency, queries/sec
+
+Each operation reports count, mean, p50, p95, p99 (ms) and throughput. Two
+backends are available: "memory" (NumPy / dict stand-in, no database needed)
+and "neo4j" (BulkGraphWriter, db.index.vector.queryNodes, HybridRetriever and
+FleetHazardEngine against a live database). Results are written as JSON so
+releases can be compared with --compare.
+
+The neo4j backend deletes all syntheticFleet nodes before each scale and
+recomputes predictions for every pump in the database - point it at a
+dedicated benchmark database.
+
+SETUP:
+1. Install: pip install -r requirements.txt
+2. Run: python fleet_benchmark.py                          # memory, 1k/10k/100k
+        python fleet_benchmark.py --backend neo4j --scales 1000,10000
+        python fleet_benchmark.py --compare old.json new.json
+"""
+
+from datetime import datetime, timezone
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+from bulk_graph_writer import (
+    AREA_QUERY, CHAMBER_QUERY, FAB_QUERY, PUMP_QUERY, RUL_QUERY, TOOL_QUERY, WEIBULL_QUERY,
+    BulkGraphWriter, entity_rows,
+)
+from fleet_hazard import FleetHazardEngine, compute_fleet_hazard
+from hybrid_retrieval import HybridRetriever
+from stub_embedding_server import FakeEmbeddings
+from synthetic_fleet import fleet_arrays, generate_fleet, query_texts
+
+BENCHMARK_VERSION = 1
+DEFAULT_SCALES = (1000, 10000, 100000)
+BENCHMARK_INDEX_NAME = "benchmark_vector_index"
+OPERATIONS = ("bulk_load", "embedding", "fleet_recompute", "vector_topk", "hybrid")
+
+# (label, query, entities key, key property, parent property)
+LOAD_STEPS = (
+    ("Fab", FAB_QUERY, "fabs", "fabId", None),
+    ("FabArea", AREA_QUERY, "areas", "areaId", "fabId"),
+    ("SemiconductorTool", TOOL_QUERY, "tools", "toolId", "areaId"),
+    ("ProcessChamber", CHAMBER_QUERY, "chambers", "chamberId", "toolId"),
+    ("DryPump", PUMP_QUERY, "pumps", "pumpIdentifier", "chamberId"),
+    ("WeibullSurvivalFunction", WEIBULL_QUERY, "weibull_models", "modelId", "pumpIdentifier"),
+    ("RemainingUsefulLife", RUL_QUERY, "rul_assessments", "rulId", "pumpIdentifier"),
+)
+
+
+def summarize(latencies, items=None, elapsed=None):
+    """Latency percentiles (ms) and throughput for one benchmarked operation"""
+    latencies = np.asarray(latencies, dtype=np.float64)
+    if latencies.size == 0:
+        return {"count": 0}
+    elapsed = float(latencies.sum()) if elapsed is None else elapsed
+    items = latencies.size if items is None else items
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        "count": int(latencies.size),
+        "items": int(items),
+        "mean_ms": round(float(latencies.mean()) * 1000, 4),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "throughput_per_sec": round(items / elapsed, 2) if elapsed else None,
+    }
+
+
+def timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+class MemoryBackend:
+    """In-process stand-in: dict-backed graph, brute-force cosine top-k, NumPy hazard"""
+
+    name = "memory"
+
+    def reset(self):
+        self.nodes = {}
+        self.parents = {}
+        self.vectors = None
+        self.concepts = []
+        self.concept_pumps = {}
+        self.pump_rul = {}
+        self.fleet = None
+        self.predictions = {}
+
+    def write_chunk(self, label, query, rows):
+        nodes = self.nodes.setdefault(label, {})
+        for row in rows:
+            nodes.setdefault(row["key"], {}).update(row["props"])
+            if row["parent"] is not None:
+                self.parents[(label, row["key"])] = row["parent"]
+
+    def index_vectors(self, fleet, vectors):
+        self.concepts = fleet["concepts"]
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+        self.concept_pumps = {}
+        for pump_id, concept_id in fleet["pump_concepts"].items():
+            self.concept_pumps.setdefault(concept_id, []).append(pump_id)
+        self.pump_rul = {
+            pump_id: rul_id for (label, rul_id), pump_id in self.parents.items()
+            if label == "RemainingUsefulLife"
+        }
+
+    def recompute(self, fleet):
+        if self.fleet is None:
+            self.fleet = fleet_arrays(fleet)
+        arrays = self.fleet
+        results = compute_fleet_hazard(
+            arrays["weibull_shape"], arrays["weibull_scale"], arrays["current_age"],
+            arrays["remaining_useful_life"], arrays["blending_weight"],
+        )
+        self.predictions = dict(zip(
+            arrays["pump_id"],
+            zip(results["failure_probability"].tolist(), results["risk_classification"].tolist()),
+        ))
+        return len(arrays["pump_id"])
+
+    def vector_topk(self, embedding, k):
+        scores = self.vectors @ np.asarray(embedding, dtype=np.float32)
+        top = np.argpartition(-scores, min(k, len(scores) - 1))[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.concepts[i]["conceptId"], (1.0 + float(scores[i])) / 2.0) for i in top]
+
+    def hybrid(self, embedding, k):
+        pumps = self.nodes["DryPump"]
+        ruls = self.nodes["RemainingUsefulLife"]
+        hits = []
+        for concept_id, score in self.vector_topk(embedding, k):
+            equipment = []
+            for pump_id in self.concept_pumps.get(concept_id, ()):
+                chamber_id = self.parents.get(("DryPump", pump_id))
+                probability, risk = self.predictions.get(pump_id, (None, None))
+                rul = ruls.get(self.pump_rul.get(pump_id), {})
+                equipment.append({
+                    "equipment_id": pump_id,
+                    "is_operational": pumps[pump_id].get("isOperational"),
+                    "health_index": rul.get("healthIndex"),
+                    "remaining_useful_life": rul.get("remainingUsefulLife"),
+                    "failure_probability": probability,
+                    "risk_classification": risk,
+                    "chamber_id": chamber_id,
+                    "tool_id": self.parents.get(("ProcessChamber", chamber_id)),
+                })
+            hits.append({"concept_id": concept_id, "score": score, "equipment": equipment})
+        return hits
+
+    def close(self):
+        pass
+
+
+class Neo4jBackend:
+    """Live database: BulkGraphWriter, vector index queries, HybridRetriever, FleetHazardEngine"""
+
+    name = "neo4j"
+
+    CLEANUP_DERIVED_QUERY = """
+    MATCH (:DryPump {syntheticFleet: true})-[:HAS_HAZARD_CALCULATION|HAS_FAILURE_PREDICTION]->(n)
+    CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS
+    """
+
+    CLEANUP_QUERY = """
+    MATCH (n) WHERE n.syntheticFleet = true
+    CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS
+    """
+
+    VECTOR_QUERY = """
+    UNWIND $rows AS row
+    CREATE (sc:SemanticConcept {conceptId: row.conceptId, label: row.label,
+                                definition: row.definition, domain: row.domain,
+                                syntheticFleet: true})
+    CREATE (sv:SemanticVector {id: row.conceptId, concept_id: row.conceptId, label: row.label,
+                               domain: row.domain, text: row.text, syntheticFleet: true})
+    SET sv.embedding = row.embedding
+    CREATE (sv)-[:VECTOR_REPRESENTATION_OF]->(sc)
+    """
+
+    SEMANTIC_TYPE_QUERY = """
+    UNWIND $rows AS row
+    MATCH (p:DryPump {pumpIdentifier: row.pump_id})
+    MATCH (sc:SemanticConcept {conceptId: row.concept_id})
+    MERGE (p)-[:HAS_SEMANTIC_TYPE]->(sc)
+    """
+
+    TOPK_QUERY = """
+    CALL db.index.vector.queryNodes($index_name, $k, $embedding) YIELD node, score
+    RETURN node.concept_id AS concept_id, score
+    """
+
+    def __init__(self, driver, chunk_size=1000, database=None):
+        self.driver = driver
+        self.database = database
+        self.writer = BulkGraphWriter(driver, chunk_size=chunk_size, database=database)
+        self.engine = FleetHazardEngine(driver, chunk_size=chunk_size, database=database)
+        self.retriever = HybridRetriever(driver, None, index_name=BENCHMARK_INDEX_NAME,
+                                         database=database)
+
+    def reset(self):
+        with self.driver.session(database=self.database) as session:
+            session.run(self.CLEANUP_DERIVED_QUERY).consume()
+            session.run(self.CLEANUP_QUERY).consume()
+            session.run(f"DROP INDEX {BENCHMARK_INDEX_NAME} IF EXISTS").consume()
+            session.run(
+                "CREATE INDEX semantic_concept_id_idx IF NOT EXISTS "
+                "FOR (sc:SemanticConcept) ON (sc.conceptId)"
+            ).consume()
+        self.writer.ensure_constraints()
+
+    def write_chunk(self, label, query, rows):
+        self.writer.write(query, rows)
+
+    def index_vectors(self, fleet, vectors):
+        rows = [dict(concept, embedding=vector) for concept, vector in zip(fleet["concepts"], vectors)]
+        self.writer.write(self.VECTOR_QUERY, rows)
+        self.writer.write(self.SEMANTIC_TYPE_QUERY, [
+            {"pump_id": pump_id, "concept_id": concept_id}
+            for pump_id, concept_id in fleet["pump_concepts"].items()
+        ])
+        with self.driver.session(database=self.database) as session:
+            # Schema commands do not accept parameters in OPTIONS
+            session.run(
+                f"CREATE VECTOR INDEX {BENCHMARK_INDEX_NAME} IF NOT EXISTS "
+                "FOR (sv:SemanticVector) ON (sv.embedding) "
+                f"OPTIONS {{indexConfig: {{`vector.dimensions`: {int(len(vectors[0]))}, "
+                "`vector.similarity_function`: 'cosine'}}"
+            ).consume()
+            session.run("CALL db.awaitIndexes(600)").consume()
+
+    def recompute(self, fleet):
+        arrays = self.engine.load_fleet()
+        results = self.engine.compute(arrays)
+        self.engine.write_predictions(arrays, results)
+        return len(arrays["pump_id"])
+
+    def vector_topk(self, embedding, k):
+        with self.driver.session(database=self.database) as session:
+            records = session.run(self.TOPK_QUERY, index_name=BENCHMARK_INDEX_NAME,
+                                  k=k, embedding=embedding)
+            return [(record["concept_id"], record["score"]) for record in records]
+
+    def hybrid(self, embedding, k):
+        return self.retriever.search_by_vector(embedding, k)
+
+    def close(self):
+        self.driver.close()
+
+
+def run_scale(backend, pumps, queries=200, k=10, dimensions=1536, chunk_size=1000,
+              embedding_batch_size=100, recompute_runs=3):
+    """Benchmark every operation for one fleet size"""
+    print(f"\n📏 Scale: {pumps} pumps ({backend.name} backend)")
+    fleet = generate_fleet(pumps)
+    backend.reset()
+    results = {}
+
+    # Bulk load: one latency sample per UNWIND chunk
+    latencies, entities = [], 0
+    started = time.perf_counter()
+    for label, query, key, key_property, parent_property in LOAD_STEPS:
+        rows = entity_rows(fleet["entities"][key], key_property, parent_property)
+        for start in range(0, len(rows), chunk_size):
+            elapsed, _ = timed(backend.write_chunk, label, query, rows[start:start + chunk_size])
+            latencies.append(elapsed)
+        entities += len(rows)
+    results["bulk_load"] = summarize(latencies, entities, time.perf_counter() - started)
+
+    # Embedding: deterministic fake model, one latency sample per batch
+    embeddings = FakeEmbeddings(dimensions)
+    texts = [concept["text"] for concept in fleet["concepts"]]
+    latencies, vectors = [], []
+    for start in range(0, len(texts), embedding_batch_size):
+        elapsed, batch = timed(embeddings.embed_documents, texts[start:start + embedding_batch_size])
+        latencies.append(elapsed)
+        vectors.extend(batch)
+    results["embedding"] = summarize(latencies, len(texts))
+    backend.index_vectors(fleet, vectors)
+
+    # Fleet-wide P_30 recompute: one latency sample per full pass
+    latencies, recomputed = [], 0
+    for _ in range(recompute_runs):
+        elapsed, count = timed(backend.recompute, fleet)
+        latencies.append(elapsed)
+        recomputed += count
+    results["fleet_recompute"] = summarize(latencies, recomputed)
+
+    # Query paths: embed queries up front so only retrieval is timed
+    query_vectors = embeddings.embed_documents(query_texts(queries))
+    for name, search in (("vector_topk", backend.vector_topk), ("hybrid", backend.hybrid)):
+        search(query_vectors[0], k)  # warm-up
+        latencies = [timed(search, vector, k)[0] for vector in query_vectors]
+        results[name] = summarize(latencies)
+
+    for name in OPERATIONS:
+        r = results[name]
+        print(f"   {name:<16} p50 {r['p50_ms']:>9.3f}ms  p95 {r['p95_ms']:>9.3f}ms  "
+              f"p99 {r['p99_ms']:>9.3f}ms  {r['throughput_per_sec']:>12.1f}/s")
+    return results
+
+
+def run_benchmarks(backend, scales=DEFAULT_SCALES, **options):
+    """Run every scale and return the JSON-serializable result document"""
+    document = {
+        "suite": "fleet_benchmark",
+        "benchmark_version": BENCHMARK_VERSION,
+        "backend": backend.name,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+        },
+        "config": dict(options, scales=list(scales)),
+        "results": {},
+    }
+    for pumps in scales:
+        document["results"][str(pumps)] = run_scale(backend, pumps, **options)
+    return document
+
+
+def save_results(document, path=None):
+    if path is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        path = os.path.join("benchmark_results", f"fleet_benchmark_{document['backend']}_{stamp}.json")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+    return path
+
+
+def compare_results(baseline, current):
+    """Print p50/p95 ratios (current / baseline) for every shared scale and operation"""
+    print(f"\n⚖️  {baseline['backend']} @ {baseline['started_at']}  →  "
+          f"{current['backend']} @ {current['started_at']}")
+    for scale, operations in current["results"].items():
+        if scale not in baseline["results"]:
+            continue
+        print(f"\n   {scale} pumps")
+        for name, now in operations.items():
+            before = baseline["results"][scale].get(name)
+            if not before or not before.get("count"):
+                continue
+            ratios = [
+                now[m] / before[m] if before[m] else float("nan") for m in ("p50_ms", "p95_ms")
+            ]
+            flag = "🔺" if ratios[0] > 1.1 else "🔻" if ratios[0] < 0.9 else "  "
+            print(f"   {flag} {name:<16} p50 x{ratios[0]:.2f}  p95 x{ratios[1]:.2f}")
+
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+if __name__ == "__main__":
+    def argument(flag, default=None):
+        return sys.argv[sys.argv.index(flag) + 1] if flag in sys.argv else default
+
+    if "--compare" in sys.argv:
+        i = sys.argv.index("--compare")
+        with open(sys.argv[i + 1]) as f:
+            baseline = json.load(f)
+        with open(sys.argv[i + 2]) as f:
+            current = json.load(f)
+        compare_results(baseline, current)
+        sys.exit(0)
+
+    scales = [int(s) for s in argument("--scales", ",".join(map(str, DEFAULT_SCALES))).split(",")]
+    options = {
+        "queries": int(argument("--queries", 200)),
+        "k": int(argument("--k", 10)),
+        "dimensions": int(argument("--dimensions", 1536)),
+    }
+
+    if argument("--backend", "memory") == "neo4j":
+        from dotenv import load_dotenv
+        from neo4j import GraphDatabase
+
+        load_dotenv()
+        password = os.getenv("NEO4J_PASSWORD")
+        if not password:
+            print("❌ ERROR: NEO4J_PASSWORD is not set - create a .env file first")
+            sys.exit(1)
+        backend = Neo4jBackend(
+            GraphDatabase.driver(
+                os.getenv("NEO4J_URI", "neo4j://localhost:7687"),
+                auth=(os.getenv("NEO4J_USERNAME", "neo4j"), password),
+            ),
+            database=argument("--database"),
+        )
+    else:
+        backend = MemoryBackend()
+
+    print("\n🏁 Fleet benchmark")
+    try:
+        document = run_benchmarks(backend, scales, **options)
+    finally:
+        backend.close()
+    path = save_results(document, argument("--output"))
+    print(f"\n💾 Results saved to {path}")
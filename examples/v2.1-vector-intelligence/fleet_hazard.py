@@ -0,0 +1,354 @@
+"""
+fleet_hazard.py
+Vectorized fleet-wide blended-hazard engine for 30-day failure probabilities
+
+Computes the v1.0 mathematical chain for every DryPump in one batched NumPy pass:
+
+    λ_W(t) = ((t+30)^ρ - t^ρ)/β^ρ          [Weibull cumulative hazard]
+    λ_R(t) = 30/RUL(t)                     [Condition cumulative hazard]
+    H_30(t) = λ_W(t) + k·λ_R(t)            [Blended hazard]
+    P_30(t) = 1 - exp[-H_30(t)]            [30-day failure probability]
+
+λ_W is evaluated in log space as (t/β)^ρ · expm1(ρ·log1p(30/t)), so large
+ages neither overflow the power terms nor lose precision to cancellation.
+Results are written back as BlendedHazardFunction and
+ThirtyDayFailureProbability nodes in chunked UNWIND transactions.
+
+SETUP:
+1. Create .env file with NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD
+2. Install: pip install -r requirements.txt
+3. Run: python fleet_hazard.py [--dry-run] [--history] [--rollups]
+
+--history keeps only the newest prediction per pump as a node and moves the
+rest into day buckets (see prediction_history.py).
+--rollups keeps the chamber/tool/area/fab risk rollups and the top-K
+leaderboard current (see risk_rollups.py).
+"""
+
+from datetime import datetime, timezone
+import os
+import sys
+import time
+
+import numpy as np
+
+from bulk_graph_writer import BulkGraphWriter
+
+DEFAULT_HORIZON_DAYS = 30.0
+DEFAULT_BLENDING_WEIGHT = 0.3
+CALCULATION_METHOD = "BlendedHazard_Vectorized_v1.0"
+
+# Risk classes from the ontology: A ≥ 0.80, B ≥ 0.60, C ≥ 0.30, D ≥ 0.10, else E
+RISK_THRESHOLDS = ((0.8, "A"), (0.6, "B"), (0.3, "C"), (0.1, "D"))
+
+
+def weibull_cumulative_hazard(age, shape, scale, horizon=DEFAULT_HORIZON_DAYS):
+    """Weibull cumulative hazard λ_W over [age, age + horizon], evaluated in log space"""
+    age = np.asarray(age, dtype=np.float64)
+    shape = np.asarray(shape, dtype=np.float64)
+    scale = np.asarray(scale, dtype=np.float64)
+
+    with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+        # (t/β)^ρ · ((1 + h/t)^ρ - 1), valid for t > 0
+        log_base = shape * (np.log(age) - np.log(scale))
+        increment = np.expm1(shape * np.log1p(horizon / age))
+        aged = np.exp(log_base) * increment
+        # A brand-new pump reduces to (h/β)^ρ
+        new = np.exp(shape * (np.log(horizon) - np.log(scale)))
+
+    return np.where(age > 0, aged, new)
+
+
+def condition_hazard(remaining_useful_life, horizon=DEFAULT_HORIZON_DAYS):
+    """Condition cumulative hazard λ_R = horizon / RUL (infinite at RUL = 0)"""
+    rul = np.asarray(remaining_useful_life, dtype=np.float64)
+    with np.errstate(divide="ignore"):
+        return horizon / rul
+
+
+def classify_risk(failure_probability):
+    """Map failure probabilities to the A-E risk classification"""
+    probability = np.asarray(failure_probability, dtype=np.float64)
+    conditions = [probability >= threshold for threshold, _ in RISK_THRESHOLDS]
+    labels = [label for _, label in RISK_THRESHOLDS]
+    return np.select(conditions, labels, default="E")
+
+
+def compute_fleet_hazard(shape, scale, age, remaining_useful_life, blending_weight,
+                         horizon=DEFAULT_HORIZON_DAYS):
+    """
+    Compute λ_W, λ_R, H_30 and P_30 for a whole fleet in one pass.
+
+    All inputs are broadcastable array-likes (one entry per pump).
+
+    Returns:
+        Dict of NumPy arrays: weibull_hazard, condition_hazard, blended_hazard,
+        failure_probability and risk_classification
+    """
+    shape = np.asarray(shape, dtype=np.float64)
+    scale = np.asarray(scale, dtype=np.float64)
+    age = np.asarray(age, dtype=np.float64)
+    rul = np.asarray(remaining_useful_life, dtype=np.float64)
+    k = np.asarray(blending_weight, dtype=np.float64)
+
+    # NaN passes every comparison below and would come out as risk class E
+    if not all(np.all(np.isfinite(values)) for values in (shape, scale, age, rul, k)):
+        raise ValueError("Hazard inputs must be finite (missing currentAge, Weibull or RUL values?)")
+    if np.any(shape <= 0) or np.any(scale <= 0):
+        raise ValueError("Weibull shape and scale must be > 0")
+    if np.any(age < 0) or np.any(rul < 0):
+        raise ValueError("currentAge and remainingUsefulLife must be >= 0")
+    if np.any((k < 0) | (k > 1)):
+        raise ValueError("blendingWeight must be in [0, 1]")
+
+    weibull = weibull_cumulative_hazard(age, shape, scale, horizon)
+    condition = condition_hazard(rul, horizon)
+    # k = 0 switches the condition term off even when RUL = 0
+    with np.errstate(invalid="ignore"):
+        blended = weibull + np.where(k > 0, k * condition, 0.0)
+    probability = -np.expm1(-blended)
+
+    return {
+        "weibull_hazard": weibull,
+        "condition_hazard": condition,
+        "blended_hazard": blended,
+        "failure_probability": probability,
+        "risk_classification": classify_risk(probability),
+    }
+
+
+class FleetHazardEngine:
+    """Load fleet inputs from Neo4j, compute P_30 in bulk and write predictions back"""
+
+    # Undated nodes are skipped in each "latest" subquery: DESC sorts nulls first
+    LOAD_FLEET_QUERY = """
+    MATCH (p:DryPump)
+    CALL {
+        WITH p
+        MATCH (p)-[sm:HAS_SURVIVAL_MODEL]->(w:WeibullSurvivalFunction)
+        WHERE coalesce(sm.isActive, true) AND w.modelFitDate IS NOT NULL
+        RETURN w ORDER BY w.modelFitDate DESC LIMIT 1
+    }
+    CALL {
+        WITH p
+        MATCH (p)-[:HAS_RUL_ASSESSMENT]->(r:RemainingUsefulLife)
+        WHERE r.lastTelemetryUpdate IS NOT NULL
+        RETURN r ORDER BY r.lastTelemetryUpdate DESC LIMIT 1
+    }
+    CALL {
+        WITH p
+        OPTIONAL MATCH (p)-[:HAS_HAZARD_CALCULATION]->(h:BlendedHazardFunction)
+        WHERE h.calculationTimestamp IS NOT NULL
+        RETURN h.blendingWeight AS blending_weight
+        ORDER BY h.calculationTimestamp DESC LIMIT 1
+    }
+    RETURN p.pumpIdentifier AS pump_id,
+           p.currentAge AS current_age,
+           w.modelId AS model_id,
+           w.weibullShape AS weibull_shape,
+           w.weibullScale AS weibull_scale,
+           r.rulId AS rul_id,
+           r.remainingUsefulLife AS remaining_useful_life,
+           blending_weight
+    ORDER BY pump_id
+    """
+
+    WRITE_PREDICTIONS_QUERY = """
+    UNWIND $rows AS row
+    MATCH (p:DryPump {pumpIdentifier: row.pump_id})
+    MATCH (w:WeibullSurvivalFunction {modelId: row.model_id})
+    MATCH (r:RemainingUsefulLife {rulId: row.rul_id})
+    MERGE (h:BlendedHazardFunction {hazardId: row.hazard_id})
+    SET h.blendingWeight = row.blending_weight,
+        h.weibullHazard = row.weibull_hazard,
+        h.conditionHazard = row.condition_hazard,
+        h.blendedHazard = row.blended_hazard,
+        h.calculationTimestamp = row.timestamp,
+        h.targetDays = row.horizon,
+        h.pumpAge = row.current_age
+    MERGE (pred:ThirtyDayFailureProbability {predictionId: row.prediction_id})
+    SET pred.failureProbability = row.failure_probability,
+        pred.riskScore = row.failure_probability,
+        pred.riskClassification = row.risk_classification,
+        pred.predictionTimestamp = row.timestamp,
+        pred.predictionHorizon = row.horizon,
+        pred.calculationMethod = row.calculation_method
+    MERGE (p)-[:HAS_HAZARD_CALCULATION]->(h)
+    MERGE (p)-[:HAS_FAILURE_PREDICTION]->(pred)
+    MERGE (h)-[:CALCULATED_FROM_SURVIVAL]->(w)
+    MERGE (h)-[:CALCULATED_FROM_RUL]->(r)
+    MERGE (h)-[:GENERATES_PREDICTION {
+        transformationType: "HazardToProbability",
+        conversionFormula: "P_30(t) = 1 - exp(-H_30(t))"
+    }]->(pred)
+    """
+
+    def __init__(self, driver, horizon_days=DEFAULT_HORIZON_DAYS, chunk_size=1000,
+                 default_blending_weight=DEFAULT_BLENDING_WEIGHT, history=None, rollups=None,
+                 database=None):
+        self.driver = driver
+        self.horizon_days = float(horizon_days)
+        self.chunk_size = chunk_size
+        self.default_blending_weight = default_blending_weight
+        # Optional PredictionHistoryStore: keeps only the newest prediction as a hot node
+        self.history = history
+        # Optional FleetRiskRollups: materialized hierarchy aggregates + top-K pumps
+        self.rollups = rollups
+        self.database = database
+        # Pumps dropped by the last load_fleet() for missing or non-finite inputs
+        self.skipped_pumps = []
+
+    def load_fleet(self):
+        """
+        Read the latest Weibull model, RUL and blending weight for every pump as arrays.
+
+        Pumps with a missing or non-finite age, Weibull parameter or RUL are left
+        out and listed in self.skipped_pumps instead of being scored from NaN.
+        """
+        with self.driver.session(database=self.database) as session:
+            records = [dict(record) for record in session.run(self.LOAD_FLEET_QUERY)]
+
+        inputs = ("current_age", "weibull_shape", "weibull_scale", "remaining_useful_life")
+        complete, self.skipped_pumps = [], []
+        for r in records:
+            if all(r[name] is not None and np.isfinite(r[name]) for name in inputs):
+                complete.append(r)
+            else:
+                self.skipped_pumps.append(r["pump_id"])
+        records = complete
+
+        blending = [
+            self.default_blending_weight if r["blending_weight"] is None else r["blending_weight"]
+            for r in records
+        ]
+        return {
+            "pump_id": np.array([r["pump_id"] for r in records], dtype=object),
+            "model_id": np.array([r["model_id"] for r in records], dtype=object),
+            "rul_id": np.array([r["rul_id"] for r in records], dtype=object),
+            "current_age": np.array([r["current_age"] for r in records], dtype=np.float64),
+            "weibull_shape": np.array([r["weibull_shape"] for r in records], dtype=np.float64),
+            "weibull_scale": np.array([r["weibull_scale"] for r in records], dtype=np.float64),
+            "remaining_useful_life": np.array(
+                [r["remaining_useful_life"] for r in records], dtype=np.float64
+            ),
+            "blending_weight": np.array(blending, dtype=np.float64),
+        }
+
+    def compute(self, fleet):
+        """Run the batched hazard computation over a fleet loaded by load_fleet()"""
+        return compute_fleet_hazard(
+            fleet["weibull_shape"],
+            fleet["weibull_scale"],
+            fleet["current_age"],
+            fleet["remaining_useful_life"],
+            fleet["blending_weight"],
+            horizon=self.horizon_days,
+        )
+
+    def prediction_rows(self, fleet, results, timestamp=None):
+        """Build UNWIND parameter rows for the prediction write-back"""
+        timestamp = timestamp or datetime.now(timezone.utc)
+        stamp = timestamp.strftime("%Y%m%d%H%M")
+        rows = []
+        for i, pump_id in enumerate(fleet["pump_id"]):
+            rows.append({
+                "pump_id": pump_id,
+                "model_id": fleet["model_id"][i],
+                "rul_id": fleet["rul_id"][i],
+                "hazard_id": f"HAZARD_{pump_id}_{stamp}",
+                "prediction_id": f"PRED_{pump_id}_{stamp}",
+                "current_age": float(fleet["current_age"][i]),
+                "blending_weight": float(fleet["blending_weight"][i]),
+                "weibull_hazard": float(results["weibull_hazard"][i]),
+                "condition_hazard": float(results["condition_hazard"][i]),
+                "blended_hazard": float(results["blended_hazard"][i]),
+                "failure_probability": float(results["failure_probability"][i]),
+                "risk_classification": str(results["risk_classification"][i]),
+                "horizon": self.horizon_days,
+                "timestamp": timestamp,
+                "calculation_method": CALCULATION_METHOD,
+            })
+        return rows
+
+    def write_predictions(self, fleet, results, timestamp=None):
+        """Write hazard and prediction nodes in chunked UNWIND transactions"""
+        rows = self.prediction_rows(fleet, results, timestamp)
+        writer = BulkGraphWriter(self.driver, chunk_size=self.chunk_size, database=self.database)
+        totals = writer.write(self.WRITE_PREDICTIONS_QUERY, rows)
+        if self.history is not None:
+            self.history.record(rows)
+        if self.rollups is not None:
+            self.rollups.update(rows)
+        return totals
+
+    def recompute_fleet(self, write=True):
+        """Load, compute and (optionally) write back P_30 for the whole fleet"""
+        print("\n📈 Recomputing fleet-wide 30-day failure probabilities...")
+
+        started = time.perf_counter()
+        fleet = self.load_fleet()
+        loaded = time.perf_counter()
+        print(f"   ✅ Loaded {len(fleet['pump_id'])} pumps in {loaded - started:.2f}s")
+        if self.skipped_pumps:
+            print(f"   ⚠️  Skipped {len(self.skipped_pumps)} pumps with missing hazard inputs "
+                  f"(e.g. {', '.join(map(str, self.skipped_pumps[:5]))})")
+
+        if len(fleet["pump_id"]) == 0:
+            print("   ⚠️  No pumps with an active Weibull model and RUL assessment found")
+            return fleet, None
+
+        results = self.compute(fleet)
+        computed = time.perf_counter()
+        print(f"   ✅ Computed λ_W, λ_R, H_30, P_30 in {(computed - loaded) * 1000:.1f}ms")
+
+        classes, counts = np.unique(results["risk_classification"], return_counts=True)
+        for label, count in zip(classes, counts):
+            print(f"      • Risk class {label}: {count} pumps")
+
+        if write:
+            totals = self.write_predictions(fleet, results)
+            print(f"   ✅ Wrote predictions in {time.perf_counter() - computed:.2f}s")
+            print(f"      Nodes created: {totals['nodes_created']}")
+            print(f"      Relationships created: {totals['relationships_created']}")
+
+        return fleet, results
+
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from neo4j import GraphDatabase
+
+    load_dotenv()
+
+    password = os.getenv("NEO4J_PASSWORD")
+    if not password:
+        print("❌ ERROR: NEO4J_PASSWORD is not set - create a .env file first")
+        sys.exit(1)
+
+    driver = GraphDatabase.driver(
+        os.getenv("NEO4J_URI", "neo4j://localhost:7687"),
+        auth=(os.getenv("NEO4J_USERNAME", "neo4j"), password),
+    )
+    try:
+        history = None
+        if "--history" in sys.argv:
+            from prediction_history import PredictionHistoryStore
+            history = PredictionHistoryStore(driver)
+            history.ensure_schema()
+        rollups = None
+        if "--rollups" in sys.argv:
+            from risk_rollups import FleetRiskRollups
+            rollups = FleetRiskRollups(driver)
+            rollups.ensure_schema()
+        engine = FleetHazardEngine(driver, history=history, rollups=rollups)
+        engine.recompute_fleet(write="--dry-run" not in sys.argv)
+        if rollups is not None:
+            for pump in rollups.top_pumps(5):
+                print(f"      🔥 {pump['pump_id']}: P_30={pump['failure_probability']:.3f} "
+                      f"(class {pump['risk_classification']})")
+    finally:
+        driver.close()
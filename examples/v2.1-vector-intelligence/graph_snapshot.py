@@ -0,0 +1,411 @@
+"""
+graph_snapshot.py
+Columnar Parquet snapshots of the equipment hierarchy and hazard layer
+
+Export streams every node of the snapshot labels out of Neo4j in keyset-paged
+batches (ORDER BY the unique key, LIMIT page_size), so memory stays bounded by
+one page regardless of graph size. Each label is written to its own directory
+of Parquet part files, rolled every rows_per_file rows or when the property
+schema changes:
+
+    snapshot/
+      manifest.json
+      Fab/part-00000.parquet
+      FabArea/...  SemiconductorTool/...  ProcessChamber/...  DryPump/...
+      WeibullSurvivalFunction/...  RemainingUsefulLife/...
+      BlendedHazardFunction/...  ThirtyDayFailureProbability/...
+      PredictionHistoryBucket/...
+      SERVES/...  HAS_SURVIVAL_MODEL/...
+
+Columns are the node properties plus underscore-prefixed link columns
+(_parent, _model_id, _rul_id, _hazard_id) recording the relationships needed
+to rebuild the graph. Relationships that carry state or fan out - SERVES
+(isPrimary, pumps on several chambers) and HAS_SURVIVAL_MODEL (isActive,
+cohort models shared by many pumps) - are exported as their own relationship
+tables (_key, _other, properties) instead, so every link comes back with its
+properties and an old model version is not re-activated on import. Import
+replays the files top-down through chunked UNWIND MERGE writes; analytics can
+read them directly with pyarrow (memory-mapped).
+
+USAGE:
+    GraphSnapshot(driver).export("snapshot/")
+    GraphSnapshot(driver).import_snapshot("snapshot/")
+    pumps = read_table("snapshot/", "DryPump", columns=["pumpIdentifier", "currentAge"])
+
+SETUP:
+1. Create .env file with NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD
+2. Install: pip install -r requirements.txt
+3. Run: python graph_snapshot.py export snapshot/
+        python graph_snapshot.py import snapshot/
+"""
+
+from datetime import datetime, timezone
+import json
+import os
+import sys
+import time
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from bulk_graph_writer import (
+    AREA_QUERY, CHAMBER_QUERY, FAB_QUERY, PUMP_QUERY, RUL_QUERY, TOOL_QUERY, WEIBULL_QUERY,
+    BulkGraphWriter,
+)
+
+SNAPSHOT_FORMAT_VERSION = 2
+
+HAZARD_QUERY = """
+UNWIND $rows AS row
+MERGE (h:BlendedHazardFunction {hazardId: row.key})
+SET h += row.props
+WITH h, row
+CALL { WITH h, row
+       MATCH (p:DryPump {pumpIdentifier: row.parent}) MERGE (p)-[:HAS_HAZARD_CALCULATION]->(h) }
+CALL { WITH h, row
+       MATCH (w:WeibullSurvivalFunction {modelId: row.links._model_id})
+       MERGE (h)-[:CALCULATED_FROM_SURVIVAL]->(w) }
+CALL { WITH h, row
+       MATCH (r:RemainingUsefulLife {rulId: row.links._rul_id})
+       MERGE (h)-[:CALCULATED_FROM_RUL]->(r) }
+"""
+
+PREDICTION_QUERY = """
+UNWIND $rows AS row
+MERGE (pred:ThirtyDayFailureProbability {predictionId: row.key})
+SET pred += row.props
+WITH pred, row
+CALL { WITH pred, row
+       MATCH (p:DryPump {pumpIdentifier: row.parent}) MERGE (p)-[:HAS_FAILURE_PREDICTION]->(pred) }
+CALL { WITH pred, row
+       MATCH (h:BlendedHazardFunction {hazardId: row.links._hazard_id})
+       MERGE (h)-[:GENERATES_PREDICTION {
+           transformationType: "HazardToProbability",
+           conversionFormula: "P_30(t) = 1 - exp(-H_30(t))"
+       }]->(pred) }
+"""
+
+HISTORY_QUERY = """
+UNWIND $rows AS row
+MERGE (b:PredictionHistoryBucket {bucketId: row.key})
+SET b += row.props
+WITH b, row
+MATCH (p:DryPump {pumpIdentifier: row.parent})
+MERGE (p)-[:HAS_PREDICTION_HISTORY]->(b)
+"""
+
+SERVES_QUERY = """
+UNWIND $rows AS row
+MATCH (p:DryPump {pumpIdentifier: row.key})
+MATCH (c:ProcessChamber {chamberId: row.links._other})
+MERGE (p)-[s:SERVES]->(c)
+SET s += row.props
+"""
+
+SURVIVAL_LINK_QUERY = """
+UNWIND $rows AS row
+MATCH (w:WeibullSurvivalFunction {modelId: row.key})
+MATCH (p:DryPump {pumpIdentifier: row.links._other})
+MERGE (p)-[sm:HAS_SURVIVAL_MODEL]->(w)
+SET sm += row.props
+"""
+
+# label, key property, link columns {column: Cypher expression over n}, import query.
+# Order is top-down so parents are always imported before their children.
+SNAPSHOT_LABELS = (
+    ("Fab", "fabId", {}, FAB_QUERY),
+    ("FabArea", "areaId",
+     {"_parent": "head([(f:Fab)-[:CONTAINS]->(n) | f.fabId])"}, AREA_QUERY),
+    ("SemiconductorTool", "toolId",
+     {"_parent": "head([(n)-[:LOCATED_IN]->(a:FabArea) | a.areaId])"}, TOOL_QUERY),
+    ("ProcessChamber", "chamberId",
+     {"_parent": "head([(n)-[:PART_OF]->(t:SemiconductorTool) | t.toolId])"}, CHAMBER_QUERY),
+    # SERVES and HAS_SURVIVAL_MODEL come from SNAPSHOT_RELATIONSHIPS; with no _parent
+    # column PUMP_QUERY and WEIBULL_QUERY only write the nodes
+    ("DryPump", "pumpIdentifier", {}, PUMP_QUERY),
+    ("WeibullSurvivalFunction", "modelId", {}, WEIBULL_QUERY),
+    ("RemainingUsefulLife", "rulId",
+     {"_parent": "head([(p:DryPump)-[:HAS_RUL_ASSESSMENT]->(n) | p.pumpIdentifier])"}, RUL_QUERY),
+    ("BlendedHazardFunction", "hazardId",
+     {"_parent": "head([(p:DryPump)-[:HAS_HAZARD_CALCULATION]->(n) | p.pumpIdentifier])",
+      "_model_id": "head([(n)-[:CALCULATED_FROM_SURVIVAL]->(w) | w.modelId])",
+      "_rul_id": "head([(n)-[:CALCULATED_FROM_RUL]->(r) | r.rulId])"}, HAZARD_QUERY),
+    ("ThirtyDayFailureProbability", "predictionId",
+     {"_parent": "head([(p:DryPump)-[:HAS_FAILURE_PREDICTION]->(n) | p.pumpIdentifier])",
+      "_hazard_id": "head([(h)-[:GENERATES_PREDICTION]->(n) | h.hazardId])"}, PREDICTION_QUERY),
+    ("PredictionHistoryBucket", "bucketId",
+     {"_parent": "head([(p:DryPump)-[:HAS_PREDICTION_HISTORY]->(n) | p.pumpIdentifier])"},
+     HISTORY_QUERY),
+)
+
+# relationship type, label and key property of n, pattern binding r and o, key of o, import query.
+# One row per relationship, paged by n's key; imported after every label exists.
+SNAPSHOT_RELATIONSHIPS = (
+    ("SERVES", "DryPump", "pumpIdentifier",
+     "(n)-[r:SERVES]->(o:ProcessChamber)", "o.chamberId", SERVES_QUERY),
+    ("HAS_SURVIVAL_MODEL", "WeibullSurvivalFunction", "modelId",
+     "(o:DryPump)-[r:HAS_SURVIVAL_MODEL]->(n)", "o.pumpIdentifier", SURVIVAL_LINK_QUERY),
+)
+
+
+def _keyset(label, key):
+    """(first page, next page) MATCH clauses; `$after IS NULL OR ...` would defeat the index seek"""
+    first = f"MATCH (n:{label}) WITH n ORDER BY n.{key} LIMIT $limit "
+    after = f"MATCH (n:{label}) WHERE n.{key} > $after WITH n ORDER BY n.{key} LIMIT $limit "
+    return first, after
+
+
+def page_query(label, key, links):
+    """Keyset-paged export queries (first page, next page) for one label"""
+    columns = "".join(f", {expression} AS {column}" for column, expression in links.items())
+    tail = f"RETURN n.{key} AS _key, properties(n) AS props{columns}"
+    return tuple(match + tail for match in _keyset(label, key))
+
+
+def relationship_page_query(label, key, pattern, other_key):
+    """Keyset-paged export queries for one relationship type, paged by n's key"""
+    tail = (
+        f"OPTIONAL MATCH {pattern} "
+        f"RETURN n.{key} AS _key, {other_key} AS _other, properties(r) AS props ORDER BY _key"
+    )
+    return tuple(match + tail for match in _keyset(label, key))
+
+
+def _native(value):
+    """Neo4j temporal values → Python datetime/date/time; lists converted element-wise"""
+    if hasattr(value, "to_native"):
+        return value.to_native()
+    if isinstance(value, list):
+        return [_native(v) for v in value]
+    return value
+
+
+def _column(values):
+    """Arrow array for one property column; mixed-type columns fall back to strings"""
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+
+def records_to_table(records, links):
+    """Build an Arrow table from exported records (property union + link columns)"""
+    names = []
+    seen = set()
+    for record in records:
+        for name in record["props"]:
+            if name not in seen:
+                seen.add(name)
+                names.append(name)
+    columns = {name: _column([_native(r["props"].get(name)) for r in records]) for name in sorted(names)}
+    for column in links:
+        columns[column] = _column([r[column] for r in records])
+    return pa.table(columns)
+
+
+def snapshot_dataset(path, label):
+    """pyarrow Dataset over one label's part files (lazy, memory-mapped)"""
+    directory = os.path.join(path, label)
+    files = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                   if name.endswith(".parquet"))
+    # Part files may differ by columns or int/float widths; read them under one schema
+    schema = pa.unify_schemas([pq.read_schema(f) for f in files], promote_options="permissive")
+    return ds.dataset(files, schema=schema, format="parquet")
+
+
+def read_table(path, label, columns=None, filter=None):
+    """Read one label of a snapshot into an Arrow table without touching Neo4j"""
+    return snapshot_dataset(path, label).to_table(columns=columns, filter=filter)
+
+
+class GraphSnapshot:
+    """Paged Parquet export and bulk import of the equipment and hazard layers"""
+
+    def __init__(self, driver, page_size=5000, rows_per_file=250000, chunk_size=1000,
+                 database=None):
+        self.driver = driver
+        self.page_size = page_size
+        self.rows_per_file = rows_per_file
+        self.chunk_size = chunk_size
+        self.database = database
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    def _pages(self, session, queries):
+        first, following = queries
+        query, after = first, None
+        while True:
+            records = session.execute_read(
+                lambda tx: tx.run(query, after=after, limit=self.page_size).data()
+            )
+            if not records:
+                return
+            after = records[-1]["_key"]
+            query = following
+            # Relationship pages carry a null row for nodes without the relationship
+            records = [r for r in records if r.get("props") is not None]
+            if records:
+                yield records
+
+    def export_label(self, session, path, label, key, links):
+        """Stream one label into rolling Parquet part files; returns (rows, files)"""
+        return self._export_pages(session, path, label, page_query(label, key, links), links)
+
+    def export_relationship(self, session, path, rel_type, label, key, pattern, other_key):
+        """Stream one relationship type into rolling Parquet part files; returns (rows, files)"""
+        queries = relationship_page_query(label, key, pattern, other_key)
+        return self._export_pages(session, path, rel_type, queries, ("_key", "_other"))
+
+    def _export_pages(self, session, path, name, queries, links):
+        directory = os.path.join(path, name)
+        os.makedirs(directory, exist_ok=True)
+        for stale in os.listdir(directory):
+            if stale.endswith(".parquet"):
+                os.remove(os.path.join(directory, stale))
+
+        writer, files, rows, file_rows = None, [], 0, 0
+        try:
+            for records in self._pages(session, queries):
+                table = records_to_table(records, links)
+                if writer is not None and (file_rows >= self.rows_per_file
+                                           or not table.schema.equals(writer.schema)):
+                    writer.close()
+                    writer = None
+                if writer is None:
+                    name = f"part-{len(files):05d}.parquet"
+                    writer = pq.ParquetWriter(os.path.join(directory, name), table.schema,
+                                              compression="zstd")
+                    files.append(name)
+                    file_rows = 0
+                writer.write_table(table)
+                rows += table.num_rows
+                file_rows += table.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows, files
+
+    def export(self, path, labels=None):
+        """Export the snapshot labels to `path` and write manifest.json"""
+        print(f"\n📦 Exporting graph snapshot to {path}...")
+        os.makedirs(path, exist_ok=True)
+        manifest = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "labels": {},
+            "relationships": {},
+        }
+        with self.driver.session(database=self.database) as session:
+            for label, key, links, _ in SNAPSHOT_LABELS:
+                if labels and label not in labels:
+                    continue
+                started = time.perf_counter()
+                rows, files = self.export_label(session, path, label, key, links)
+                manifest["labels"][label] = {"key": key, "rows": rows, "files": files}
+                print(f"   ✅ {label}: {rows} rows in {len(files)} file(s) "
+                      f"({time.perf_counter() - started:.2f}s)")
+            for rel_type, label, key, pattern, other_key, _ in SNAPSHOT_RELATIONSHIPS:
+                if labels and label not in labels:
+                    continue
+                started = time.perf_counter()
+                rows, files = self.export_relationship(session, path, rel_type, label, key,
+                                                       pattern, other_key)
+                manifest["relationships"][rel_type] = {"label": label, "rows": rows, "files": files}
+                print(f"   ✅ {rel_type}: {rows} relationships in {len(files)} file(s) "
+                      f"({time.perf_counter() - started:.2f}s)")
+
+        with open(os.path.join(path, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+    # ------------------------------------------------------------------
+    # Import
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def import_rows(batch, key):
+        """Arrow record batch → UNWIND rows of {key, parent, links, props}"""
+        rows = []
+        for record in batch.to_pylist():
+            rows.append({
+                "key": record[key],
+                "parent": record.get("_parent"),
+                "links": {k: v for k, v in record.items() if k.startswith("_")},
+                "props": {k: v for k, v in record.items()
+                          if not k.startswith("_") and v is not None},
+            })
+        return rows
+
+    def import_snapshot(self, path, labels=None, ensure_constraints=True):
+        """Bulk-load a snapshot directory back into Neo4j, parents before children"""
+        with open(os.path.join(path, "manifest.json")) as f:
+            manifest = json.load(f)
+        if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format: {manifest.get('format_version')}")
+
+        print(f"\n📥 Importing graph snapshot from {path}...")
+        writer = BulkGraphWriter(self.driver, chunk_size=self.chunk_size, database=self.database)
+        if ensure_constraints:
+            writer.ensure_constraints()
+            with self.driver.session(database=self.database) as session:
+                session.run(
+                    "CREATE CONSTRAINT prediction_history_bucket_unique IF NOT EXISTS "
+                    "FOR (b:PredictionHistoryBucket) REQUIRE b.bucketId IS UNIQUE"
+                ).consume()
+
+        # Nodes first (top-down), then the relationship tables that link them
+        steps = [(label, label, key, query) for label, key, _, query in SNAPSHOT_LABELS]
+        steps += [(rel_type, label, "_key", query)
+                  for rel_type, label, _, _, _, query in SNAPSHOT_RELATIONSHIPS]
+        entries = {**manifest["labels"], **manifest["relationships"]}
+
+        summary = {}
+        for name, label, key, query in steps:
+            entry = entries.get(name)
+            if not entry or not entry["files"] or (labels and label not in labels):
+                continue
+            started = time.perf_counter()
+            imported = 0
+            for batch in snapshot_dataset(path, name).to_batches(batch_size=self.chunk_size):
+                rows = self.import_rows(batch, key)
+                writer.write(query, rows)
+                imported += len(rows)
+            summary[name] = imported
+            print(f"   ✅ {name}: {imported} rows ({time.perf_counter() - started:.2f}s)")
+        return summary
+
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from neo4j import GraphDatabase
+
+    if len(sys.argv) < 3 or sys.argv[1] not in ("export", "import"):
+        print("Usage: python graph_snapshot.py export|import <snapshot directory>")
+        sys.exit(1)
+
+    load_dotenv()
+
+    password = os.getenv("NEO4J_PASSWORD")
+    if not password:
+        print("❌ ERROR: NEO4J_PASSWORD is not set - create a .env file first")
+        sys.exit(1)
+
+    driver = GraphDatabase.driver(
+        os.getenv("NEO4J_URI", "neo4j://localhost:7687"),
+        auth=(os.getenv("NEO4J_USERNAME", "neo4j"), password),
+    )
+    try:
+        snapshot = GraphSnapshot(driver)
+        if sys.argv[1] == "export":
+            snapshot.export(sys.argv[2])
+        else:
+            snapshot.import_snapshot(sys.argv[2])
+    finally:
+        driver.close()
@@ -0,0 +1,174 @@
+"""
+hybrid_retrieval.py
+Single-query hybrid retrieval: vector similarity + 2-hop graph expansion
+
+One Cypher statement queries semantic_concepts_vector_index with
+db.index.vector.queryNodes and expands every hit to its SemanticConcept,
+business context and connected DryPump operational data (latest RUL, latest
+ThirtyDayFailureProbability, served ProcessChamber and SemiconductorTool).
+That replaces the vector search + one traversal query per hit (N+1 round-trips)
+used previously by the notebook agent and semantic-vectorization.py.
+
+HybridRetriever wraps a sync neo4j Driver; AsyncHybridRetriever wraps an
+AsyncDriver so many concurrent agent requests share one connection pool.
+
+USAGE:
+    retriever = HybridRetriever(driver, embeddings)
+    hits = retriever.search("vacuum pump equipment failure", k=3)
+    print(format_hybrid_results("vacuum pump equipment failure", hits))
+
+    async_retriever = AsyncHybridRetriever(async_driver, embeddings)
+    hits = await async_retriever.search("vacuum pump equipment failure")
+    many = await async_retriever.search_many(["query 1", "query 2"])
+"""
+
+import asyncio
+
+DEFAULT_INDEX_NAME = "semantic_concepts_vector_index"
+
+HYBRID_QUERY = """
+CALL db.index.vector.queryNodes($index_name, $k, $embedding) YIELD node AS sv, score
+OPTIONAL MATCH (sv)-[:VECTOR_REPRESENTATION_OF]->(sc:SemanticConcept)
+OPTIONAL MATCH (sc)-[:HAS_MEANING_IN_CONTEXT]->(ctx:SemanticContext)
+WITH sv, score, sc, collect(ctx.businessContext)[0] AS business_context
+
+// 1st hop: equipment connected to the concept
+OPTIONAL MATCH (eq:DryPump)-[:HAS_SEMANTIC_TYPE]->(sc)
+
+// 2nd hop: operational data connected to the equipment, one row per pump.
+// Each CALL picks its own latest node (nulls would sort first under DESC), so
+// RUL, prediction and chamber rows never multiply each other.
+CALL {
+    WITH eq
+    OPTIONAL MATCH (eq)-[:HAS_RUL_ASSESSMENT]->(rul:RemainingUsefulLife)
+    WHERE rul.lastTelemetryUpdate IS NOT NULL
+    RETURN rul ORDER BY rul.lastTelemetryUpdate DESC LIMIT 1
+}
+CALL {
+    WITH eq
+    OPTIONAL MATCH (eq)-[:HAS_FAILURE_PREDICTION]->(pred:ThirtyDayFailureProbability)
+    WHERE pred.predictionTimestamp IS NOT NULL
+    RETURN pred ORDER BY pred.predictionTimestamp DESC LIMIT 1
+}
+CALL {
+    WITH eq
+    OPTIONAL MATCH (eq)-[serves:SERVES]->(chamber:ProcessChamber)
+    OPTIONAL MATCH (chamber)-[:PART_OF]->(tool:SemiconductorTool)
+    RETURN chamber, tool ORDER BY coalesce(serves.isPrimary, false) DESC LIMIT 1
+}
+WITH sv, score, sc, business_context,
+     collect(CASE WHEN eq IS NULL THEN NULL ELSE {
+         equipment_id: eq.pumpIdentifier,
+         is_operational: eq.isOperational,
+         pumping_speed: eq.pumpingSpeed,
+         health_index: rul.healthIndex,
+         remaining_useful_life: rul.remainingUsefulLife,
+         risk_score: pred.riskScore,
+         failure_probability: pred.failureProbability,
+         risk_classification: pred.riskClassification,
+         chamber_id: chamber.chamberId,
+         tool_id: tool.toolId
+     } END) AS equipment
+RETURN sv.concept_id AS concept_id,
+       coalesce(sc.label, sv.label) AS label,
+       coalesce(sc.domain, sv.domain) AS domain,
+       sc.definition AS definition,
+       score,
+       business_context,
+       equipment
+ORDER BY score DESC
+"""
+
+
+def format_hybrid_results(query, results):
+    """Render hybrid retrieval hits as the markdown the agent tools return"""
+    if not results:
+        return "No semantically similar concepts found."
+
+    response = f"**🔍 Semantic Similarity Search Results for: '{query}'**\n\n"
+    for i, hit in enumerate(results, 1):
+        response += f"**{i}. {hit['label'] or 'Unknown'}**\n"
+        response += f"   - Similarity Score: {hit['score']:.4f}\n"
+        response += f"   - Concept ID: {hit['concept_id'] or 'Unknown'}\n"
+        response += f"   - Domain: {hit['domain'] or 'Unknown'}\n"
+
+        for eq in hit['equipment']:
+            response += f"   - **Connected Equipment**: {eq['equipment_id']}\n"
+            response += f"     * Operational: {eq['is_operational']}\n"
+            if eq['pumping_speed']:
+                response += f"     * Pumping Speed: {eq['pumping_speed']}\n"
+            if eq['health_index']:
+                response += f"     * Health Index: {eq['health_index']}\n"
+            if eq['risk_score']:
+                response += f"     * Risk Score: {eq['risk_score']}\n"
+            if eq['chamber_id']:
+                response += f"     * Serves Chamber: {eq['chamber_id']}\n"
+            if eq['tool_id']:
+                response += f"     * Part of Tool: {eq['tool_id']}\n"
+        if not hit['equipment']:
+            response += "   - No connected operational data found\n"
+
+        if hit['business_context']:
+            response += f"   - **Business Context**: {hit['business_context'][:100]}...\n"
+        response += "\n"
+    return response
+
+
+class HybridRetriever:
+    """Vector search + graph expansion in one round-trip on a sync driver"""
+
+    def __init__(self, driver, embeddings, index_name=DEFAULT_INDEX_NAME, database=None):
+        self.driver = driver
+        self.embeddings = embeddings
+        self.index_name = index_name
+        self.database = database
+
+    def search_by_vector(self, embedding, k=3):
+        """Run the hybrid query for an already-computed query embedding"""
+        def read(tx):
+            result = tx.run(HYBRID_QUERY, index_name=self.index_name, k=k, embedding=embedding)
+            return result.data()
+
+        with self.driver.session(database=self.database) as session:
+            return session.execute_read(read)
+
+    def search(self, query, k=3):
+        """Embed `query` and return the top-k concepts with their connected equipment"""
+        return self.search_by_vector(self.embeddings.embed_query(query), k)
+
+
+class AsyncHybridRetriever:
+    """Asyncio variant sharing one AsyncDriver connection pool across requests"""
+
+    def __init__(self, driver, embeddings, index_name=DEFAULT_INDEX_NAME, database=None,
+                 max_concurrency=None):
+        self.driver = driver
+        self.embeddings = embeddings
+        self.index_name = index_name
+        self.database = database
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+    async def _embed(self, query):
+        if hasattr(self.embeddings, "aembed_query"):
+            return await self.embeddings.aembed_query(query)
+        return await asyncio.to_thread(self.embeddings.embed_query, query)
+
+    async def search_by_vector(self, embedding, k=3):
+        """Run the hybrid query for an already-computed query embedding"""
+        async def read(tx):
+            result = await tx.run(HYBRID_QUERY, index_name=self.index_name, k=k, embedding=embedding)
+            return await result.data()
+
+        async with self.driver.session(database=self.database) as session:
+            return await session.execute_read(read)
+
+    async def search(self, query, k=3):
+        """Embed `query` and return the top-k concepts with their connected equipment"""
+        if self._semaphore is None:
+            return await self.search_by_vector(await self._embed(query), k)
+        async with self._semaphore:
+            return await self.search_by_vector(await self._embed(query), k)
+
+    async def search_many(self, queries, k=3):
+        """Run many hybrid searches concurrently over the shared pool"""
+        return await asyncio.gather(*(self.search(query, k) for query in queries))
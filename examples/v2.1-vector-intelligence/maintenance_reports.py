@@ -0,0 +1,608 @@
+"""
+maintenance_reports.py
+Parallel batch MaintenanceReport generation for a whole fab
+
+Producing a report per pump through search() costs several LLM round-trips and
+a handful of Cypher queries each. MaintenanceReportGenerator builds the nightly
+reports for every pump instead:
+
+- Bulk context fetch: one keyset-paged query returns, per pump, its hierarchy
+  (chamber → tool → area → fab), latest Weibull model, RUL assessment, blended
+  hazard, failure prediction and linked SemanticConcept ids
+- Shared context deduplicated: tool, area and fab RiskRollups (from
+  risk_rollups.py, if present) and concept labels are fetched once per run for
+  the distinct ids, not once per pump
+- Concurrent rendering: report text is produced on a bounded thread pool by
+  `renderer(context, shared)` (the template in render_summary, or e.g. an LLM
+  call) while the next page is prefetched
+- Batched writes: MaintenanceReport nodes (report_id_unique,
+  report_generation_time_idx) with INCLUDES_PUMP / INCLUDES_PREDICTION are
+  written with BulkGraphWriter, one UNWIND transaction per chunk
+- Checkpoint/resume: after each written page the last pump id is saved to the
+  state file; a rerun of the same report date continues from there. Report ids
+  are deterministic (RPT_<date>_<pump>), so a replayed page updates in place
+
+Pumps without a failure prediction are skipped (a report must include one
+prediction, constraint C5.1); run fleet_hazard.py first. The prediction is the
+one generated by the pump's latest BlendedHazardFunction, so the hazard drivers
+and P_30 in a report always come from the same run. A pump whose renderer
+raises is logged and counted as failed, and the run continues with the rest.
+
+SETUP:
+1. Create .env file with NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD
+2. Install: pip install -r requirements.txt
+3. Run: python maintenance_reports.py [--fab FAB2] [--workers 8] [--page-size 2000] [--restart]
+
+python maintenance_reports.py --synthetic 100000 renders reports for a synthetic
+fleet without Neo4j and prints the throughput.
+
+USAGE:
+    generator = MaintenanceReportGenerator(driver, fab_id="FAB2", workers=8)
+    generator.ensure_schema()
+    result = generator.generate()          # resumes an interrupted run for the same date
+    print(result["reports_written"], result["reports_per_second"])
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import json
+import os
+import sys
+import threading
+import time
+
+from bulk_graph_writer import BulkGraphWriter
+
+STATE_PATH = "maintenance_report_state.json"
+REPORT_TYPE = "Nightly"
+CALCULATION_VERSION = "v2.1"
+
+# Recommended action per risk class (A ≥ 0.80 … E < 0.10, see fleet_hazard.py)
+ACTIONS = {
+    "A": "Replace pump within 7 days",
+    "B": "Schedule maintenance within 14 days",
+    "C": "Plan maintenance in the next maintenance window",
+    "D": "Increase monitoring frequency",
+    "E": "Routine monitoring",
+}
+ANOMALY_ACTION = "Investigate anomaly"
+
+SCHEMA_QUERIES = (
+    "CREATE CONSTRAINT report_id_unique IF NOT EXISTS "
+    "FOR (r:MaintenanceReport) REQUIRE r.reportId IS UNIQUE",
+    "CREATE INDEX report_generation_time_idx IF NOT EXISTS "
+    "FOR (r:MaintenanceReport) ON (r.reportGenerationTime)",
+)
+
+PUMP_CONTEXT_QUERY = """
+MATCH (p:DryPump)
+WHERE p.pumpIdentifier > $after
+  AND ($fab_id IS NULL OR EXISTS {
+        (p)-[:SERVES]->(:ProcessChamber)-[:PART_OF]->(:SemiconductorTool)
+           -[:LOCATED_IN]->(:FabArea)<-[:CONTAINS]-(:Fab {fabId: $fab_id})
+      })
+WITH p ORDER BY p.pumpIdentifier LIMIT $limit
+OPTIONAL MATCH (p)-[:SERVES]->(c:ProcessChamber)
+OPTIONAL MATCH (c)-[:PART_OF]->(t:SemiconductorTool)
+OPTIONAL MATCH (t)-[:LOCATED_IN]->(a:FabArea)
+OPTIONAL MATCH (f:Fab)-[:CONTAINS]->(a)
+WITH p, collect(DISTINCT c.chamberId) AS chamber_ids, head(collect(t.toolId)) AS tool_id,
+     head(collect(a.areaId)) AS area_id, head(collect(f.fabId)) AS fab_id
+// "Latest" subqueries skip undated nodes, which DESC would sort first
+CALL {
+    WITH p
+    OPTIONAL MATCH (p)-[sm:HAS_SURVIVAL_MODEL]->(w:WeibullSurvivalFunction)
+    WHERE coalesce(sm.isActive, true) AND w.modelFitDate IS NOT NULL
+    RETURN w ORDER BY w.modelFitDate DESC LIMIT 1
+}
+CALL {
+    WITH p
+    OPTIONAL MATCH (p)-[:HAS_RUL_ASSESSMENT]->(r:RemainingUsefulLife)
+    WHERE r.lastTelemetryUpdate IS NOT NULL
+    RETURN r ORDER BY r.lastTelemetryUpdate DESC LIMIT 1
+}
+CALL {
+    WITH p
+    OPTIONAL MATCH (p)-[:HAS_HAZARD_CALCULATION]->(h:BlendedHazardFunction)
+    WHERE h.calculationTimestamp IS NOT NULL
+    RETURN h ORDER BY h.calculationTimestamp DESC LIMIT 1
+}
+// The prediction generated by that hazard, so drivers and P_30 come from one run
+CALL {
+    WITH p, h
+    OPTIONAL MATCH (h)-[:GENERATES_PREDICTION]->(pred:ThirtyDayFailureProbability)
+                   <-[:HAS_FAILURE_PREDICTION]-(p)
+    RETURN pred LIMIT 1
+}
+CALL {
+    WITH p
+    OPTIONAL MATCH (p)-[:HAS_SEMANTIC_TYPE]->(sc:SemanticConcept)
+    RETURN collect(sc.conceptId)[..$max_concepts] AS concept_ids
+}
+RETURN p.pumpIdentifier AS pump_id,
+       p.pumpModel AS pump_model,
+       p.criticalityLevel AS criticality_level,
+       p.serviceRole AS service_role,
+       p.currentAge AS current_age,
+       chamber_ids, tool_id, area_id, fab_id,
+       w.modelId AS model_id,
+       w.weibullShape AS weibull_shape,
+       w.weibullScale AS weibull_scale,
+       r.remainingUsefulLife AS remaining_useful_life,
+       r.healthIndex AS health_index,
+       r.hasAnomalyFlag AS anomaly_flag,
+       h.weibullHazard AS weibull_hazard,
+       h.conditionHazard AS condition_hazard,
+       h.blendingWeight AS blending_weight,
+       pred.predictionId AS prediction_id,
+       pred.failureProbability AS failure_probability,
+       pred.riskClassification AS risk_classification,
+       concept_ids
+ORDER BY pump_id
+"""
+
+# (context key, label, key property) of the hierarchy levels shared between pumps
+SHARED_LEVELS = (
+    ("tool_id", "SemiconductorTool", "toolId"),
+    ("area_id", "FabArea", "areaId"),
+    ("fab_id", "Fab", "fabId"),
+)
+
+SHARED_QUERY = """
+UNWIND $ids AS id
+MATCH (n:{label} {{{key}: id}})
+OPTIONAL MATCH (n)-[:HAS_RISK_ROLLUP]->(rollup:RiskRollup)
+RETURN id,
+       rollup {{.pumpCount, .expectedFailures, .maxProbability, .riskiestPump}} AS rollup
+"""
+
+CONCEPT_QUERY = """
+UNWIND $ids AS id
+MATCH (sc:SemanticConcept {conceptId: id})
+RETURN id, sc.label AS label, sc.domain AS domain
+"""
+
+WRITE_REPORTS_QUERY = """
+UNWIND $rows AS row
+MATCH (p:DryPump {pumpIdentifier: row.pump_id})
+MATCH (pred:ThirtyDayFailureProbability {predictionId: row.prediction_id})
+MERGE (report:MaintenanceReport {reportId: row.report_id})
+SET report += row.props
+MERGE (report)-[:INCLUDES_PUMP]->(p)
+MERGE (report)-[:INCLUDES_PREDICTION]->(pred)
+"""
+
+
+def recommend_action(risk_classification, anomaly_flag=False):
+    """Maintenance action for a risk class, prefixed by an anomaly investigation (C6.3)"""
+    action = ACTIONS.get(risk_classification, ACTIONS["E"])
+    return f"{ANOMALY_ACTION}; {action}" if anomaly_flag else action
+
+
+def _fmt(value, spec=""):
+    """Format a context value, tolerating properties missing from the graph"""
+    return "n/a" if value is None else format(value, spec)
+
+
+def _rollup_text(name, entity_id, rollup):
+    if not rollup or rollup.get("pumpCount") is None:
+        return None
+    return (f"{name} {entity_id}: {rollup['pumpCount']} pumps, "
+            f"{_fmt(rollup.get('expectedFailures'), '.2f')} expected failures in 30 days, "
+            f"riskiest {rollup.get('riskiestPump') or 'n/a'} "
+            f"(P_30={_fmt(rollup.get('maxProbability'), '.3f')})")
+
+
+def render_summary(context, shared):
+    """Template report text for one pump (the default renderer)"""
+    c = context
+    location = " / ".join(str(part) for part in (
+        ", ".join(c["chamber_ids"]) or None, c["tool_id"], c["area_id"], c["fab_id"]
+    ) if part)
+    lines = [
+        f"{c['pump_id']} ({c.get('pump_model') or 'unknown model'}, "
+        f"{c.get('criticality_level') or 'unrated'}, {c.get('service_role') or 'unassigned'})"
+        + (f" serving {location}" if location else ""),
+        f"30-day failure probability {c['failure_probability']:.3f} "
+        f"(risk class {c.get('risk_classification') or 'n/a'})",
+    ]
+
+    drivers = []
+    if c.get("weibull_hazard") is not None:
+        drivers.append(f"Weibull hazard {c['weibull_hazard']:.3f} "
+                       f"(ρ={_fmt(c.get('weibull_shape'))}, β={_fmt(c.get('weibull_scale'))}, "
+                       f"age {_fmt(c.get('current_age'), 'g')} days)")
+    if c.get("condition_hazard") is not None:
+        drivers.append(f"condition hazard {c['condition_hazard']:.3f} "
+                       f"× k={_fmt(c.get('blending_weight'))}")
+    if c.get("remaining_useful_life") is not None:
+        drivers.append(f"RUL {c['remaining_useful_life']:g} days, "
+                       f"health index {_fmt(c.get('health_index'))}")
+    if drivers:
+        lines.append("Drivers: " + "; ".join(drivers))
+
+    for (context_key, label, _), name in zip(SHARED_LEVELS, ("Tool", "Area", "Fab")):
+        text = _rollup_text(name, c[context_key], shared[label].get(c[context_key]))
+        if text:
+            lines.append(text)
+
+    concepts = [shared["SemanticConcept"][concept_id] for concept_id in c["concept_ids"]
+                if concept_id in shared["SemanticConcept"]]
+    if concepts:
+        lines.append("Related concepts: " + ", ".join(
+            f"{concept['label']} ({concept['domain']})" for concept in concepts
+        ))
+    lines.append(f"Action: {recommend_action(c['risk_classification'], c.get('anomaly_flag'))}")
+    return "\n".join(lines)
+
+
+def report_row(context, summary, generated_at, report_type=REPORT_TYPE):
+    """UNWIND parameter row for one pump's MaintenanceReport"""
+    return {
+        "pump_id": context["pump_id"],
+        "prediction_id": context["prediction_id"],
+        "report_id": f"RPT_{generated_at:%Y%m%d}_{context['pump_id']}",
+        "props": {
+            "reportGenerationTime": generated_at,
+            "calculationVersion": CALCULATION_VERSION,
+            "reportType": report_type,
+            "totalPumpsAssessed": 1,
+            "pumpIdentifier": context["pump_id"],
+            "failureProbability": context["failure_probability"],
+            "riskClassification": context["risk_classification"],
+            "hasAnomalyFlag": bool(context.get("anomaly_flag")),
+            "actionRecommendation": recommend_action(
+                context["risk_classification"], context.get("anomaly_flag")
+            ),
+            "reportSummary": summary,
+        },
+    }
+
+
+class MaintenanceReportGenerator:
+    """Fetch pump context in bulk, render reports in parallel and write them in batches"""
+
+    def __init__(self, driver, fab_id=None, workers=8, page_size=2000, chunk_size=500,
+                 renderer=render_summary, report_type=REPORT_TYPE, max_concepts=3,
+                 state_path=STATE_PATH, database=None):
+        if workers < 1 or page_size < 1:
+            raise ValueError("workers and page_size must be >= 1")
+        self.driver = driver
+        self.fab_id = fab_id
+        self.workers = workers
+        self.page_size = page_size
+        self.chunk_size = chunk_size
+        self.renderer = renderer
+        self.report_type = report_type
+        self.max_concepts = max_concepts
+        self.state_path = state_path
+        self.database = database
+        # label → {id: context}, filled once per distinct id and reused across pumps
+        self.shared = {label: {} for _, label, _ in SHARED_LEVELS}
+        self.shared["SemanticConcept"] = {}
+        self.shared_fetched = 0
+        self.shared_reused = 0
+        self._lock = threading.Lock()
+
+    def ensure_schema(self):
+        """Create the report constraint and generation-time index (no-op when they exist)"""
+        with self.driver.session(database=self.database) as session:
+            for query in SCHEMA_QUERIES:
+                session.run(query).consume()
+
+    # ------------------------------------------------------------------
+    # Bulk context
+    # ------------------------------------------------------------------
+
+    def fetch_page(self, after):
+        """Contexts for the next page of pumps after `after`, with their shared context loaded"""
+        def read(tx):
+            result = tx.run(PUMP_CONTEXT_QUERY, after=after, fab_id=self.fab_id,
+                            limit=self.page_size, max_concepts=self.max_concepts)
+            return [dict(record) for record in result]
+
+        with self.driver.session(database=self.database) as session:
+            contexts = session.execute_read(read)
+            self._fetch_shared(session, contexts)
+        return contexts
+
+    def _fetch_shared(self, session, contexts):
+        """Load tool/area/fab rollups and concept labels not seen earlier in the run"""
+        wanted = {label: {c[context_key] for c in contexts if c[context_key]}
+                  for context_key, label, _ in SHARED_LEVELS}
+        wanted["SemanticConcept"] = {concept_id for c in contexts for concept_id in c["concept_ids"]}
+
+        references = sum(len(c["concept_ids"]) for c in contexts) + sum(
+            1 for c in contexts for context_key, _, _ in SHARED_LEVELS if c[context_key]
+        )
+        with self._lock:
+            missing = {label: sorted(ids - self.shared[label].keys()) for label, ids in wanted.items()}
+            self.shared_reused += references - sum(len(ids) for ids in missing.values())
+
+        def read(tx, query, ids):
+            return [dict(record) for record in tx.run(query, ids=ids)]
+
+        fetched = {}
+        for _, label, key in SHARED_LEVELS:
+            if missing[label]:
+                rows = session.execute_read(read, SHARED_QUERY.format(label=label, key=key), missing[label])
+                fetched[label] = {row["id"]: row["rollup"] for row in rows}
+        if missing["SemanticConcept"]:
+            rows = session.execute_read(read, CONCEPT_QUERY, missing["SemanticConcept"])
+            fetched["SemanticConcept"] = {row["id"]: row for row in rows}
+
+        with self._lock:
+            for label, ids in missing.items():
+                values = fetched.get(label, {})
+                # Ids without a node are remembered as None so they are not re-queried
+                self.shared[label].update({entity_id: values.get(entity_id) for entity_id in ids})
+                self.shared_fetched += len(ids)
+
+    # ------------------------------------------------------------------
+    # Rendering and writes
+    # ------------------------------------------------------------------
+
+    def render(self, contexts, generated_at, pool):
+        """
+        Render report rows on the worker pool.
+
+        Pumps without a prediction are skipped; a pump whose renderer raises is
+        logged and counted as failed so one bad context cannot abort the page
+        (or, on resume, every later rerun). Returns (rows, skipped, failed).
+        """
+        reportable = [c for c in contexts
+                      if c["prediction_id"] is not None and c["failure_probability"] is not None]
+
+        def build(context):
+            try:
+                summary = self.renderer(context, self.shared)
+                return report_row(context, summary, generated_at, self.report_type)
+            except Exception as e:
+                print(f"   ❌ Report for {context['pump_id']} failed: {type(e).__name__}: {e}")
+                return None
+
+        rows = list(pool.map(build, reportable))
+        built = [row for row in rows if row is not None]
+        return built, len(contexts) - len(reportable), len(rows) - len(built)
+
+    def write(self, rows):
+        writer = BulkGraphWriter(self.driver, chunk_size=self.chunk_size, database=self.database)
+        return writer.write(WRITE_REPORTS_QUERY, rows)
+
+    # ------------------------------------------------------------------
+    # Checkpoints
+    # ------------------------------------------------------------------
+
+    def run_id(self, generated_at):
+        return f"{self.report_type}:{self.fab_id or 'ALL'}:{generated_at:%Y%m%d}"
+
+    def load_state(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return None
+        with open(self.state_path) as handle:
+            return json.load(handle)
+
+    def save_state(self, state):
+        if not self.state_path:
+            return
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, "w") as handle:
+            json.dump(state, handle, indent=2)
+        os.replace(tmp, self.state_path)
+
+    def generate(self, generated_at=None, resume=True, write=True):
+        """
+        Generate reports for every pump (in `fab_id`, if set).
+
+        An unfinished run for the same report type, fab and date is resumed
+        after its last checkpointed pump, with its original generation time.
+
+        Returns:
+            Dict with run_id, pumps, reports_written, skipped, failed (totals for the whole
+            run, including before a resume), pages, resumed_after, shared_fetched,
+            shared_reused, elapsed_seconds, reports_per_second (this invocation)
+            and the summed write counters
+        """
+        started = time.perf_counter()
+        generated_at = generated_at or datetime.now(timezone.utc)
+        run_id = self.run_id(generated_at)
+
+        state = self.load_state() if resume else None
+        if state and state["run_id"] == run_id and not state["completed"]:
+            generated_at = datetime.fromisoformat(state["generated_at"])
+            state.setdefault("failed", 0)
+        else:
+            state = {"run_id": run_id, "generated_at": generated_at.isoformat(), "after": "",
+                     "pumps": 0, "reports_written": 0, "skipped": 0, "failed": 0,
+                     "completed": False}
+        resumed_after = state["after"] or None
+
+        totals = {}
+        pages = written = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool, \
+                ThreadPoolExecutor(max_workers=1) as prefetch:
+            page = prefetch.submit(self.fetch_page, state["after"])
+            while True:
+                contexts = page.result()
+                if not contexts:
+                    break
+                # Read the next page while this one renders and writes
+                page = prefetch.submit(self.fetch_page, contexts[-1]["pump_id"])
+                rows, skipped, failed = self.render(contexts, generated_at, pool)
+                if write and rows:
+                    for name, count in self.write(rows).items():
+                        totals[name] = totals.get(name, 0) + count
+                pages += 1
+                written += len(rows)
+                state.update(after=contexts[-1]["pump_id"], pumps=state["pumps"] + len(contexts),
+                             reports_written=state["reports_written"] + len(rows),
+                             skipped=state["skipped"] + skipped, failed=state["failed"] + failed)
+                if write:
+                    self.save_state(state)
+
+        state["completed"] = True
+        if write:
+            self.save_state(state)
+        elapsed = time.perf_counter() - started
+        return {
+            "run_id": run_id,
+            "pumps": state["pumps"],
+            "reports_written": state["reports_written"],
+            "skipped": state["skipped"],
+            "failed": state["failed"],
+            "pages": pages,
+            "resumed_after": resumed_after,
+            "shared_fetched": self.shared_fetched,
+            "shared_reused": self.shared_reused,
+            "elapsed_seconds": round(elapsed, 3),
+            "reports_per_second": round(written / elapsed, 1) if elapsed else 0.0,
+            **totals,
+        }
+
+
+# =============================================================================
+# Synthetic benchmark
+# =============================================================================
+
+def synthetic_contexts(pumps, seed=7):
+    """Pump contexts and shared context for a synthetic fleet, as fetch_page() would return them"""
+    from fleet_hazard import FleetHazardEngine, compute_fleet_hazard
+    from synthetic_fleet import BASE_TIME, fleet_arrays, generate_fleet
+
+    fleet = generate_fleet(pumps, seed=seed)
+    entities = fleet["entities"]
+    arrays = fleet_arrays(fleet)
+    results = compute_fleet_hazard(
+        arrays["weibull_shape"], arrays["weibull_scale"], arrays["current_age"],
+        arrays["remaining_useful_life"], arrays["blending_weight"],
+    )
+    predictions = FleetHazardEngine(None).prediction_rows(arrays, results, BASE_TIME + timedelta(hours=1))
+
+    chamber_tool = {c["chamberId"]: c["toolId"] for c in entities["chambers"]}
+    tool_area = {t["toolId"]: t["areaId"] for t in entities["tools"]}
+    area_fab = {a["areaId"]: a["fabId"] for a in entities["areas"]}
+    contexts = []
+    for pump, weibull, rul, prediction in zip(entities["pumps"], entities["weibull_models"],
+                                               entities["rul_assessments"], predictions):
+        tool_id = chamber_tool[pump["chamberId"]]
+        contexts.append({
+            "pump_id": pump["pumpIdentifier"],
+            "pump_model": pump["pumpModel"],
+            "criticality_level": pump["criticalityLevel"],
+            "service_role": pump["serviceRole"],
+            "current_age": pump["currentAge"],
+            "chamber_ids": [pump["chamberId"]],
+            "tool_id": tool_id,
+            "area_id": tool_area[tool_id],
+            "fab_id": area_fab[tool_area[tool_id]],
+            "model_id": weibull["modelId"],
+            "weibull_shape": weibull["weibullShape"],
+            "weibull_scale": weibull["weibullScale"],
+            "remaining_useful_life": rul["remainingUsefulLife"],
+            "health_index": rul["healthIndex"],
+            "anomaly_flag": rul["healthIndex"] < 0.1,
+            "weibull_hazard": prediction["weibull_hazard"],
+            "condition_hazard": prediction["condition_hazard"],
+            "blending_weight": prediction["blending_weight"],
+            "prediction_id": prediction["prediction_id"],
+            "failure_probability": prediction["failure_probability"],
+            "risk_classification": prediction["risk_classification"],
+            "concept_ids": [fleet["pump_concepts"][pump["pumpIdentifier"]]],
+        })
+
+    shared = {label: {} for _, label, _ in SHARED_LEVELS}
+    for context in contexts:
+        for context_key, label, _ in SHARED_LEVELS:
+            rollup = shared[label].setdefault(context[context_key], {
+                "pumpCount": 0, "expectedFailures": 0.0, "maxProbability": -1.0, "riskiestPump": None,
+            })
+            rollup["pumpCount"] += 1
+            rollup["expectedFailures"] += context["failure_probability"]
+            if context["failure_probability"] > rollup["maxProbability"]:
+                rollup.update(maxProbability=context["failure_probability"], riskiestPump=context["pump_id"])
+    shared["SemanticConcept"] = {concept["conceptId"]: concept for concept in fleet["concepts"]}
+    return contexts, shared
+
+
+def benchmark_synthetic(pumps, workers=8, page_size=2000):
+    """Render reports for a synthetic fleet page by page (no Neo4j reads or writes)"""
+    contexts, shared = synthetic_contexts(pumps)
+    generator = MaintenanceReportGenerator(None, workers=workers, page_size=page_size, state_path=None)
+    generator.shared = shared
+    generated_at = datetime.now(timezone.utc)
+
+    started = time.perf_counter()
+    rows = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(contexts), page_size):
+            page_rows, _, _ = generator.render(contexts[start:start + page_size], generated_at, pool)
+            rows.extend(page_rows)
+    elapsed = time.perf_counter() - started
+    return {
+        "pumps": pumps,
+        "reports": len(rows),
+        "shared_entities": sum(len(values) for values in shared.values()),
+        "elapsed_seconds": round(elapsed, 3),
+        "reports_per_second": round(len(rows) / elapsed, 1) if elapsed else 0.0,
+        "example": rows[0]["props"]["reportSummary"] if rows else None,
+    }
+
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+if __name__ == "__main__":
+    def option(name, default):
+        if name in sys.argv:
+            return sys.argv[sys.argv.index(name) + 1]
+        return default
+
+    workers = int(option("--workers", "8"))
+    page_size = int(option("--page-size", "2000"))
+
+    if "--synthetic" in sys.argv:
+        pumps = int(option("--synthetic", "10000"))
+        print(f"\n📝 Rendering maintenance reports for {pumps} synthetic pumps...")
+        result = benchmark_synthetic(pumps, workers=workers, page_size=page_size)
+        print(f"   ✅ {result['reports']} reports in {result['elapsed_seconds']:.2f}s "
+              f"({result['reports_per_second']:.0f} reports/s, "
+              f"{result['shared_entities']} shared tool/area/fab/concept contexts)")
+        print("\n" + result["example"])
+        sys.exit(0)
+
+    from dotenv import load_dotenv
+    from neo4j import GraphDatabase
+
+    load_dotenv()
+
+    password = os.getenv("NEO4J_PASSWORD")
+    if not password:
+        print("❌ ERROR: NEO4J_PASSWORD is not set - create a .env file first")
+        sys.exit(1)
+
+    driver = GraphDatabase.driver(
+        os.getenv("NEO4J_URI", "neo4j://localhost:7687"),
+        auth=(os.getenv("NEO4J_USERNAME", "neo4j"), password),
+    )
+    try:
+        generator = MaintenanceReportGenerator(
+            driver, fab_id=option("--fab", None), workers=workers, page_size=page_size,
+        )
+        generator.ensure_schema()
+        print(f"\n📝 Generating {generator.report_type} maintenance reports "
+              f"for {generator.fab_id or 'all fabs'}...")
+        result = generator.generate(resume="--restart" not in sys.argv,
+                                    write="--dry-run" not in sys.argv)
+        if result["resumed_after"]:
+            print(f"   ↪️  Resumed after {result['resumed_after']}")
+        print(f"   ✅ {result['reports_written']} reports for {result['pumps']} pumps "
+              f"in {result['elapsed_seconds']:.2f}s ({result['reports_per_second']:.0f} reports/s)")
+        print(f"      Shared contexts fetched: {result['shared_fetched']}, "
+              f"reused: {result['shared_reused']}")
+        if result["skipped"]:
+            print(f"   ⚠️  {result['skipped']} pumps have no failure prediction - run fleet_hazard.py first")
+        if result["failed"]:
+            print(f"   ⚠️  {result['failed']} reports failed to render - see the errors above")
+    finally:
+        driver.close()
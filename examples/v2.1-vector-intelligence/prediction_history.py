@@ -0,0 +1,430 @@
+"""
+prediction_history.py
+Compact, time-bucketed history of 30-day failure probabilities and hazards
+
+Instead of keeping one ThirtyDayFailureProbability + BlendedHazardFunction
+node pair per prediction run, each pump keeps only its newest pair as the hot
+node and everything else lives in PredictionHistoryBucket nodes - one per pump
+per day (or week) - holding parallel arrays:
+
+    timestamps               epoch seconds
+    failureProbabilities     P_30
+    blendedHazards           H_30
+    weibullHazards           λ_W
+    conditionHazards         λ_R   (NaN where no hazard node existed)
+    riskClassifications      A-E
+
+plus per-bucket summaries (count, first/last timestamp, min/max probability)
+used to skip buckets without touching their arrays. Trend, slope and
+threshold-crossing queries read whole buckets for a window in one query.
+
+Predictions referenced by a MaintenanceReport (INCLUDES_PREDICTION) are copied
+into the history but never deleted.
+
+USAGE:
+    history = PredictionHistoryStore(driver, bucket="day")
+    history.ensure_schema()
+    history.compact()                                   # backfill existing nodes
+    FleetHazardEngine(driver, history=history).recompute_fleet()
+
+    history.trend("P002", window=timedelta(days=7))
+    history.crossings("P002", threshold=0.3, window=timedelta(days=30))
+    history.pumps_crossing(0.6, window=timedelta(days=1))
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+BUCKET_SIZES = {"day": timedelta(days=1), "week": timedelta(weeks=1)}
+METRICS = {
+    "failure_probability": "failureProbabilities",
+    "blended_hazard": "blendedHazards",
+    "weibull_hazard": "weibullHazards",
+    "condition_hazard": "conditionHazards",
+}
+
+SCHEMA_QUERIES = (
+    "CREATE CONSTRAINT prediction_history_bucket_unique IF NOT EXISTS "
+    "FOR (b:PredictionHistoryBucket) REQUIRE b.bucketId IS UNIQUE",
+    "CREATE INDEX prediction_history_pump_time_idx IF NOT EXISTS "
+    "FOR (b:PredictionHistoryBucket) ON (b.pumpIdentifier, b.bucketStart)",
+)
+
+# Appends are idempotent: timestamps already in the bucket are skipped
+APPEND_QUERY = """
+UNWIND $rows AS row
+MATCH (p:DryPump {pumpIdentifier: row.pump_id})
+MERGE (b:PredictionHistoryBucket {bucketId: row.bucket_id})
+ON CREATE SET b.pumpIdentifier = row.pump_id,
+              b.bucketStart = row.bucket_start,
+              b.bucketSize = row.bucket_size,
+              b.timestamps = [], b.failureProbabilities = [], b.blendedHazards = [],
+              b.weibullHazards = [], b.conditionHazards = [], b.riskClassifications = []
+MERGE (p)-[:HAS_PREDICTION_HISTORY]->(b)
+WITH b, row, [i IN range(0, size(row.timestamps) - 1)
+              WHERE NOT row.timestamps[i] IN b.timestamps] AS fresh
+WHERE size(fresh) > 0
+SET b.timestamps = b.timestamps + [i IN fresh | row.timestamps[i]],
+    b.failureProbabilities = b.failureProbabilities + [i IN fresh | row.failure_probabilities[i]],
+    b.blendedHazards = b.blendedHazards + [i IN fresh | row.blended_hazards[i]],
+    b.weibullHazards = b.weibullHazards + [i IN fresh | row.weibull_hazards[i]],
+    b.conditionHazards = b.conditionHazards + [i IN fresh | row.condition_hazards[i]],
+    b.riskClassifications = b.riskClassifications + [i IN fresh | row.risk_classifications[i]]
+SET b.count = size(b.timestamps),
+    b.firstTimestamp = reduce(m = b.timestamps[0], t IN b.timestamps | CASE WHEN t < m THEN t ELSE m END),
+    b.lastTimestamp = reduce(m = b.timestamps[0], t IN b.timestamps | CASE WHEN t > m THEN t ELSE m END),
+    b.minProbability = reduce(m = 1.0, v IN b.failureProbabilities | CASE WHEN v < m THEN v ELSE m END),
+    b.maxProbability = reduce(m = 0.0, v IN b.failureProbabilities | CASE WHEN v > m THEN v ELSE m END)
+"""
+
+# Every dated prediction except each pump's newest dated one, with its hazard node (if
+# any). Undated predictions are never compacted: DESC would sort them first and the
+# real newest prediction would be pruned, and they have no bucket to go to.
+STALE_PREDICTIONS_QUERY = """
+UNWIND $pump_ids AS pump_id
+MATCH (p:DryPump {pumpIdentifier: pump_id})-[:HAS_FAILURE_PREDICTION]->(pred:ThirtyDayFailureProbability)
+WHERE pred.predictionTimestamp IS NOT NULL
+WITH p, pred ORDER BY pred.predictionTimestamp DESC
+WITH p, collect(pred)[1..] AS stale
+UNWIND stale AS pred
+OPTIONAL MATCH (h:BlendedHazardFunction)-[:GENERATES_PREDICTION]->(pred)
+RETURN p.pumpIdentifier AS pump_id,
+       elementId(pred) AS prediction_element,
+       elementId(h) AS hazard_element,
+       EXISTS { (:MaintenanceReport)-[:INCLUDES_PREDICTION]->(pred) } AS referenced,
+       pred.predictionTimestamp AS timestamp,
+       pred.failureProbability AS failure_probability,
+       pred.riskClassification AS risk_classification,
+       h.blendedHazard AS blended_hazard,
+       h.weibullHazard AS weibull_hazard,
+       h.conditionHazard AS condition_hazard
+"""
+
+DELETE_QUERY = """
+UNWIND $element_ids AS element_id
+MATCH (n) WHERE elementId(n) = element_id
+DETACH DELETE n
+"""
+
+PUMP_PAGE_QUERY = """
+MATCH (p:DryPump)
+WHERE $after IS NULL OR p.pumpIdentifier > $after
+RETURN p.pumpIdentifier AS pump_id
+ORDER BY pump_id
+LIMIT $limit
+"""
+
+READ_BUCKETS_QUERY = """
+UNWIND $pump_ids AS pump_id
+MATCH (b:PredictionHistoryBucket)
+WHERE b.pumpIdentifier = pump_id
+  AND b.bucketStart >= $first_bucket AND b.bucketStart < $end
+  AND ($min_probability IS NULL OR b.maxProbability >= $min_probability)
+RETURN b.pumpIdentifier AS pump_id, b.timestamps AS timestamps,
+       b.failureProbabilities AS failure_probability, b.blendedHazards AS blended_hazard,
+       b.weibullHazards AS weibull_hazard, b.conditionHazards AS condition_hazard,
+       b.riskClassifications AS risk_classification
+"""
+
+# Fleet-wide scan that only opens buckets whose summary straddles the threshold
+CROSSING_CANDIDATES_QUERY = """
+MATCH (b:PredictionHistoryBucket)
+WHERE b.bucketStart >= $first_bucket AND b.bucketStart < $end
+  AND b.maxProbability >= $threshold
+RETURN DISTINCT b.pumpIdentifier AS pump_id
+"""
+
+
+def bucket_start(timestamp, bucket="day"):
+    """Start of the day (UTC midnight) or week (Monday) containing `timestamp`"""
+    start = timestamp.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "week":
+        start -= timedelta(days=start.weekday())
+    return start
+
+
+def _float(value):
+    return float("nan") if value is None else float(value)
+
+
+def bucket_rows(predictions, bucket="day"):
+    """
+    Group prediction dicts into one APPEND_QUERY row per pump and bucket.
+
+    Each prediction needs pump_id, timestamp (aware datetime) and
+    failure_probability; hazard values and risk_classification are optional.
+    """
+    grouped = {}
+    for prediction in predictions:
+        timestamp = prediction["timestamp"]
+        if timestamp is None:
+            continue
+        if hasattr(timestamp, "to_native"):
+            timestamp = timestamp.to_native()
+        start = bucket_start(timestamp, bucket)
+        key = (prediction["pump_id"], start)
+        row = grouped.get(key)
+        if row is None:
+            row = grouped[key] = {
+                "pump_id": prediction["pump_id"],
+                "bucket_id": f"PHIST_{prediction['pump_id']}_{start:%Y%m%d}_{bucket[0].upper()}",
+                "bucket_start": start,
+                "bucket_size": bucket,
+                "timestamps": [],
+                "failure_probabilities": [],
+                "blended_hazards": [],
+                "weibull_hazards": [],
+                "condition_hazards": [],
+                "risk_classifications": [],
+            }
+        row["timestamps"].append(timestamp.timestamp())
+        row["failure_probabilities"].append(_float(prediction["failure_probability"]))
+        row["blended_hazards"].append(_float(prediction.get("blended_hazard")))
+        row["weibull_hazards"].append(_float(prediction.get("weibull_hazard")))
+        row["condition_hazards"].append(_float(prediction.get("condition_hazard")))
+        row["risk_classifications"].append(prediction.get("risk_classification") or "")
+    return list(grouped.values())
+
+
+# ----------------------------------------------------------------------
+# Array analytics (times are epoch seconds, sorted ascending)
+# ----------------------------------------------------------------------
+
+def rolling_mean(times, values, window_seconds):
+    """Trailing time-window mean at every sample, ignoring NaNs"""
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    starts = np.searchsorted(times, times - window_seconds, side="left")
+    ends = np.arange(1, len(times) + 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (sums[ends] - sums[starts]) / (counts[ends] - counts[starts])
+
+
+def slope_per_day(times, values):
+    """Least-squares slope of values over time, in units per day (NaN if < 2 points)"""
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    if valid.sum() < 2:
+        return float("nan")
+    days = (times[valid] - times[valid][0]) / 86400.0
+    if np.ptp(days) == 0:
+        return float("nan")
+    return float(np.polyfit(days, values[valid], 1)[0])
+
+
+def threshold_crossings(times, values, threshold):
+    """Samples where values cross `threshold`: list of (epoch seconds, "up"|"down", value)"""
+    values = np.asarray(values, dtype=np.float64)
+    above = values >= threshold
+    changes = np.flatnonzero(above[1:] != above[:-1]) + 1
+    return [
+        (float(times[i]), "up" if above[i] else "down", float(values[i]))
+        for i in changes
+    ]
+
+
+class PredictionHistoryStore:
+    """Bucketed prediction history in Neo4j with whole-bucket windowed reads"""
+
+    def __init__(self, driver, bucket="day", chunk_size=500, database=None):
+        if bucket not in BUCKET_SIZES:
+            raise ValueError(f"bucket must be one of {sorted(BUCKET_SIZES)}")
+        self.driver = driver
+        self.bucket = bucket
+        self.chunk_size = chunk_size
+        self.database = database
+
+    def ensure_schema(self):
+        with self.driver.session(database=self.database) as session:
+            for query in SCHEMA_QUERIES:
+                session.run(query).consume()
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def _compact_pumps(self, tx, pump_ids):
+        stale = tx.run(STALE_PREDICTIONS_QUERY, pump_ids=pump_ids).data()
+        if not stale:
+            return 0, 0
+        tx.run(APPEND_QUERY, rows=bucket_rows(stale, self.bucket)).consume()
+        doomed = [
+            element
+            for record in stale if not record["referenced"]
+            for element in (record["prediction_element"], record["hazard_element"])
+            if element is not None
+        ]
+        tx.run(DELETE_QUERY, element_ids=doomed).consume()
+        return len(stale), len(doomed)
+
+    def record(self, predictions):
+        """
+        Append freshly written predictions to their buckets and retire each
+        pump's superseded prediction nodes into history in the same transaction.
+
+        `predictions` are FleetHazardEngine.prediction_rows() dicts.
+        """
+        totals = {"appended": 0, "compacted": 0, "deleted": 0}
+
+        def write(tx, chunk):
+            tx.run(APPEND_QUERY, rows=bucket_rows(chunk, self.bucket)).consume()
+            return self._compact_pumps(tx, sorted({p["pump_id"] for p in chunk}))
+
+        with self.driver.session(database=self.database) as session:
+            for start in range(0, len(predictions), self.chunk_size):
+                chunk = predictions[start:start + self.chunk_size]
+                compacted, deleted = session.execute_write(write, chunk)
+                totals["appended"] += len(chunk)
+                totals["compacted"] += compacted
+                totals["deleted"] += deleted
+        return totals
+
+    def compact(self, pump_ids=None):
+        """Move all but each pump's newest prediction into history, one page of pumps per transaction"""
+        totals = {"pumps": 0, "compacted": 0, "deleted": 0}
+        with self.driver.session(database=self.database) as session:
+            if pump_ids is not None:
+                pump_ids = list(pump_ids)
+                pages = [pump_ids[i:i + self.chunk_size]
+                         for i in range(0, len(pump_ids), self.chunk_size)]
+            else:
+                pages = self._pump_pages(session)
+            for page in pages:
+                compacted, deleted = session.execute_write(self._compact_pumps, page)
+                totals["pumps"] += len(page)
+                totals["compacted"] += compacted
+                totals["deleted"] += deleted
+        return totals
+
+    def _pump_pages(self, session):
+        after = None
+        while True:
+            page = [r["pump_id"] for r in session.run(PUMP_PAGE_QUERY, after=after, limit=self.chunk_size)]
+            if not page:
+                return
+            yield page
+            after = page[-1]
+
+    # ------------------------------------------------------------------
+    # Windowed reads
+    # ------------------------------------------------------------------
+
+    def _window(self, window, end):
+        end = end or datetime.now(timezone.utc)
+        start = end - window
+        return start, end
+
+    def histories(self, pump_ids, start, end, min_probability=None):
+        """
+        Whole-bucket read of every sample in [start, end) for many pumps.
+
+        Returns:
+            {pump_id: dict of NumPy arrays (times, failure_probability,
+            blended_hazard, weibull_hazard, condition_hazard,
+            risk_classification)} sorted by time
+        """
+        def read(tx):
+            return tx.run(
+                READ_BUCKETS_QUERY, pump_ids=list(pump_ids),
+                first_bucket=bucket_start(start, self.bucket), end=end,
+                min_probability=min_probability,
+            ).data()
+
+        with self.driver.session(database=self.database) as session:
+            buckets = session.execute_read(read)
+
+        grouped = {}
+        for b in buckets:
+            grouped.setdefault(b["pump_id"], []).append(b)
+
+        lo, hi = start.timestamp(), end.timestamp()
+        series = {}
+        for pump_id, pump_buckets in grouped.items():
+            times = np.concatenate([np.asarray(b["timestamps"], dtype=np.float64) for b in pump_buckets])
+            order = np.argsort(times, kind="stable")
+            keep = order[(times[order] >= lo) & (times[order] < hi)]
+            arrays = {"times": times[keep]}
+            for metric in METRICS:
+                values = np.concatenate(
+                    [np.asarray(b[metric], dtype=np.float64) for b in pump_buckets]
+                )
+                arrays[metric] = values[keep]
+            classes = np.concatenate(
+                [np.asarray(b["risk_classification"], dtype=object) for b in pump_buckets]
+            )
+            arrays["risk_classification"] = classes[keep]
+            series[pump_id] = arrays
+        return series
+
+    def history(self, pump_id, start, end):
+        empty = {"times": np.empty(0), **{m: np.empty(0) for m in METRICS},
+                 "risk_classification": np.empty(0, dtype=object)}
+        return self.histories([pump_id], start, end).get(pump_id, empty)
+
+    def trend(self, pump_id, window=timedelta(days=7), end=None, metric="failure_probability",
+              rolling_window=timedelta(days=1)):
+        """Summary statistics, least-squares slope and trailing rolling mean over a window"""
+        start, end = self._window(window, end)
+        series = self.history(pump_id, start, end)
+        times, values = series["times"], series[metric]
+        if len(times) == 0:
+            return {"pump_id": pump_id, "metric": metric, "count": 0}
+        rolling = rolling_mean(times, values, rolling_window.total_seconds())
+        return {
+            "pump_id": pump_id,
+            "metric": metric,
+            "count": int(len(times)),
+            "first": float(values[0]),
+            "last": float(values[-1]),
+            "mean": float(np.nanmean(values)),
+            "min": float(np.nanmin(values)),
+            "max": float(np.nanmax(values)),
+            "slope_per_day": slope_per_day(times, values),
+            "rolling_mean": float(rolling[-1]),
+            "window_start": start,
+            "window_end": end,
+        }
+
+    def crossings(self, pump_id, threshold, window=timedelta(days=30), end=None,
+                  metric="failure_probability"):
+        """Threshold crossings of one pump as (datetime, direction, value) tuples"""
+        start, end = self._window(window, end)
+        series = self.history(pump_id, start, end)
+        return [
+            (datetime.fromtimestamp(t, timezone.utc), direction, value)
+            for t, direction, value in threshold_crossings(series["times"], series[metric], threshold)
+        ]
+
+    def pumps_crossing(self, threshold, window=timedelta(days=1), end=None):
+        """
+        Pumps whose failure probability crossed `threshold` upward inside the
+        window. Bucket maxProbability summaries prune the candidates first.
+        """
+        start, end = self._window(window, end)
+        first_bucket = bucket_start(start, self.bucket)
+        with self.driver.session(database=self.database) as session:
+            candidates = [r["pump_id"] for r in session.run(
+                CROSSING_CANDIDATES_QUERY, first_bucket=first_bucket, end=end, threshold=threshold
+            )]
+        if not candidates:
+            return {}
+
+        # Read one extra bucket of lead-in so a crossing at the window edge is seen
+        lead_in = start - BUCKET_SIZES[self.bucket]
+        series = self.histories(candidates, lead_in, end)
+        crossed = {}
+        for pump_id, arrays in series.items():
+            ups = [
+                (datetime.fromtimestamp(t, timezone.utc), value)
+                for t, direction, value in threshold_crossings(
+                    arrays["times"], arrays["failure_probability"], threshold)
+                if direction == "up" and t >= start.timestamp()
+            ]
+            if ups:
+                crossed[pump_id] = ups
+        return crossed
@@ -0,0 +1,531 @@
+"""
+quantized_vectors.py
+Compact quantized SemanticVector embeddings with full-precision re-ranking
+
+SemanticVector.embedding is a 1536-float list property: Neo4j stores it as a
+double array (8 bytes per dimension, ~12 KB per node), which dominates store
+size and page-cache pressure once the vector layer grows. CompactVectorIndex
+keeps a compact copy instead:
+
+- codes: float16 (2 bytes/dim) or int8 (1 byte/dim, per-dimension symmetric
+  scale) scalar quantization, optionally after a PCA projection to
+  `dimensions` components; held in RAM and scanned with NumPy
+- full precision: float32 rows in the memory-mapped file of a LocalVectorIndex
+  (ann_index.py) in the same directory, synced incrementally by text_hash
+- query: score every live row on the codes, keep the `rerank` × k best
+  candidates, re-rank those on the full-precision memmap rows (exact cosine,
+  same (1 + cosine) / 2 score scale as the Neo4j index)
+- optional graph write-back: sv.embedding_q (byte array), sv.embedding_codec
+  and sv.embedding_dimensions. sv.embedding itself is kept: the notebook,
+  HybridRetriever and Neo4jVector query semantic_concepts_vector_index, and a
+  rebuilt mirror needs the full-precision vectors from the graph
+- benchmark(): recall@k, latency and memory of each codec against exact
+  float32 cosine, and against the live COSINE index when a driver is given
+
+SETUP:
+1. Create .env file with NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD
+2. Install: pip install -r requirements.txt
+3. Run: python quantized_vectors.py [--codec int8] [--dimensions 256] [--write-codes]
+   Benchmark the existing mirror without syncing: python quantized_vectors.py --benchmark
+   Offline benchmark (no database): python quantized_vectors.py --synthetic 100000
+
+USAGE:
+    index = CompactVectorIndex(".compact_vectors", codec="int8", dimensions=256)
+    index.sync_from_neo4j(driver, write_codes=True)
+    hits = index.query(embeddings.embed_query("vacuum pump equipment failure"), k=3)
+    print(index.memory())
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from ann_index import LocalVectorIndex, normalize_rows
+from bulk_graph_writer import BulkGraphWriter
+from fleet_benchmark import summarize
+
+CODECS = ("float16", "int8")
+DEFAULT_STORE_DIR = ".compact_vectors"
+DEFAULT_RERANK = 4
+NEO4J_BYTES_PER_DIMENSION = 8
+BLOCK_ROWS = 65536
+INT8_LIMIT = 127.0
+
+# (codec, reduced dimensions) compared by benchmark(); None keeps every dimension
+BENCHMARK_CONFIGS = (("float16", None), ("int8", None), ("float16", 256), ("int8", 256))
+
+WRITE_CODES_QUERY = """
+UNWIND $rows AS row
+MATCH (sv:SemanticVector {concept_id: row.concept_id})
+SET sv.embedding_q = row.codes,
+    sv.embedding_codec = row.codec,
+    sv.embedding_dimensions = row.dimensions
+"""
+
+class ScalarQuantizer:
+    """float16 / int8 scalar quantizer over an optional PCA projection"""
+
+    def __init__(self, codec="int8", dimensions=None):
+        if codec not in CODECS:
+            raise ValueError(f"codec must be one of {CODECS}, not {codec!r}")
+        self.codec = codec
+        self.dimensions = dimensions
+        self.projection = None
+        self.scale = None
+        self.fitted = False
+
+    @property
+    def codec_id(self):
+        reduced = f"-pca{self.projection.shape[1]}" if self.projection is not None else ""
+        return f"{self.codec}{reduced}"
+
+    @property
+    def dtype(self):
+        return np.float16 if self.codec == "float16" else np.int8
+
+    def fit(self, vectors, sample_size=20000, seed=0):
+        """Fit the projection (uncentered PCA, so dot products carry over) and int8 scales"""
+        vectors = normalize_rows(vectors)
+        if len(vectors) > sample_size:
+            rng = np.random.default_rng(seed)
+            vectors = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+
+        self.projection = None
+        if self.dimensions and self.dimensions < vectors.shape[1]:
+            # Top eigenvectors of XᵀX: a D×D problem however many rows are sampled
+            _, eigenvectors = np.linalg.eigh(vectors.T @ vectors)
+            self.projection = np.ascontiguousarray(
+                eigenvectors[:, ::-1][:, :self.dimensions], dtype=np.float32
+            )
+
+        self.scale = None
+        if self.codec == "int8":
+            peak = np.abs(self.project(vectors)).max(axis=0)
+            peak[peak == 0] = 1.0
+            self.scale = (peak / INT8_LIMIT).astype(np.float32)
+        self.fitted = True
+        return self
+
+    def project(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return vectors @ self.projection if self.projection is not None else vectors
+
+    def encode(self, vectors):
+        """Unit-normalized float vectors → codes (one row per vector)"""
+        projected = self.project(normalize_rows(vectors))
+        if self.codec == "float16":
+            return projected.astype(np.float16)
+        return np.clip(np.rint(projected / self.scale), -INT8_LIMIT, INT8_LIMIT).astype(np.int8)
+
+    def score(self, codes, query):
+        """Approximate dot products of one unit query with every code row"""
+        query = self.project(query)
+        if self.scale is not None:
+            query = query * self.scale
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), BLOCK_ROWS):
+            block = codes[start:start + BLOCK_ROWS].astype(np.float32)
+            scores[start:start + len(block)] = block @ query
+        return scores
+
+    def state(self):
+        arrays = {}
+        if self.projection is not None:
+            arrays["projection"] = self.projection
+        if self.scale is not None:
+            arrays["scale"] = self.scale
+        return arrays
+
+    def load_state(self, arrays):
+        self.projection = arrays.get("projection")
+        self.scale = arrays.get("scale")
+        self.fitted = True
+        return self
+
+
+class CompactVectorIndex:
+    """Quantized codes in RAM, full-precision rows in a LocalVectorIndex memmap"""
+
+    def __init__(self, directory=DEFAULT_STORE_DIR, codec="int8", dimensions=None,
+                 rerank=DEFAULT_RERANK, full=None):
+        self.directory = directory
+        self.rerank = rerank
+        # Exhaustive code scans replace IVF here, so the full index never trains centroids
+        self.full = full or LocalVectorIndex(directory, ivf_threshold=sys.maxsize)
+        self.quantizer = ScalarQuantizer(codec, dimensions)
+        self.codes = np.zeros((0, 0), dtype=self.quantizer.dtype)
+        self.encoded = []
+        self._load()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _load(self):
+        if not os.path.exists(self._path("codes.json")):
+            return
+        with open(self._path("codes.json")) as f:
+            state = json.load(f)
+        if (state["codec"], state["dimensions"]) != (self.quantizer.codec, self.quantizer.dimensions):
+            # Different settings: re-encode from the full-precision rows on the next sync
+            return
+        self.encoded = state["encoded"]
+        with np.load(self._path("quantizer.npz")) as arrays:
+            self.quantizer.load_state({name: arrays[name] for name in arrays.files})
+        self.codes = np.load(self._path("codes.npy"))
+
+    def _save(self):
+        self.full._save()
+        np.save(self._path("codes.npy"), self.codes)
+        np.savez(self._path("quantizer.npz"), **self.quantizer.state())
+        with open(self._path("codes.json"), "w") as f:
+            json.dump({
+                "codec": self.quantizer.codec,
+                "dimensions": self.quantizer.dimensions,
+                "codec_id": self.quantizer.codec_id,
+                "encoded": self.encoded,
+            }, f)
+
+    # ------------------------------------------------------------------
+    # Encoding
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        return len(self.full)
+
+    def _row_keys(self):
+        return [[m["concept_id"], m["text_hash"]] for m in self.full.metadata]
+
+    def _encode_rows(self, start):
+        rows = len(self.full.metadata)
+        blocks = [
+            self.quantizer.encode(np.asarray(self.full.matrix[i:i + BLOCK_ROWS]))
+            for i in range(start, rows, BLOCK_ROWS)
+        ]
+        return np.concatenate(blocks) if blocks else self.codes[:0]
+
+    def encode(self, refit=False):
+        """
+        Bring the codes in line with the full-precision rows.
+
+        Appended rows are encoded with the current quantizer; a compaction,
+        a refit or a first run re-encodes everything.
+
+        Returns:
+            Row numbers whose codes were (re)written
+        """
+        keys = self._row_keys()
+        prefix = len(self.encoded)
+        reuse = (not refit and self.quantizer.fitted and len(self.codes) == prefix
+                 and keys[:prefix] == self.encoded)
+        if not reuse:
+            live = np.flatnonzero(self.full.alive)
+            if len(live) == 0:
+                self.codes = np.zeros((0, 0), dtype=self.quantizer.dtype)
+                self.encoded = []
+                return np.zeros(0, dtype=np.int64)
+            self.quantizer.fit(np.asarray(self.full.matrix[live]))
+            prefix = 0
+            self.codes = self.codes[:0].reshape(0, 0)
+
+        tail = self._encode_rows(prefix)
+        self.codes = np.concatenate([self.codes.reshape(-1, tail.shape[1]), tail]) if prefix else tail
+        self.encoded = keys
+        return np.arange(prefix, len(keys))
+
+    def upsert(self, rows):
+        """Add or replace rows (metadata fields plus `embedding`) and encode them"""
+        self.full.upsert(rows)
+        return self.encode()
+
+    def delete(self, concept_ids):
+        self.full.delete(concept_ids)
+
+    def sync_from_neo4j(self, driver, database=None, batch_size=1000, write_codes=False,
+                        chunk_size=1000):
+        """
+        Mirror SemanticVector nodes (changed rows only) and refresh their codes.
+
+        write_codes stores the codes on the nodes next to sv.embedding.
+        """
+        stats = self.full.sync_from_neo4j(driver, database=database, batch_size=batch_size)
+        rows = self.encode()
+        self._save()
+        stats["encoded"] = len(rows)
+
+        if write_codes:
+            writer = BulkGraphWriter(driver, chunk_size=chunk_size, database=database)
+            payload = [
+                {
+                    "concept_id": self.full.metadata[row]["concept_id"],
+                    "codes": self.codes[row].tobytes(),
+                    "codec": self.quantizer.codec_id,
+                    "dimensions": self.full.dimensions,
+                }
+                for row in rows if self.full.alive[row]
+            ]
+            stats["codes_written"] = writer.write(WRITE_CODES_QUERY, payload)["properties_set"]
+        return stats
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def approximate(self, embedding, k=3):
+        """Top-k row numbers and scores from the codes alone (no re-ranking)"""
+        query = normalize_rows(embedding)
+        scores = self.quantizer.score(self.codes, query)
+        scores[~self.full.alive] = -np.inf
+        k = min(k, len(self))
+        if k == 0:
+            return np.zeros(0, dtype=np.int64), scores[:0]
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return top, scores[top]
+
+    def query(self, embedding, k=3, rerank=None):
+        """Approximate candidates on the codes, exact cosine re-ranking on the memmap"""
+        candidates, _ = self.approximate(embedding, k * (rerank or self.rerank))
+        # Sorted rows turn the re-rank into forward reads of the memory-mapped file
+        return self.full._top_k(np.sort(candidates), normalize_rows(embedding), k)
+
+    def search(self, text, embeddings, k=3):
+        """Embed `text` with a LangChain Embeddings object and query the compact index"""
+        return self.query(embeddings.embed_query(text), k)
+
+    def recall_at_k(self, query_embeddings, k=10, rerank=None):
+        """Mean fraction of exact float32 top-k concept_ids also returned by query()"""
+        recalls = []
+        for embedding in query_embeddings:
+            exact = {hit["concept_id"] for hit in self.full.brute_force(embedding, k)}
+            if exact:
+                found = {hit["concept_id"] for hit in self.query(embedding, k, rerank)}
+                recalls.append(len(exact & found) / len(exact))
+        return float(np.mean(recalls)) if recalls else 1.0
+
+    def memory(self):
+        """Bytes held in RAM (codes), on local disk (full rows) and as Neo4j float lists"""
+        rows, dimensions = len(self.full.metadata), self.full.dimensions or 0
+        code_bytes = int(self.codes.shape[1] * self.codes.itemsize) if self.codes.ndim == 2 else 0
+        return {
+            "codec": self.quantizer.codec_id,
+            "rows": rows,
+            "code_bytes_per_vector": code_bytes,
+            "resident_code_bytes": int(self.codes.nbytes),
+            "memmap_bytes": rows * dimensions * 4,
+            "neo4j_float_list_bytes": rows * dimensions * NEO4J_BYTES_PER_DIMENSION,
+        }
+
+
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+
+def synthetic_embeddings(rows, dimensions=1536, intrinsic=64, seed=0):
+    """Anisotropic unit vectors (low-rank signal plus noise), like text embeddings"""
+    rng = np.random.default_rng(seed)
+    basis = rng.normal(size=(intrinsic, dimensions)).astype(np.float32)
+    weights = (1.0 / np.arange(1, intrinsic + 1) ** 0.5).astype(np.float32)
+    latent = rng.normal(size=(rows, intrinsic)).astype(np.float32) * weights
+    noise = rng.normal(scale=0.35, size=(rows, dimensions)).astype(np.float32)
+    return normalize_rows(latent @ basis / np.sqrt(intrinsic) + noise / np.sqrt(dimensions) * 4)
+
+
+def _neighbour_queries(vectors, count, seed=1):
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(vectors), size=min(count, len(vectors)), replace=False)
+    noise = rng.normal(scale=0.02, size=(len(rows), vectors.shape[1])).astype(np.float32)
+    return normalize_rows(np.asarray(vectors[rows]) + noise)
+
+
+def _recall(exact, found):
+    return float(np.mean([len(set(a) & set(b)) / len(a) for a, b in zip(exact, found) if len(a)]))
+
+
+def benchmark(vectors, queries=100, k=10, configs=BENCHMARK_CONFIGS, rerank=DEFAULT_RERANK,
+              concept_ids=None, driver=None, index_name="semantic_concepts_vector_index",
+              database=None, write_codes=False):
+    """
+    Compare each (codec, dimensions) config with exact float32 cosine.
+
+    All configs share one full-precision memmap. With a driver, the live
+    COSINE index is timed on the same queries too; pass the vectors'
+    `concept_ids` so its hits can be matched against the exact top-k.
+
+    sv.embedding is never removed, so a codec does not shrink the Neo4j
+    store: its Neo4j figure is the float list, plus the codes when
+    `write_codes` stores them as sv.embedding_q.
+
+    Returns:
+        List of result dicts: name, recall@k, latency summary, memory figures
+    """
+    vectors = normalize_rows(vectors)
+    queries = _neighbour_queries(vectors, queries) if np.isscalar(queries) else normalize_rows(queries)
+    concept_ids = list(concept_ids) if concept_ids is not None else [
+        f"BENCH_{i:07d}" for i in range(len(vectors))
+    ]
+    neo4j_bytes = vectors.shape[1] * NEO4J_BYTES_PER_DIMENSION
+    directory = tempfile.mkdtemp(prefix="compact_vectors_")
+    results = []
+
+    try:
+        full = LocalVectorIndex(directory, ivf_threshold=sys.maxsize)
+        full.upsert({"concept_id": cid, "text_hash": cid, "embedding": vectors[i]}
+                    for i, cid in enumerate(concept_ids))
+        latencies, exact = [], []
+        for query in queries:
+            started = time.perf_counter()
+            hits = full.brute_force(query, k)
+            latencies.append(time.perf_counter() - started)
+            exact.append([hit["concept_id"] for hit in hits])
+        results.append({
+            "name": "float32 exact cosine",
+            "recall_at_k": 1.0,
+            "latency": summarize(latencies),
+            "code_bytes_per_vector": vectors.shape[1] * 4,
+            "resident_bytes": int(vectors.nbytes),
+            "neo4j_bytes_per_vector": neo4j_bytes,
+        })
+
+        for codec, dimensions in configs:
+            index = CompactVectorIndex(directory, codec=codec, dimensions=dimensions,
+                                       rerank=rerank, full=full)
+            started = time.perf_counter()
+            index.encode(refit=True)
+            encode_seconds = time.perf_counter() - started
+
+            approximate, reranked, latencies = [], [], []
+            for query in queries:
+                rows, _ = index.approximate(query, k)
+                approximate.append([full.metadata[row]["concept_id"] for row in rows])
+                started = time.perf_counter()
+                hits = index.query(query, k)
+                latencies.append(time.perf_counter() - started)
+                reranked.append([hit["concept_id"] for hit in hits])
+            memory = index.memory()
+            results.append({
+                "name": f"{index.quantizer.codec_id} + rerank x{rerank}",
+                "recall_at_k": round(_recall(exact, reranked), 4),
+                "recall_at_k_without_rerank": round(_recall(exact, approximate), 4),
+                "latency": summarize(latencies),
+                "encode_seconds": round(encode_seconds, 3),
+                "code_bytes_per_vector": memory["code_bytes_per_vector"],
+                "resident_bytes": memory["resident_code_bytes"],
+                "neo4j_bytes_per_vector": neo4j_bytes + (memory["code_bytes_per_vector"]
+                                                         if write_codes else 0),
+            })
+
+        if driver is not None:
+            latencies, found = [], []
+            with driver.session(database=database) as session:
+                for query in queries:
+                    started = time.perf_counter()
+                    records = session.run(
+                        "CALL db.index.vector.queryNodes($index_name, $k, $embedding) "
+                        "YIELD node RETURN node.concept_id AS concept_id",
+                        index_name=index_name, k=k, embedding=query.tolist(),
+                    )
+                    found.append([record["concept_id"] for record in records])
+                    latencies.append(time.perf_counter() - started)
+            results.append({
+                "name": f"Neo4j COSINE index ({index_name})",
+                "recall_at_k": round(_recall(exact, found), 4),
+                "latency": summarize(latencies),
+                "code_bytes_per_vector": neo4j_bytes,
+                "resident_bytes": None,
+                "neo4j_bytes_per_vector": neo4j_bytes,
+            })
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def print_benchmark(results, k=10):
+    print(f"\n📊 Recall@{k} / latency / memory vs exact float32 cosine:")
+    for result in results:
+        latency = result["latency"]
+        resident = result["resident_bytes"]
+        resident = f"{resident / 2**20:8.1f} MiB" if resident is not None else "  (server)  "
+        no_rerank = result.get("recall_at_k_without_rerank")
+        no_rerank = f" (codes only {no_rerank:.3f})" if no_rerank is not None else ""
+        print(f"   • {result['name']:<34} recall {result['recall_at_k']:.3f}{no_rerank:<20} "
+              f"p50 {latency['p50_ms']:8.3f}ms  p95 {latency['p95_ms']:8.3f}ms  "
+              f"{result['code_bytes_per_vector']:>6} B/vector  {resident}  "
+              f"Neo4j {result['neo4j_bytes_per_vector']:>6} B/vector")
+    print("   ℹ️  sv.embedding is kept, so codes do not shrink the Neo4j store "
+          "(--write-codes adds sv.embedding_q on top)")
+
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+if __name__ == "__main__":
+    def option(name, default):
+        if name in sys.argv:
+            return sys.argv[sys.argv.index(name) + 1]
+        return default
+
+    k = int(option("--k", "10"))
+    rerank = int(option("--rerank", str(DEFAULT_RERANK)))
+
+    if "--synthetic" in sys.argv:
+        rows = int(option("--synthetic", "100000"))
+        print(f"\n🧪 Benchmarking codecs on {rows} synthetic 1536-dimension embeddings...")
+        print_benchmark(benchmark(synthetic_embeddings(rows), k=k, rerank=rerank), k)
+        sys.exit(0)
+
+    from dotenv import load_dotenv
+    from neo4j import GraphDatabase
+
+    load_dotenv()
+
+    password = os.getenv("NEO4J_PASSWORD")
+    if not password:
+        print("❌ ERROR: NEO4J_PASSWORD is not set - create a .env file first")
+        sys.exit(1)
+
+    driver = GraphDatabase.driver(
+        os.getenv("NEO4J_URI", "neo4j://localhost:7687"),
+        auth=(os.getenv("NEO4J_USERNAME", "neo4j"), password),
+    )
+    try:
+        dimensions = option("--dimensions", None)
+        index = CompactVectorIndex(
+            os.getenv("COMPACT_VECTOR_DIR", DEFAULT_STORE_DIR),
+            codec=option("--codec", "int8"),
+            dimensions=int(dimensions) if dimensions else None,
+            rerank=rerank,
+        )
+        if "--benchmark" not in sys.argv:
+            started = time.perf_counter()
+            stats = index.sync_from_neo4j(driver, write_codes="--write-codes" in sys.argv)
+            print(f"🔄 Synced compact vector index in {time.perf_counter() - started:.2f}s")
+            print(f"   Upserted: {stats['upserted']}  Deleted: {stats['deleted']}  "
+                  f"Encoded: {stats['encoded']}  Total: {stats['total']}")
+            if stats["missing_embeddings"]:
+                print(f"   ⚠️  {stats['missing_embeddings']} SemanticVector nodes have no sv.embedding - "
+                      f"run semantic-vectorization.py --incremental (cached embeddings are reused)")
+            memory = index.memory()
+            print(f"   💾 {memory['codec']}: {memory['code_bytes_per_vector']} B/vector in RAM "
+                  f"vs {index.full.dimensions * NEO4J_BYTES_PER_DIMENSION} B as a Neo4j float list "
+                  f"(kept in the store)")
+
+        if len(index):
+            live = np.flatnonzero(index.full.alive)
+            k = min(k, len(live))
+            print_benchmark(benchmark(
+                np.asarray(index.full.matrix[live]), k=k, rerank=rerank, driver=driver,
+                concept_ids=[index.full.metadata[row]["concept_id"] for row in live],
+                write_codes="--write-codes" in sys.argv,
+            ), k)
+    finally:
+        driver.close()
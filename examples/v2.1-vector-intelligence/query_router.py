@@ -0,0 +1,438 @@
+"""
+query_router.py
+Local pre-router that answers clear-cut agent questions without the supervisor LLM
+
+Every search() in the GraphRAG notebook goes supervisor LLM → ReAct agent LLM
+→ tool, i.e. two or more gpt-4o round-trips before any data is read, even for
+"What is the pumping speed of DryPump P002?". FastToolRouter classifies the
+question locally first and calls the tool itself when the answer is obvious:
+
+- schema        → neo4j_schema tool
+- exact_lookup  → a CypherTemplateLibrary template (pump property, risk
+                  threshold/class, pumps per chamber/tool) run directly
+- semantic      → semantic_similarity_search tool (hybrid vector + 2-hop)
+- complex       → supervisor, as before
+
+Classification combines regexes (schema wording, a matching Cypher template)
+with nearest labeled examples: the example questions in ROUTING_EXAMPLES are
+embedded once and persisted in the embedding cache, the question is embedded
+through the agent's CachedQueryEmbeddings (so semantic search reuses the same
+vector), and each route scores the mean of its `neighbours` best cosine
+similarities. A template only answers when exact_lookup is also the nearest
+route by `min_margin`. A question falls through to the supervisor when the best
+score is below `min_similarity`, the margin to the runner-up is below `min_margin`,
+it looks like an exact lookup no template can answer, or it names a pump or
+chamber ID but would be routed to semantic search. Compound questions ("why",
+"compare", "... and how does that affect ...") never take a template shortcut.
+
+dispatch() records fast-path and supervisor latencies, so stats() reports the
+latency saved; evaluate() reports routing accuracy, coverage and a confusion
+matrix on a labeled set (EVALUATION_SET by default).
+
+SETUP:
+1. Create .env file with OPENAI_API_KEY (or pass --fake-embeddings to run offline)
+2. Install: pip install -r requirements.txt
+3. Run: python query_router.py [--fake-embeddings] [--min-margin 0.02]
+
+USAGE:
+    router = FastToolRouter(query_embeddings, tools, cypher_templates, connections.driver)
+    answer = router.dispatch(question, fallback=supervisor_search)
+    print(router.stats())
+    print(router.evaluate())
+"""
+
+from collections import Counter
+import re
+import threading
+import time
+
+import numpy as np
+
+from cypher_templates import format_template_result
+from embedding_cache import DEFAULT_CACHE_PATH, EmbeddingCache
+from tool_cache import normalize_query
+
+ROUTES = ("schema", "exact_lookup", "semantic", "complex")
+SUPERVISOR = "supervisor"
+ROUTE_TOOLS = {"schema": "neo4j_schema", "semantic": "semantic_similarity_search"}
+
+SCHEMA_PATTERN = re.compile(
+    r"\b(?:schema|node\s+labels?|relationship\s+types?|data\s+model|ontology\s+structure"
+    r"|(?:structure|layout)\s+of\s+the\s+(?:graph|database|knowledge\s+graph))\b"
+)
+ENTITY_ID_PATTERN = re.compile(r"\b(?:p\d{2,}|ch\d+)\b")
+# Follow-up clauses ("... and how does that affect ...") make a template answer incomplete
+COMPOUND_PATTERN = re.compile(
+    r"\b(?:why|compar\w*|versus|vs\.?|explain|recommend|suggest|propose|plan|estimate)(?!\w)"
+    r"|\band\s+(?:how|what|which|why|when|where|who|tell|explain)\b"
+)
+
+ROUTING_EXAMPLES = (
+    ("What's the current database schema?", "schema"),
+    ("Show me the graph schema", "schema"),
+    ("Which node labels exist in the database?", "schema"),
+    ("List all relationship types in the graph", "schema"),
+    ("What properties does a DryPump node have?", "schema"),
+    ("How is the knowledge graph structured?", "schema"),
+    ("What kinds of entities and relationships are stored?", "schema"),
+    ("Describe the data model of the maintenance graph", "schema"),
+
+    ("What is the pumping speed of DryPump P002?", "exact_lookup"),
+    ("What is the current age of pump P001?", "exact_lookup"),
+    ("What is the remaining useful life of P002?", "exact_lookup"),
+    ("What is P003's failure probability?", "exact_lookup"),
+    ("Which pumps serve chamber CH2?", "exact_lookup"),
+    ("Which pumps are on tool PECVD_05?", "exact_lookup"),
+    ("Which pumps are above 30% risk?", "exact_lookup"),
+    ("Which pumps are high risk?", "exact_lookup"),
+    ("Show pumps in risk class A or B", "exact_lookup"),
+    ("What is the manufacturer of pump P010?", "exact_lookup"),
+
+    ("What equipment is related to vacuum technology and process efficiency?", "semantic"),
+    ("What maintenance approaches are used for critical equipment?", "semantic"),
+    ("Show me equipment that affects manufacturing cost and uptime", "semantic"),
+    ("Explain concepts related to predictive maintenance", "semantic"),
+    ("Which concepts describe bearing wear and vibration?", "semantic"),
+    ("What do we know about contamination control in vacuum systems?", "semantic"),
+    ("Find equipment similar to dry vacuum pumps", "semantic"),
+    ("What business domains does condition monitoring touch?", "semantic"),
+    ("Tell me about reliability engineering for semiconductor tools", "semantic"),
+    ("Which maintenance strategies reduce unplanned downtime?", "semantic"),
+
+    ("Compare the failure risk of deposition and etch pumps and explain the difference", "complex"),
+    ("Why is the failure probability of P002 rising and what should we do about it?", "complex"),
+    ("Which tools have the most high-risk pumps and how does that affect fab throughput?", "complex"),
+    ("Plan next month's maintenance for the riskiest chambers and estimate the cost", "complex"),
+    ("Summarize the health of every pump in FAB2 and recommend actions", "complex"),
+    ("How would replacing P001 change the risk of chamber CH1 and its tool?", "complex"),
+    ("Rank areas by expected failures and explain which concepts drive the risk", "complex"),
+    ("What happens to production if the backup pumps in CH2 fail next week?", "complex"),
+)
+
+# Held-out questions (not in ROUTING_EXAMPLES) for evaluate()
+EVALUATION_SET = (
+    ("Give me the schema of the Neo4j database", "schema"),
+    ("What relationship types connect pumps and chambers?", "schema"),
+    ("Which labels does the graph use?", "schema"),
+    ("What node types are available for querying?", "schema"),
+    ("What attributes are stored on WeibullSurvivalFunction nodes?", "schema"),
+
+    ("What is the pumping speed of DryPump P002 in the neo4j database?", "exact_lookup"),
+    ("What is the health index of pump P002?", "exact_lookup"),
+    ("What is the risk class of P001?", "exact_lookup"),
+    ("Which pumps are above 0.6 failure probability?", "exact_lookup"),
+    ("Which pumps serve process chamber CH1?", "exact_lookup"),
+    ("Which pumps are critical risk pumps?", "exact_lookup"),
+    ("What is the serial number of pump P004?", "exact_lookup"),
+    ("What is the criticality level of DryPump P002?", "exact_lookup"),
+    ("Which pumps have been running more than 90 days?", "exact_lookup"),
+
+    ("Which equipment relates to vacuum pumping efficiency?", "semantic"),
+    ("What concepts are linked to process yield?", "semantic"),
+    ("Describe maintenance approaches for vacuum equipment", "semantic"),
+    ("What equipment influences cost of ownership?", "semantic"),
+    ("Find concepts about thermal degradation of pumps", "semantic"),
+    ("What is known about predictive maintenance for semiconductor fabs?", "semantic"),
+    ("Show me concepts related to equipment uptime", "semantic"),
+
+    ("What is the pumping speed of P002 compared to P003?", "complex"),
+    ("What is the status of pump P002 and when was it last serviced?", "complex"),
+    ("Compare P001 and P002 and tell me which to service first and why", "complex"),
+    ("Explain why chamber CH2 is high risk and propose a maintenance schedule", "complex"),
+    ("Which fab area will lose the most capacity if its riskiest pumps fail, and what is the cost?",
+     "complex"),
+    ("Summarize fleet risk trends over the last month and suggest where to stock spares", "complex"),
+    ("How do RUL and Weibull predictions disagree across the fleet, and which should we trust?",
+     "complex"),
+)
+
+
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class FastToolRouter:
+    """Regex + nearest-example routing of agent questions straight to a tool"""
+
+    def __init__(self, embeddings, tools=(), templates=None, driver=None, examples=ROUTING_EXAMPLES,
+                 neighbours=3, min_similarity=0.3, min_margin=0.02,
+                 cache_path=DEFAULT_CACHE_PATH, database=None):
+        self.embeddings = embeddings
+        self.tools = {tool.name: tool for tool in tools}
+        self.templates = templates
+        self.driver = driver
+        self.neighbours = neighbours
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.cache_path = cache_path
+        self.database = database
+
+        self.examples = list(examples)
+        self.example_routes = np.array([route for _, route in self.examples])
+        self._example_matrix = None
+        self._lock = threading.Lock()
+        self.counts = Counter()
+        self.latencies = {"route": [], "fast": [], "supervisor": []}
+
+    # ------------------------------------------------------------------
+    # Classification
+    # ------------------------------------------------------------------
+
+    def example_matrix(self):
+        """Unit-norm embeddings of the labeled examples (embedded once, then cached on disk)"""
+        if self._example_matrix is None:
+            texts = [question for question, _ in self.examples]
+            if not self.cache_path:
+                self._example_matrix = normalize_rows(self.embeddings.embed_documents(texts))
+                return self._example_matrix
+
+            cache = EmbeddingCache(self.cache_path, model=getattr(self.embeddings, "model", ""))
+            try:
+                hashes = [cache.text_hash(text) for text in texts]
+                vectors = cache.get_many(hashes)
+                missing = [i for i, text_hash in enumerate(hashes) if text_hash not in vectors]
+                if missing:
+                    fresh = self.embeddings.embed_documents([texts[i] for i in missing])
+                    fresh = {hashes[i]: vector for i, vector in zip(missing, fresh)}
+                    cache.put_many(fresh)
+                    vectors.update(fresh)
+            finally:
+                cache.close()
+            self._example_matrix = normalize_rows([vectors[text_hash] for text_hash in hashes])
+        return self._example_matrix
+
+    def route_scores(self, question):
+        """Mean of the `neighbours` best example similarities per route"""
+        query = normalize_rows(self.embeddings.embed_query(question))
+        similarities = self.example_matrix() @ query
+        scores = {}
+        for route in ROUTES:
+            values = np.sort(similarities[self.example_routes == route])[::-1][:self.neighbours]
+            scores[route] = float(values.mean()) if len(values) else -1.0
+        return scores
+
+    def classify(self, question):
+        """
+        Decide how to answer a question without calling any LLM.
+
+        Returns:
+            Dict with route (a ROUTES entry), target (tool name, "template" or
+            "supervisor"), reason, scores and the matched template (if any)
+        """
+        text = normalize_query(question)
+        template = None
+        if self.templates is not None and not COMPOUND_PATTERN.search(text):
+            template = self.templates.match(question)
+        if template is None and SCHEMA_PATTERN.search(text):
+            return {"route": "schema", "target": ROUTE_TOOLS["schema"], "reason": "schema wording",
+                    "scores": None, "template": None}
+
+        scores = self.route_scores(question)
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        best, runner_up = ranked[0], ranked[1]
+        margin = scores[best] - scores[runner_up]
+        decision = {"route": best, "target": ROUTE_TOOLS.get(best, SUPERVISOR),
+                    "reason": f"nearest examples (margin {margin:.3f})", "scores": scores, "template": None}
+
+        if template is not None:
+            # A regex/learned template only answers when the examples agree it is a lookup
+            if best == "exact_lookup" and scores[best] >= self.min_similarity and margin >= self.min_margin:
+                decision.update(target="template", reason=f"template {template['name']} (margin {margin:.3f})",
+                                template=template)
+            else:
+                decision.update(target=SUPERVISOR,
+                                reason=f"template {template['name']} but nearest examples say {best}")
+            return decision
+
+        if best == "complex":
+            decision["reason"] = "complex question"
+        elif scores[best] < self.min_similarity or margin < self.min_margin:
+            decision.update(target=SUPERVISOR, reason=f"ambiguous (score {scores[best]:.3f}, margin {margin:.3f})")
+        elif best == "exact_lookup":
+            decision.update(target=SUPERVISOR, reason="exact lookup without a matching template")
+        elif best == "semantic" and ENTITY_ID_PATTERN.search(text):
+            decision.update(target=SUPERVISOR, reason="semantic wording with a pump/chamber ID")
+        return decision
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+
+    def answer(self, question, decision=None):
+        """Tool output for a locally routable question, else None"""
+        decision = decision or self.classify(question)
+        target = decision["target"]
+        if target == SUPERVISOR:
+            return None
+        if target == "template":
+            if self.driver is None:
+                return None
+            try:
+                records = self.templates.run(self.driver, decision["template"], self.database)
+            except Exception:
+                # Broken learned templates are dropped by the Text2Cypher tool on the slow path
+                return None
+            if not records and decision["template"]["source"] == "learned":
+                return None
+            return format_template_result(decision["template"], records)
+        tool = self.tools.get(target)
+        if tool is None:
+            return None
+        result = tool.func(question)
+        return None if str(result).startswith("Error") else result
+
+    def dispatch(self, question, fallback):
+        """Answer on the fast path when possible, otherwise call `fallback(question)`"""
+        started = time.perf_counter()
+        decision = self.classify(question)
+        routed = time.perf_counter()
+        result = self.answer(question, decision)
+        finished = time.perf_counter()
+
+        if result is not None:
+            self._record(decision["route"], route=routed - started, fast=finished - started)
+            return result
+        result = fallback(question)
+        self._record(SUPERVISOR, route=routed - started, supervisor=time.perf_counter() - started)
+        return result
+
+    def _record(self, outcome, **latencies):
+        with self._lock:
+            self.counts[outcome] += 1
+            for name, seconds in latencies.items():
+                self.latencies[name].append(seconds)
+
+    def stats(self, supervisor_seconds=None):
+        """
+        Routing counts and latency saved.
+
+        Saved time per fast-path answer is the mean supervisor-path latency
+        (or `supervisor_seconds` when no question has fallen through yet)
+        minus the mean fast-path latency.
+        """
+        with self._lock:
+            counts = dict(self.counts)
+            means = {name: float(np.mean(values)) if values else None
+                     for name, values in self.latencies.items()}
+        fast = sum(count for outcome, count in counts.items() if outcome != SUPERVISOR)
+        baseline = means["supervisor"] if means["supervisor"] is not None else supervisor_seconds
+        saved = None
+        if baseline is not None and means["fast"] is not None:
+            saved = round(fast * (baseline - means["fast"]), 3)
+        total = fast + counts.get(SUPERVISOR, 0)
+        return {
+            "questions": total,
+            "fast_path": fast,
+            "fast_path_rate": fast / total if total else 0.0,
+            "by_outcome": counts,
+            "route_ms": round(means["route"] * 1000, 3) if means["route"] is not None else None,
+            "fast_path_ms": round(means["fast"] * 1000, 3) if means["fast"] is not None else None,
+            "supervisor_ms": round(baseline * 1000, 3) if baseline is not None else None,
+            "latency_saved_seconds": saved,
+        }
+
+    # ------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------
+
+    def evaluate(self, labeled=EVALUATION_SET):
+        """
+        Routing accuracy on (question, route) pairs.
+
+        A fall-through counts as correct for "complex" questions; for the
+        other routes it is a safe miss (the supervisor still answers), so
+        accuracy, fast-path precision and coverage are reported separately.
+        """
+        confusion = {route: Counter() for route in ROUTES}
+        correct = fast = fast_correct = 0
+        timings = []
+        for question, expected in labeled:
+            started = time.perf_counter()
+            decision = self.classify(question)
+            timings.append(time.perf_counter() - started)
+            predicted = decision["route"] if decision["target"] != SUPERVISOR else SUPERVISOR
+            confusion[expected][predicted] += 1
+            if decision["target"] != SUPERVISOR:
+                fast += 1
+                fast_correct += predicted == expected
+                correct += predicted == expected
+            else:
+                correct += expected == "complex"
+
+        total = len(labeled)
+        return {
+            "questions": total,
+            "accuracy": correct / total if total else 0.0,
+            "fast_path_coverage": fast / total if total else 0.0,
+            "fast_path_precision": fast_correct / fast if fast else 1.0,
+            "mean_route_ms": round(float(np.mean(timings)) * 1000, 3) if timings else None,
+            "confusion": {route: dict(counts) for route, counts in confusion.items()},
+        }
+
+
+def print_evaluation(report):
+    print(f"\n🎯 Routing accuracy: {report['accuracy']:.1%} on {report['questions']} labeled questions")
+    print(f"   Fast-path coverage: {report['fast_path_coverage']:.1%}  "
+          f"precision: {report['fast_path_precision']:.1%}  "
+          f"mean routing time: {report['mean_route_ms']:.2f}ms")
+    for expected, counts in report["confusion"].items():
+        row = ", ".join(f"{predicted}={count}" for predicted, count in sorted(counts.items()))
+        print(f"   • {expected:<13} → {row}")
+
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+if __name__ == "__main__":
+    import os
+    import sys
+
+    from dotenv import load_dotenv
+
+    from cypher_templates import CypherTemplateLibrary
+    from tool_cache import CachedQueryEmbeddings
+
+    def option(name, default):
+        if name in sys.argv:
+            return sys.argv[sys.argv.index(name) + 1]
+        return default
+
+    load_dotenv()
+
+    if "--fake-embeddings" in sys.argv:
+        from stub_embedding_server import FakeEmbeddings
+        embeddings, cache_path = FakeEmbeddings(), None
+    else:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            print("❌ ERROR: OPENAI_API_KEY is not set - create a .env file or use --fake-embeddings")
+            sys.exit(1)
+        from langchain_openai import OpenAIEmbeddings
+        embeddings = OpenAIEmbeddings(openai_api_key=api_key)
+        cache_path = os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH)
+
+    router = FastToolRouter(
+        CachedQueryEmbeddings(embeddings),
+        templates=CypherTemplateLibrary(None),
+        min_similarity=float(option("--min-similarity", "0.3")),
+        min_margin=float(option("--min-margin", "0.02")),
+        cache_path=cache_path,
+    )
+    started = time.perf_counter()
+    router.example_matrix()
+    print(f"📚 Embedded {len(router.examples)} routing examples in {time.perf_counter() - started:.2f}s")
+    print_evaluation(router.evaluate())
+
+    # Expected saving: every fast-path answer skips the supervisor + ReAct LLM hops
+    supervisor_seconds = option("--supervisor-seconds", None)
+    if supervisor_seconds:
+        report = router.evaluate()
+        saved = report["fast_path_coverage"] * report["questions"] * (
+            float(supervisor_seconds) - report["mean_route_ms"] / 1000
+        )
+        print(f"   ⚡ ~{saved:.1f}s saved on this set at {float(supervisor_seconds):.1f}s per supervisor call "
+              f"(tool time excluded)")
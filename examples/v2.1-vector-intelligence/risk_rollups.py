@@ -0,0 +1,383 @@
+"""
+risk_rollups.py
+Incrementally maintained fleet risk rollups and a top-K riskiest-pump leaderboard
+
+"Which pumps, tools and areas are most at risk right now" used to aggregate
+every DryPump → ThirtyDayFailureProbability path and walk SERVES / PART_OF /
+LOCATED_IN / CONTAINS up to the Fab on every call. This module materializes
+the answer instead:
+
+- DryPump.latestFailureProbability / latestRiskClassification / latestPredictionTimestamp
+  hold each pump's newest prediction (indexed, so the fleet top-K is index-ordered)
+- (:ProcessChamber|SemiconductorTool|FabArea|Fab)-[:HAS_RISK_ROLLUP]->(:RiskRollup)
+  with pumpCount, expectedFailures (Σ P_30), maxProbability, meanProbability,
+  riskiestPump and riskClassA..riskClassE counts
+- (:RiskLeaderboard {leaderboardId: "fleet"}) with the `capacity` riskiest pumps
+  as parallel arrays
+
+update(predictions) takes the FleetHazardEngine.prediction_rows() of the pumps
+that changed. Each level is re-derived from its children only along the changed
+pumps' ancestor chains (chamber from its pumps, tool from its chamber rollups,
+area from its tools, fab from its areas), so one pump touches four small
+aggregates instead of the fleet, and max/counts never drift. The leaderboard
+merges the changed pumps in memory and only refills from the index when a
+listed pump drops below the list's floor.
+
+USAGE:
+    rollups = FleetRiskRollups(driver, capacity=100)
+    rollups.ensure_schema()
+    rollups.rebuild()                                   # once, from existing predictions
+    engine = FleetHazardEngine(driver, rollups=rollups) # then kept current on every write
+    rollups.top_pumps(10)
+    rollups.top_entities("SemiconductorTool", 10, order_by="expectedFailures")
+    rollups.rollup("Fab", "FAB2")
+"""
+
+import time
+
+from bulk_graph_writer import BulkGraphWriter
+
+RISK_CLASSES = ("A", "B", "C", "D", "E")
+LEADERBOARD_ID = "fleet"
+ORDER_FIELDS = ("maxProbability", "expectedFailures", "meanProbability")
+
+# (label, key property, child pattern bound to n) from chamber up to fab
+LEVELS = (
+    ("ProcessChamber", "chamberId", None),
+    ("SemiconductorTool", "toolId", "(child:ProcessChamber)-[:PART_OF]->(n)"),
+    ("FabArea", "areaId", "(child:SemiconductorTool)-[:LOCATED_IN]->(n)"),
+    ("Fab", "fabId", "(n)-[:CONTAINS]->(child:FabArea)"),
+)
+
+SCHEMA_QUERIES = (
+    "CREATE CONSTRAINT risk_rollup_id_unique IF NOT EXISTS "
+    "FOR (r:RiskRollup) REQUIRE r.rollupId IS UNIQUE",
+    "CREATE CONSTRAINT risk_leaderboard_id_unique IF NOT EXISTS "
+    "FOR (b:RiskLeaderboard) REQUIRE b.leaderboardId IS UNIQUE",
+    "CREATE INDEX risk_rollup_level_max_idx IF NOT EXISTS "
+    "FOR (r:RiskRollup) ON (r.level, r.maxProbability)",
+    "CREATE INDEX risk_rollup_level_expected_idx IF NOT EXISTS "
+    "FOR (r:RiskRollup) ON (r.level, r.expectedFailures)",
+    "CREATE INDEX pump_latest_failure_probability_idx IF NOT EXISTS "
+    "FOR (p:DryPump) ON (p.latestFailureProbability)",
+)
+
+# Older predictions arriving late never overwrite a newer latest value, and undated
+# rows never become the latest value
+LATEST_QUERY = """
+UNWIND $rows AS row
+MATCH (p:DryPump {pumpIdentifier: row.pump_id})
+WHERE row.timestamp IS NOT NULL
+  AND (p.latestPredictionTimestamp IS NULL OR p.latestPredictionTimestamp <= row.timestamp)
+SET p.latestFailureProbability = row.failure_probability,
+    p.latestRiskClassification = row.risk_classification,
+    p.latestPredictionTimestamp = row.timestamp
+WITH p
+OPTIONAL MATCH (p)-[:SERVES]->(c:ProcessChamber)
+OPTIONAL MATCH (c)-[:PART_OF]->(t:SemiconductorTool)
+OPTIONAL MATCH (t)-[:LOCATED_IN]->(a:FabArea)
+OPTIONAL MATCH (f:Fab)-[:CONTAINS]->(a)
+RETURN collect(DISTINCT {pump_id: p.pumpIdentifier,
+                         failure_probability: p.latestFailureProbability,
+                         risk_classification: p.latestRiskClassification}) AS pumps,
+       collect(DISTINCT c.chamberId) AS ProcessChamber,
+       collect(DISTINCT t.toolId) AS SemiconductorTool,
+       collect(DISTINCT a.areaId) AS FabArea,
+       collect(DISTINCT f.fabId) AS Fab
+"""
+
+REBUILD_LATEST_QUERY = """
+MATCH (p:DryPump)
+CALL {
+    WITH p
+    MATCH (p)-[:HAS_FAILURE_PREDICTION]->(pred:ThirtyDayFailureProbability)
+    WHERE pred.predictionTimestamp IS NOT NULL
+    WITH p, pred ORDER BY pred.predictionTimestamp DESC LIMIT 1
+    SET p.latestFailureProbability = pred.failureProbability,
+        p.latestRiskClassification = pred.riskClassification,
+        p.latestPredictionTimestamp = pred.predictionTimestamp
+} IN TRANSACTIONS OF 1000 ROWS
+"""
+
+ALL_IDS_QUERY = "MATCH (n:{label}) RETURN n.{key} AS id"
+
+TOP_PUMPS_QUERY = """
+MATCH (p:DryPump)
+WHERE p.latestFailureProbability IS NOT NULL
+RETURN p.pumpIdentifier AS pump_id,
+       p.latestFailureProbability AS failure_probability,
+       p.latestRiskClassification AS risk_classification
+ORDER BY p.latestFailureProbability DESC
+LIMIT $k
+"""
+
+READ_LEADERBOARD_QUERY = """
+MATCH (b:RiskLeaderboard {leaderboardId: $leaderboard_id})
+RETURN b.pumpIds AS pump_ids, b.probabilities AS probabilities,
+       b.riskClassifications AS classes, b.capacity AS capacity
+"""
+
+WRITE_LEADERBOARD_QUERY = """
+MERGE (b:RiskLeaderboard {leaderboardId: $leaderboard_id})
+SET b.pumpIds = $pump_ids,
+    b.probabilities = $probabilities,
+    b.riskClassifications = $classes,
+    b.capacity = $capacity,
+    b.updatedAt = datetime()
+"""
+
+
+def _class_counts(source):
+    return ", ".join(f"{c}: {source(c)}" for c in RISK_CLASSES)
+
+
+def rollup_query(label, key, child_pattern):
+    """UNWIND $rows (entity ids) → recompute and MERGE each entity's RiskRollup"""
+    if child_pattern is None:
+        children = f"""\
+OPTIONAL MATCH (p:DryPump)-[:SERVES]->(n)
+WHERE p.latestFailureProbability IS NOT NULL
+WITH n, id, collect(CASE WHEN p IS NULL THEN NULL ELSE {{
+    count: 1, expected: p.latestFailureProbability, max: p.latestFailureProbability,
+    riskiest: p.pumpIdentifier,
+    {_class_counts(lambda c: f"CASE p.latestRiskClassification WHEN '{c}' THEN 1 ELSE 0 END")}
+}} END) AS children"""
+    else:
+        children = f"""\
+OPTIONAL MATCH {child_pattern}
+OPTIONAL MATCH (child)-[:HAS_RISK_ROLLUP]->(cr:RiskRollup)
+WITH n, id, collect(CASE WHEN cr IS NULL THEN NULL ELSE {{
+    count: cr.pumpCount, expected: cr.expectedFailures, max: cr.maxProbability,
+    riskiest: cr.riskiestPump,
+    {_class_counts(lambda c: f"cr.riskClass{c}")}
+}} END) AS children"""
+
+    class_sets = ",\n    ".join(
+        f"r.riskClass{c} = reduce(s = 0, x IN children | s + x.{c})" for c in RISK_CLASSES
+    )
+    return f"""
+UNWIND $rows AS id
+MATCH (n:{label} {{{key}: id}})
+{children}
+WITH n, id, children,
+     reduce(top = null, x IN children |
+            CASE WHEN top IS NULL OR x.max > top.max THEN x ELSE top END) AS top
+MERGE (r:RiskRollup {{rollupId: '{label}:' + id}})
+SET r.level = '{label}',
+    r.entityId = id,
+    r.pumpCount = reduce(s = 0, x IN children | s + x.count),
+    r.expectedFailures = reduce(s = 0.0, x IN children | s + x.expected),
+    r.maxProbability = coalesce(top.max, 0.0),
+    r.riskiestPump = top.riskiest,
+    {class_sets},
+    r.updatedAt = datetime()
+SET r.meanProbability = CASE WHEN r.pumpCount > 0
+                             THEN r.expectedFailures / r.pumpCount ELSE 0.0 END
+MERGE (n)-[:HAS_RISK_ROLLUP]->(r)
+"""
+
+
+ROLLUP_QUERIES = {label: rollup_query(label, key, pattern) for label, key, pattern in LEVELS}
+
+
+def merge_leaderboard(entries, changed, capacity):
+    """
+    Merge changed pumps into a ranked leaderboard.
+
+    Args:
+        entries: Current [(pump_id, probability, risk_class), ...], best first
+        changed: {pump_id: (probability, risk_class)} for pumps that changed
+        capacity: Number of pumps the leaderboard keeps
+
+    Returns:
+        (new entries, needs_refill). needs_refill is True when a listed pump fell
+        below the old floor, where an unlisted pump could now outrank it.
+    """
+    floor = entries[-1][1] if len(entries) >= capacity else float("-inf")
+    listed = {pump_id: (probability, risk_class) for pump_id, probability, risk_class in entries}
+    needs_refill = any(
+        pump_id in listed and probability < floor
+        for pump_id, (probability, _) in changed.items()
+    )
+    listed.update(changed)
+    ranked = sorted(listed.items(), key=lambda item: (-item[1][0], item[0]))[:capacity]
+    return [(pump_id, p, c) for pump_id, (p, c) in ranked], needs_refill
+
+
+class FleetRiskRollups:
+    """Materialized chamber/tool/area/fab risk aggregates kept current per changed pump"""
+
+    def __init__(self, driver, capacity=100, chunk_size=1000, database=None):
+        self.driver = driver
+        self.capacity = capacity
+        self.chunk_size = chunk_size
+        self.database = database
+        self.stats = {"updates": 0, "pumps": 0, "rollups_refreshed": 0,
+                      "leaderboard_refills": 0, "update_seconds": 0.0}
+
+    def ensure_schema(self):
+        with self.driver.session(database=self.database) as session:
+            for query in SCHEMA_QUERIES:
+                session.run(query).consume()
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def _refresh_levels(self, affected):
+        writer = BulkGraphWriter(self.driver, chunk_size=self.chunk_size, database=self.database)
+        refreshed = 0
+        for label, _, _ in LEVELS:
+            ids = [entity_id for entity_id in affected.get(label, []) if entity_id is not None]
+            if ids:
+                writer.write(ROLLUP_QUERIES[label], ids)
+                refreshed += len(ids)
+        return refreshed
+
+    def update(self, predictions):
+        """
+        Apply newly written predictions (FleetHazardEngine.prediction_rows()
+        dicts) to the pumps' latest values, their ancestor rollups and the
+        leaderboard.
+        """
+        if not predictions:
+            return
+        started = time.perf_counter()
+        rows = [{
+            "pump_id": row["pump_id"],
+            "failure_probability": row["failure_probability"],
+            "risk_classification": row["risk_classification"],
+            "timestamp": row["timestamp"],
+        } for row in predictions]
+
+        def write(tx, chunk):
+            return tx.run(LATEST_QUERY, rows=chunk).single().data()
+
+        affected = {label: set() for label, _, _ in LEVELS}
+        changed = {}
+        with self.driver.session(database=self.database) as session:
+            for i in range(0, len(rows), self.chunk_size):
+                result = session.execute_write(write, rows[i:i + self.chunk_size])
+                for label in affected:
+                    affected[label].update(result[label])
+                for pump in result["pumps"]:
+                    changed[pump["pump_id"]] = (pump["failure_probability"],
+                                                pump["risk_classification"])
+
+        self.stats["rollups_refreshed"] += self._refresh_levels(affected)
+        self._update_leaderboard(changed)
+
+        self.stats["updates"] += 1
+        self.stats["pumps"] += len(changed)
+        self.stats["update_seconds"] += time.perf_counter() - started
+
+    def _read_leaderboard(self, session):
+        record = session.run(READ_LEADERBOARD_QUERY, leaderboard_id=LEADERBOARD_ID).single()
+        if record is None or record["capacity"] != self.capacity:
+            return None
+        return list(zip(record["pump_ids"], record["probabilities"], record["classes"]))
+
+    def _write_leaderboard(self, session, entries):
+        session.run(
+            WRITE_LEADERBOARD_QUERY,
+            leaderboard_id=LEADERBOARD_ID,
+            pump_ids=[e[0] for e in entries],
+            probabilities=[e[1] for e in entries],
+            classes=[e[2] for e in entries],
+            capacity=self.capacity,
+        ).consume()
+
+    def _top_from_index(self, session, k):
+        return [
+            (r["pump_id"], r["failure_probability"], r["risk_classification"])
+            for r in session.run(TOP_PUMPS_QUERY, k=k)
+        ]
+
+    def _update_leaderboard(self, changed):
+        with self.driver.session(database=self.database) as session:
+            entries = self._read_leaderboard(session)
+            needs_refill = entries is None
+            if entries is not None:
+                entries, needs_refill = merge_leaderboard(entries, changed, self.capacity)
+            if needs_refill:
+                entries = self._top_from_index(session, self.capacity)
+                self.stats["leaderboard_refills"] += 1
+            self._write_leaderboard(session, entries)
+
+    def rebuild(self):
+        """Materialize everything from the existing predictions (initial load or repair)"""
+        print("\n🏗️  Rebuilding fleet risk rollups...")
+        started = time.perf_counter()
+        with self.driver.session(database=self.database) as session:
+            session.run(REBUILD_LATEST_QUERY).consume()
+            affected = {
+                label: [r["id"] for r in session.run(ALL_IDS_QUERY.format(label=label, key=key))]
+                for label, key, _ in LEVELS
+            }
+        refreshed = self._refresh_levels(affected)
+        with self.driver.session(database=self.database) as session:
+            self._write_leaderboard(session, self._top_from_index(session, self.capacity))
+        print(f"   ✅ {refreshed} rollups and the top-{self.capacity} leaderboard "
+              f"rebuilt in {time.perf_counter() - started:.2f}s")
+        return refreshed
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def top_pumps(self, k=10):
+        """The k riskiest pumps as dicts, best first"""
+        def read(tx):
+            if k <= self.capacity:
+                record = tx.run(READ_LEADERBOARD_QUERY, leaderboard_id=LEADERBOARD_ID).single()
+                if record is not None:
+                    return list(zip(record["pump_ids"], record["probabilities"],
+                                    record["classes"]))[:k]
+            return [(r["pump_id"], r["failure_probability"], r["risk_classification"])
+                    for r in tx.run(TOP_PUMPS_QUERY, k=k)]
+
+        with self.driver.session(database=self.database) as session:
+            entries = session.execute_read(read)
+        return [
+            {"pump_id": p, "failure_probability": prob, "risk_classification": c}
+            for p, prob, c in entries
+        ]
+
+    def top_entities(self, level, k=10, order_by="maxProbability"):
+        """The k riskiest chambers / tools / areas / fabs by a rollup field"""
+        if level not in ROLLUP_QUERIES:
+            raise ValueError(f"level must be one of {list(ROLLUP_QUERIES)}")
+        if order_by not in ORDER_FIELDS:
+            raise ValueError(f"order_by must be one of {ORDER_FIELDS}")
+        query = (
+            f"MATCH (r:RiskRollup) WHERE r.level = $level AND r.{order_by} IS NOT NULL "
+            f"RETURN r {{.*}} AS rollup ORDER BY r.{order_by} DESC LIMIT $k"
+        )
+
+        def read(tx):
+            return [record["rollup"] for record in tx.run(query, level=level, k=k)]
+
+        with self.driver.session(database=self.database) as session:
+            return session.execute_read(read)
+
+    def rollup(self, level, entity_id):
+        """One entity's rollup dict, or None"""
+        def read(tx):
+            record = tx.run(
+                "MATCH (r:RiskRollup {rollupId: $rollup_id}) RETURN r {.*} AS rollup",
+                rollup_id=f"{level}:{entity_id}",
+            ).single()
+            return record["rollup"] if record else None
+
+        with self.driver.session(database=self.database) as session:
+            return session.execute_read(read)
+
+    def report(self):
+        updates = self.stats["updates"]
+        print("\n📊 Risk rollup maintenance:")
+        print(f"   Updates: {updates} ({self.stats['pumps']} pumps)")
+        print(f"   Rollups refreshed: {self.stats['rollups_refreshed']}")
+        print(f"   Leaderboard refills: {self.stats['leaderboard_refills']}")
+        if updates:
+            print(f"   Mean update time: {self.stats['update_seconds'] / updates * 1000:.1f}ms")
+        return dict(self.stats)
@@ -6,16 +6,50 @@ SETUP:
 1. Create .env file in project root
 2. Add credentials to .env file
 3. Install: pip install python-dotenv langchain-community langchain-openai neo4j
-4. Run: python semantic-vectorization.py
+4. Run: python semantic-vectorization.py [--incremental]
+
+INCREMENTAL MODE:
+   --incremental hashes every embedding text, reuses vectors from the local
+   embedding cache (EMBEDDING_CACHE_PATH, default .embedding_cache.sqlite) and
+   only upserts/deletes the SemanticVector nodes whose text actually changed.
+   A full run checkpoints into the same cache, so rerunning after an
+   interruption only embeds the batches that never finished.
+
+EMBEDDING SCHEDULER (optional .env settings):
+   EMBEDDING_BATCH_SIZE=100          texts per embeddings request
+   EMBEDDING_CONCURRENCY=4           concurrent requests
+   EMBEDDING_TOKENS_PER_MINUTE=      token budget for pacing (unset = unpaced)
+   EMBEDDING_MAX_RETRIES=5           per-batch retries with exponential backoff
+
+TRACING (optional .env settings):
+   TRACE_PATH=traces.jsonl           write OTLP/JSON spans for every step, query and
+                                     embedding call (unset = no tracing)
+   TRACE_PROFILE_SAMPLE_RATE=0       fraction of queries run under PROFILE
+   Inspect with: python tracing.py traces.jsonl
+
+COMPACT VECTORS:
+   Every SemanticVector records embedding_dimensions, so steps 6 and 7 report
+   sizes without reading the float list. To also store int8/float16 codes in
+   the graph and query a local compact mirror, run
+   python quantized_vectors.py --write-codes afterwards.
+
+CONNECTIONS:
+   One ConnectionManager (connection_manager.py) owns the only driver; the
+   Neo4jVector store runs on it via graph=, reads and writes use routed,
+   reused sessions. Pool settings: NEO4J_MAX_POOL_SIZE, NEO4J_ACQUISITION_TIMEOUT,
+   NEO4J_MAX_CONNECTION_LIFETIME. LangChain/OpenAI are imported on first use.
 """
 
-from langchain_community.vectorstores import Neo4jVector
-from langchain_openai import OpenAIEmbeddings
-from neo4j import GraphDatabase
 from dotenv import load_dotenv
 import os
 import sys
 
+from connection_manager import ConnectionManager
+from embedding_cache import EmbeddingCache, DEFAULT_CACHE_PATH
+from embedding_scheduler import EmbeddingScheduler, estimate_tokens
+from hybrid_retrieval import HybridRetriever
+from tracing import JsonlSpanSink, TracedEmbeddings, Tracer, trace_methods
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -49,18 +83,48 @@ class SemanticVectorizer:
         
         # Initialize connections
         try:
-            self.driver = GraphDatabase.driver(
-                self.neo4j_url, 
-                auth=(self.neo4j_username, self.neo4j_password)
+            self.tracer = None
+            trace_path = os.getenv("TRACE_PATH")
+            if trace_path:
+                self.tracer = Tracer(
+                    JsonlSpanSink(trace_path, service_name="semantic-vectorization"),
+                    profile_sample_rate=float(os.getenv("TRACE_PROFILE_SAMPLE_RATE", "0")),
+                )
+            self.connections = ConnectionManager.from_env(
+                uri=self.neo4j_url,
+                username=self.neo4j_username,
+                password=self.neo4j_password,
+                tracer=self.tracer,
             )
+            self.driver = self.connections.driver
+
+            from langchain_openai import OpenAIEmbeddings
             self.embeddings = OpenAIEmbeddings(openai_api_key=self.openai_api_key)
+            if self.tracer is not None:
+                self.embeddings = TracedEmbeddings(self.embeddings, self.tracer)
+                trace_methods(self, self.tracer, prefixes=("step", "run_complete"))
             self.vector_store = None
+            # Shared by both step 3 paths: every finished batch is checkpointed, so an
+            # interrupted full or incremental run resumes with only the missing batches
+            self.embedding_cache = EmbeddingCache(
+                os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH),
+                model=getattr(self.embeddings, "model", ""),
+            )
+            tokens_per_minute = os.getenv("EMBEDDING_TOKENS_PER_MINUTE")
+            self.embedding_scheduler = EmbeddingScheduler(
+                self.embeddings.embed_documents,
+                batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "100")),
+                max_concurrency=int(os.getenv("EMBEDDING_CONCURRENCY", "4")),
+                tokens_per_minute=int(tokens_per_minute) if tokens_per_minute else None,
+                max_retries=int(os.getenv("EMBEDDING_MAX_RETRIES", "5")),
+                cache=self.embedding_cache,
+            )
             print("✅ Connections initialized successfully")
             print(f"   Neo4j: {self.neo4j_url}")
             print(f"   Username: {self.neo4j_username}")
         except Exception as e:
             print(f"❌ ERROR: Failed to connect to Neo4j: {e}")
-            print("   Check your .env file credentials")
+            print("   Check your .env file credentials and EMBEDDING_CACHE_PATH")
             sys.exit(1)
 
     def step1_extract_semantic_content(self):
@@ -82,7 +146,7 @@ class SemanticVectorizer:
         ORDER BY sc.conceptId
         """
         
-        with self.driver.session() as session:
+        with self.connections.session("read") as session:
             result = session.run(query)
             records = [dict(record) for record in result]
         
@@ -140,33 +204,83 @@ class SemanticVectorizer:
         
         return texts, metadatas
 
+    def _vector_row(self, text, metadata, vector, text_hash=None):
+        """SemanticVector properties for one concept, keyed by concept_id"""
+        text_hash = text_hash or self.embedding_cache.text_hash(text)
+        return {
+            **metadata,
+            'id': text_hash,
+            'text': text,
+            'text_hash': text_hash,
+            'embedding': vector,
+            # Stored once so inspection queries never load the float list to size() it
+            'embedding_dimensions': len(vector),
+        }
+
+    def _remove_duplicate_vectors(self, session):
+        """Delete all but one SemanticVector per concept_id; returns the number removed"""
+        return session.run("""
+        MATCH (sv:SemanticVector)
+        WITH sv.concept_id AS concept_id, collect(sv) AS nodes
+        WHERE size(nodes) > 1
+        UNWIND tail(nodes) AS duplicate
+        DETACH DELETE duplicate
+        """).consume().counters.nodes_deleted
+
+    def _upsert_vectors(self, session, rows):
+        """Ensure the vector index and MERGE one SemanticVector per concept_id"""
+        dimensions = len(rows[0]['embedding'])
+        session.run(
+            "CREATE VECTOR INDEX semantic_concepts_vector_index IF NOT EXISTS "
+            "FOR (sv:SemanticVector) ON (sv.embedding) "
+            "OPTIONS {indexConfig: {`vector.dimensions`: %d, "
+            "`vector.similarity_function`: 'cosine'}}" % dimensions
+        ).consume()
+        return session.run("""
+        UNWIND $rows AS row
+        MERGE (sv:SemanticVector {concept_id: row.concept_id})
+        SET sv += row
+        """, rows=rows).consume().counters
+
+    def _open_vector_store(self):
+        from langchain_community.vectorstores import Neo4jVector
+        self.vector_store = Neo4jVector.from_existing_index(
+            embedding=self.embeddings,
+            graph=self.connections.graph(refresh_schema=False),
+            index_name="semantic_concepts_vector_index",
+            text_node_property="text",
+        )
+
     def step3_create_vector_store(self, texts, metadatas):
         """Create Neo4j vector store with embeddings"""
         print("\n🔄 STEP 3: Creating vector store...")
         print("   📡 Calling OpenAI API to generate embeddings...")
-        print("   ⏱️  This may take 10-30 seconds...")
         
         try:
-            # Create Neo4j vector store
-            self.vector_store = Neo4jVector.from_texts(
-                texts=texts,
-                embedding=self.embeddings,
-                metadatas=metadatas,
-                url=self.neo4j_url,
-                username=self.neo4j_username,
-                password=self.neo4j_password,
-                index_name="semantic_concepts_vector_index",
-                node_label="SemanticVector",
-                text_node_property="text",
-                embedding_node_property="embedding",
-                distance_strategy="COSINE"
-            )
+            # Batched, paced embedding generation
+            vectors = self.embedding_scheduler.embed(texts)
+            self.embedding_scheduler.report()
+
+            # Same concept_id MERGE as the incremental sync, so switching between the
+            # full and incremental paths never duplicates SemanticVector nodes
+            rows = [self._vector_row(text, metadata, vector)
+                    for text, metadata, vector in zip(texts, metadatas, vectors)]
+            with self.connections.session("write") as session:
+                removed = self._remove_duplicate_vectors(session)
+                if removed:
+                    print(f"   🧹 Removed {removed} duplicate SemanticVector nodes")
+                if rows:
+                    self._upsert_vectors(session, rows)
+            self._open_vector_store()
             
             print(f"✅ Vector store created successfully!")
             print(f"   📊 Index: semantic_concepts_vector_index")
             print(f"   🏷️  Node type: SemanticVector")
             print(f"   📈 Total vectors: {len(texts)}")
-            print(f"   💰 OpenAI cost: ~$0.10")
+            # Token estimate rather than a fixed guess; timings come from fleet_benchmark.py
+            tokens = sum(estimate_tokens(text) for text in texts)
+            print(f"   💰 OpenAI usage: ~{tokens} tokens "
+                  f"(~${tokens / 1000 * 0.0001:.4f} at $0.0001 / 1K tokens)")
             
         except Exception as e:
             print(f"❌ ERROR: Failed to create vector store: {e}")
@@ -176,28 +290,95 @@ class SemanticVectorizer:
             print("   - Neo4j permissions")
             raise
 
+    def step3_sync_vector_store(self, texts, metadatas):
+        """Incrementally embed and upsert only new or changed SemanticVector nodes"""
+        print("\n🔄 STEP 3: Syncing vector store incrementally...")
+
+        hashes = [self.embedding_cache.text_hash(text) for text in texts]
+        wanted = {
+            metadata['concept_id']: (text, text_hash, metadata)
+            for text, text_hash, metadata in zip(texts, hashes, metadatas)
+        }
+
+        try:
+            with self.connections.session("write") as session:
+                # Vectors created by earlier from_texts runs may be duplicated per concept
+                removed = self._remove_duplicate_vectors(session)
+                if removed:
+                    print(f"   🧹 Removed {removed} duplicate SemanticVector nodes")
+
+                # Nodes that lost their float list count as changed and are re-embedded
+                existing = {
+                    record['concept_id']: record['text_hash']
+                    for record in session.run(
+                        "MATCH (sv:SemanticVector) "
+                        "RETURN sv.concept_id AS concept_id, "
+                        "CASE WHEN sv.embedding IS NULL THEN null ELSE sv.text_hash END AS text_hash"
+                    )
+                }
+
+            changed = [cid for cid, (_, h, _) in wanted.items() if existing.get(cid) != h]
+            stale = [cid for cid in existing if cid not in wanted]
+            print(f"   📊 {len(wanted)} concepts: {len(changed)} new/changed, "
+                  f"{len(wanted) - len(changed)} unchanged, {len(stale)} stale")
+
+            # Reuse cached vectors, embed only true misses (the cache doubles as checkpoint)
+            vectors = self.embedding_scheduler.embed([wanted[cid][0] for cid in changed])
+            if changed:
+                self.embedding_scheduler.report()
+
+            rows = []
+            for cid, vector in zip(changed, vectors):
+                text, text_hash, metadata = wanted[cid]
+                rows.append(self._vector_row(text, metadata, vector, text_hash))
+
+            with self.connections.session("write") as session:
+                if rows:
+                    upserted = self._upsert_vectors(session, rows)
+                    print(f"   ✅ Upserted {len(rows)} SemanticVector nodes "
+                          f"({upserted.nodes_created} created)")
+
+                if stale:
+                    deleted = session.run("""
+                    UNWIND $concept_ids AS concept_id
+                    MATCH (sv:SemanticVector {concept_id: concept_id})
+                    DETACH DELETE sv
+                    """, concept_ids=stale).consume().counters
+                    print(f"   🗑️  Deleted {deleted.nodes_deleted} stale SemanticVector nodes")
+
+            self._open_vector_store()
+
+            print(f"✅ Vector store in sync!")
+            print(f"   📊 Index: semantic_concepts_vector_index")
+            print(f"   📈 Total vectors: {len(wanted)}")
+
+        except Exception as e:
+            print(f"❌ ERROR: Failed to sync vector store: {e}")
+            print("   Common issues:")
+            print("   - Invalid OpenAI API key in .env file")
+            print("   - Unwritable embedding cache path (EMBEDDING_CACHE_PATH)")
+            print("   - Neo4j permissions")
+            raise
+
     def step4_create_semantic_relationships(self):
         """Create relationships between SemanticVector nodes and the existing knowledge graph"""
         print("\n🔗 STEP 4: Creating semantic relationships...")
         
         try:
-            with self.driver.session() as session:
+            with self.connections.session("write") as session:
                 # 1. Connect SemanticVector nodes to their corresponding SemanticConcept nodes
                 print("   📊 Connecting vectors to semantic concepts...")
                 relationship_query_1 = """
                 MATCH (sv:SemanticVector)
                 MATCH (sc:SemanticConcept {conceptId: sv.concept_id})
                 MERGE (sv)-[:VECTOR_REPRESENTATION_OF]->(sc)
-                RETURN sv.concept_id as concept_id, 
-                       'Connected to SemanticConcept' as status
                 """
                 
-                result_1 = session.run(relationship_query_1)
-                records_1 = list(result_1)
-                print(f"   ✅ Created {len(records_1)} VECTOR_REPRESENTATION_OF relationships")
-                
-                for record in records_1:
-                    print(f"      • {record['concept_id']} → SemanticConcept")
+                # Counters come from the result summary - no records are pulled back
+                counters_1 = session.execute_write(
+                    lambda tx: tx.run(relationship_query_1).consume().counters
+                )
+                print(f"   ✅ Created {counters_1.relationships_created} new VECTOR_REPRESENTATION_OF relationships")
                 
                 # 2. Create direct relationships from operational equipment to vector representations  
                 print("   🔧 Connecting equipment to vector representations...")
@@ -205,40 +386,31 @@ class SemanticVectorizer:
                 MATCH (dp:DryPump)-[:HAS_SEMANTIC_TYPE]->(sc:SemanticConcept)
                 MATCH (sv:SemanticVector {concept_id: sc.conceptId})
                 MERGE (dp)-[:HAS_VECTOR_REPRESENTATION]->(sv)
-                RETURN dp.pumpIdentifier as pump_id,
-                       sv.concept_id as vector_concept,
-                       'Connected' as status
                 """
                 
-                result_2 = session.run(relationship_query_2)
-                records_2 = list(result_2)
-                print(f"   ✅ Created {len(records_2)} HAS_VECTOR_REPRESENTATION relationships")
-                
-                for record in records_2:
-                    print(f"      • {record['pump_id']} → {record['vector_concept']}")
+                counters_2 = session.execute_write(
+                    lambda tx: tx.run(relationship_query_2).consume().counters
+                )
+                print(f"   ✅ Created {counters_2.relationships_created} new HAS_VECTOR_REPRESENTATION relationships")
                 
                 # 3. Verify the relationship structure
                 print("   🔍 Verifying relationship structure...")
                 verification_query = """
-                MATCH (dp:DryPump)-[:HAS_VECTOR_REPRESENTATION]->(sv:SemanticVector)
-                      -[:VECTOR_REPRESENTATION_OF]->(sc:SemanticConcept)
-                RETURN dp.pumpIdentifier as pump,
-                       sv.concept_id as vector_concept,
-                       sc.label as semantic_label,
-                       size(sv.embedding) as embedding_dims
+                MATCH (sv:SemanticVector)-[:VECTOR_REPRESENTATION_OF]->(:SemanticConcept)
+                WITH count(sv) AS vector_links
+                OPTIONAL MATCH (dp:DryPump)-[:HAS_VECTOR_REPRESENTATION]->(:SemanticVector)
+                      -[:VECTOR_REPRESENTATION_OF]->(:SemanticConcept)
+                RETURN vector_links, count(dp) AS complete_paths
                 """
                 
-                result_3 = session.run(verification_query)
-                records_3 = list(result_3)
+                record = session.run(verification_query).single()
                 
-                print(f"   ✅ Verified {len(records_3)} complete paths: Equipment → Vector → Concept")
-                for record in records_3:
-                    print(f"      • {record['pump']} → {record['vector_concept']} → {record['semantic_label']}")
+                print(f"   ✅ Verified {record['complete_paths']} complete paths: Equipment → Vector → Concept")
                 
                 print(f"\n✅ Semantic relationships created successfully!")
-                print(f"   📈 Total vector-to-concept connections: {len(records_1)}")
-                print(f"   🔧 Total equipment-to-vector connections: {len(records_2)}")
-                print(f"   🔗 Total verified paths: {len(records_3)}")
+                print(f"   📈 Total vector-to-concept connections: {record['vector_links']}")
+                print(f"   🔧 New equipment-to-vector connections: {counters_2.relationships_created}")
+                print(f"   🔗 Total verified paths: {record['complete_paths']}")
                 
         except Exception as e:
             print(f"❌ ERROR: Failed to create semantic relationships: {e}")
@@ -256,48 +428,27 @@ class SemanticVectorizer:
         print(f"   Query: '{query}'")
         
         try:
-            # Vector similarity search
-            vector_results = self.vector_store.similarity_search_with_score(query, k=2)
+            # Vector similarity + graph traversal in a single round-trip
+            retriever = HybridRetriever(self.driver, self.embeddings)
+            hits = retriever.search(query, k=2)
             print(f"\n   📊 Vector similarity results:")
             
-            for doc, score in vector_results:
-                concept_id = doc.metadata.get('concept_id')
-                label = doc.metadata.get('label')
-                print(f"      • {concept_id} (similarity: {score:.3f})")
-                print(f"        Label: {label}")
-                
-                # Enhanced graph traversal using the new relationships
-                enhanced_traversal_query = """
-                MATCH (sv:SemanticVector {concept_id: $concept_id})
-                MATCH (sv)-[:VECTOR_REPRESENTATION_OF]->(sc:SemanticConcept)
-                MATCH (dp:DryPump)-[:HAS_VECTOR_REPRESENTATION]->(sv)
-                OPTIONAL MATCH (dp)-[:HAS_RUL_ASSESSMENT]->(rul:RemainingUsefulLife)
-                OPTIONAL MATCH (dp)-[:HAS_FAILURE_PREDICTION]->(pred:ThirtyDayFailureProbability)
-                OPTIONAL MATCH (sc)-[:HAS_MEANING_IN_CONTEXT]->(ctx:SemanticContext)
-                
-                RETURN sc.label as concept_label,
-                       dp.pumpIdentifier as pump_id,
-                       dp.isOperational as is_operational,
-                       rul.healthIndex as health_index,
-                       pred.riskScore as risk_score,
-                       ctx.businessContext as business_context
-                """
+            for hit in hits:
+                print(f"      • {hit['concept_id']} (similarity: {hit['score']:.3f})")
+                print(f"        Label: {hit['label']}")
                 
-                with self.driver.session() as session:
-                    result = session.run(enhanced_traversal_query, concept_id=concept_id)
-                    record = result.single()
-                    
-                    if record and record['pump_id']:
-                        print(f"        ↳ Connected Equipment: {record['pump_id']}")
-                        print(f"        ↳ Operational: {record['is_operational']}")
-                        if record['health_index']:
-                            print(f"        ↳ Health Index: {record['health_index']}")
-                        if record['risk_score']:
-                            print(f"        ↳ Risk Score: {record['risk_score']}")
-                        if record['business_context']:
-                            print(f"        ↳ Business Context: {record['business_context'][:60]}...")
-                    else:
-                        print(f"        ↳ No operational equipment data available")
+                if hit['equipment']:
+                    for equipment in hit['equipment']:
+                        print(f"        ↳ Connected Equipment: {equipment['equipment_id']}")
+                        print(f"        ↳ Operational: {equipment['is_operational']}")
+                        if equipment['health_index']:
+                            print(f"        ↳ Health Index: {equipment['health_index']}")
+                        if equipment['risk_score']:
+                            print(f"        ↳ Risk Score: {equipment['risk_score']}")
+                    if hit['business_context']:
+                        print(f"        ↳ Business Context: {hit['business_context'][:60]}...")
+                else:
+                    print(f"        ↳ No operational equipment data available")
         
         except Exception as e:
             print(f"❌ Enhanced hybrid retrieval failed: {e}")
@@ -320,12 +471,12 @@ class SemanticVectorizer:
                    sv.concept_id as vector_concept,
                    sc.label as semantic_label,
                    sc.domain as domain,
-                   size(sv.embedding) as embedding_dimensions,
+                   coalesce(sv.embedding_dimensions, size(sv.embedding)) as embedding_dimensions,
                    ctx.businessContext as business_context
             ORDER BY sc.domain
             """
             
-            with self.driver.session() as session:
+            with self.connections.session("read") as session:
                 result = session.run(equipment_to_vector_query)
                 records = list(result)
                 
@@ -356,7 +507,7 @@ class SemanticVectorizer:
         
         RETURN sv.concept_id as concept_id,
                sv.label as label,
-               size(sv.embedding) as embedding_size,
+               coalesce(sv.embedding_dimensions, size(sv.embedding)) as embedding_size,
                sc.conceptId as linked_concept,
                dp.pumpIdentifier as linked_equipment,
                CASE WHEN r1 IS NOT NULL THEN 'Yes' ELSE 'No' END as has_concept_link,
@@ -365,7 +516,7 @@ class SemanticVectorizer:
         """
         
         try:
-            with self.driver.session() as session:
+            with self.connections.session("read") as session:
                 result = session.run(relationship_inspection_query)
                 records = list(result)
                 
@@ -393,7 +544,7 @@ class SemanticVectorizer:
         """
         
         try:
-            with self.driver.session() as session:
+            with self.connections.session("read") as session:
                 result = session.run(relationship_count_query)
                 rel_counts = list(result)
                 
@@ -404,7 +555,7 @@ class SemanticVectorizer:
         except Exception as e:
             print(f"⚠️  Could not check relationship counts: {e}")
 
-    def run_complete_implementation(self):
+    def run_complete_implementation(self, incremental=False):
         """Run the complete step-by-step implementation with enhanced relationships"""
         print("🚀 SEMANTIC CONCEPT VECTORIZATION - v2.1 (Enhanced)")
         print("=" * 60)
@@ -413,7 +564,10 @@ class SemanticVectorizer:
             # Run all steps including the new relationship creation
             semantic_data = self.step1_extract_semantic_content()
             texts, metadatas = self.step2_create_embedding_texts(semantic_data)
-            self.step3_create_vector_store(texts, metadatas)
+            if incremental:
+                self.step3_sync_vector_store(texts, metadatas)
+            else:
+                self.step3_create_vector_store(texts, metadatas)
             self.step4_create_semantic_relationships()  # NEW STEP
             self.step5_test_enhanced_hybrid_retrieval()  # ENHANCED
             self.step6_test_equipment_to_vector_queries()  # NEW STEP
@@ -462,7 +616,7 @@ class SemanticVectorizer:
             return
         
         try:
-            with self.driver.session() as session:
+            with self.connections.session("write") as session:
                 # Remove vector nodes and their relationships
                 session.run("MATCH (sv:SemanticVector) DETACH DELETE sv")
                 print("✅ SemanticVector nodes and relationships removed")
@@ -476,8 +630,11 @@ class SemanticVectorizer:
 
     def close(self):
         """Close database connection"""
-        if self.driver:
-            self.driver.close()
+        if self.embedding_cache is not None:
+            self.embedding_cache.close()
+        self.connections.close()
+        if self.tracer is not None:
+            self.tracer.close()
 
 
 # =============================================================================
@@ -510,7 +667,7 @@ if __name__ == "__main__":
     vectorizer = SemanticVectorizer()
     
     try:
-        vectorizer.run_complete_implementation()
+        vectorizer.run_complete_implementation(incremental="--incremental" in sys.argv)
     except KeyboardInterrupt:
         print("\n\n⏹️  Interrupted by user")
     except Exception as e:
@@ -0,0 +1,205 @@
+"""
+stub_embedding_server.py
+Deterministic fake embeddings and a local OpenAI-compatible stub server
+
+FakeEmbeddings implements the LangChain Embeddings interface
+(embed_documents / embed_query) with feature-hashed bag-of-words vectors:
+identical texts always map to identical unit vectors, and texts that share
+words have positive cosine similarity. No network, no API key, no cost.
+
+StubEmbeddingServer serves the same vectors on POST /v1/embeddings in the
+OpenAI response format, with optional latency and injected HTTP 429s, so the
+embedding scheduler can be exercised end to end:
+
+    with StubEmbeddingServer(fail_every=5) as server:
+        client = HttpEmbeddingClient(server.url)
+        # or: OpenAIEmbeddings(openai_api_base=server.url, openai_api_key="stub",
+        #                      check_embedding_ctx_length=False)
+        vectors = EmbeddingScheduler(client.embed_documents).embed(texts)
+
+USAGE:
+    python stub_embedding_server.py [port]
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+DEFAULT_DIMENSIONS = 1536
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class FakeEmbeddings:
+    """Deterministic feature-hashing embeddings with the LangChain Embeddings interface"""
+
+    def __init__(self, dimensions=DEFAULT_DIMENSIONS, model="fake-embedding"):
+        self.dimensions = dimensions
+        self.model = model
+
+    def _bucket(self, token):
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dimensions, 1.0 if (value >> 63) & 1 else -1.0
+
+    def embed(self, text):
+        """Embed one text as a float32 unit vector"""
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        tokens = TOKEN_PATTERN.findall(str(text).lower()) or [str(text)]
+        for token in tokens:
+            index, sign = self._bucket(token)
+            vector[index] += sign
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_documents(self, texts):
+        return [self.embed(text).tolist() for text in texts]
+
+    def embed_query(self, text):
+        return self.embed(text).tolist()
+
+    async def aembed_documents(self, texts):
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+class StubEmbeddingServer:
+    """Threaded local HTTP server speaking the OpenAI /v1/embeddings protocol"""
+
+    def __init__(self, host="127.0.0.1", port=0, dimensions=DEFAULT_DIMENSIONS,
+                 latency=0.0, fail_every=0):
+        self.embeddings = FakeEmbeddings(dimensions)
+        self.latency = latency
+        self.fail_every = fail_every
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/embeddings"):
+                    self.send_error(404)
+                    return
+                with stub._lock:
+                    stub.requests += 1
+                    throttled = stub.fail_every and stub.requests % stub.fail_every == 0
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if throttled:
+                    self._reply(429, {"error": {"message": "Rate limit reached (stub)"}})
+                    return
+
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                inputs = payload["input"]
+                if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+                    inputs = [inputs]
+                # Token-id inputs (tiktoken-encoded) are hashed as their id sequence
+                texts = [t if isinstance(t, str) else " ".join(map(str, t)) for t in inputs]
+                data = [
+                    {"object": "embedding", "index": i, "embedding": stub.embeddings.embed_query(text)}
+                    for i, text in enumerate(texts)
+                ]
+                tokens = sum(len(text.split()) for text in texts)
+                self._reply(200, {
+                    "object": "list",
+                    "data": data,
+                    "model": payload.get("model", stub.embeddings.model),
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+                })
+
+            def _reply(self, status, body):
+                encoded = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """Serve in a background daemon thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Shut the server down"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class EmbeddingHTTPError(Exception):
+    """HTTP error from an embeddings endpoint"""
+
+    def __init__(self, status_code, message):
+        super().__init__(f"HTTP {status_code}: {message}")
+        self.status_code = status_code
+
+
+class HttpEmbeddingClient:
+    """Minimal stdlib client for OpenAI-compatible /embeddings endpoints"""
+
+    def __init__(self, base_url, model="text-embedding-ada-002", api_key="stub", timeout=30):
+        self.endpoint = base_url.rstrip("/") + "/embeddings"
+        self.model = model
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def embed_documents(self, texts):
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps({"input": list(texts), "model": self.model}).encode("utf-8"),
+            headers={"Content-Type": "application/json", "Authorization": f"Bearer {self.api_key}"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise EmbeddingHTTPError(e.code, e.read().decode("utf-8", "replace")) from e
+        return [item["embedding"] for item in sorted(body["data"], key=lambda d: d["index"])]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8089
+    server = StubEmbeddingServer(port=port)
+    print(f"🧪 Stub embedding server listening on {server.url}/embeddings")
+    print("   Point OpenAIEmbeddings at it with openai_api_base and any API key")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️  Stopped")
@@ -0,0 +1,223 @@
+"""
+synthetic_fleet.py
+Deterministic synthetic fleets scaled from the P002 instance pattern
+
+Generates the Fab → FabArea → SemiconductorTool → ProcessChamber → DryPump
+hierarchy of examples/v1.0-core/create-p002-instance.cypher at any size, with
+one WeibullSurvivalFunction and one RemainingUsefulLife per pump plus a layer
+of SemanticConcepts the pumps are typed by. Property values are drawn around
+the P002 values (ρ≈1.68, β≈612, age≈285, RUL≈142) from a seeded generator, so
+the same size and seed always produce the same fleet.
+
+Every generated node carries syntheticFleet: true so it can be removed again.
+
+USAGE:
+    fleet = generate_fleet(10000)
+    writer.load(**fleet["entities"])               # BulkGraphWriter format
+    arrays = fleet_arrays(fleet)                   # FleetHazardEngine.load_fleet() format
+    queries = query_texts(200)
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+PUMPS_PER_CHAMBER = 2
+CHAMBERS_PER_TOOL = 4
+TOOLS_PER_AREA = 10
+AREAS_PER_FAB = 5
+PUMPS_PER_CONCEPT = 10
+
+TOOL_TYPES = ("Deposition", "Etch", "Lithography", "Implant", "Metrology")
+AREA_TYPES = ("CVD_DEPOSITION", "PLASMA_ETCH", "LITHO", "IMPLANT", "METROLOGY")
+PUMP_MODELS = (
+    ("Pfeiffer HiPace 700", "Pfeiffer Vacuum", 670.0),
+    ("Edwards iXH 610", "Edwards Vacuum", 610.0),
+    ("Ebara EV-S 100", "Ebara", 1000.0),
+)
+CRITICALITY_LEVELS = ("Level1", "Level2", "Level3", "Level4", "Level5")
+
+CONCEPT_SUBJECTS = (
+    "vacuum pump", "dry pump", "rotor bearing", "exhaust line", "process chamber",
+    "foreline", "motor drive", "cooling system", "seal assembly", "pressure gauge",
+)
+CONCEPT_CONDITIONS = (
+    "degradation", "vibration anomaly", "thermal stress", "power drift", "wear",
+    "contamination", "pressure instability", "failure risk", "maintenance strategy",
+    "performance loss",
+)
+CONCEPT_DOMAINS = (
+    "Manufacturing Equipment", "Manufacturing Operations", "Maintenance Management",
+    "Reliability Engineering",
+)
+
+BASE_TIME = datetime(2025, 7, 21, 11, 15, tzinfo=timezone.utc)
+
+
+def concept_text(subject, condition, i):
+    label = f"{subject.title()} {condition.title()} {i}"
+    definition = (f"Condition of the {subject} showing {condition} that affects vacuum "
+                  f"performance and process availability in semiconductor tools")
+    return label, definition
+
+
+def query_texts(count, seed=11):
+    """Natural-language benchmark queries drawn from the concept vocabulary"""
+    rng = np.random.default_rng(seed)
+    return [
+        f"{CONCEPT_SUBJECTS[rng.integers(len(CONCEPT_SUBJECTS))]} "
+        f"{CONCEPT_CONDITIONS[rng.integers(len(CONCEPT_CONDITIONS))]} in process tools"
+        for _ in range(count)
+    ]
+
+
+def generate_fleet(pumps, seed=7):
+    """
+    Build a synthetic fleet of `pumps` DryPumps and its surrounding hierarchy.
+
+    Returns:
+        Dict with "entities" (keyword arguments for BulkGraphWriter.load),
+        "concepts" (SemanticConcept dicts with embedding text) and
+        "pump_concepts" (pumpIdentifier → conceptId)
+    """
+    rng = np.random.default_rng(seed)
+    chambers = -(-pumps // PUMPS_PER_CHAMBER)
+    tools = -(-chambers // CHAMBERS_PER_TOOL)
+    areas = -(-tools // TOOLS_PER_AREA)
+    fabs = -(-areas // AREAS_PER_FAB)
+    concepts = max(1, -(-pumps // PUMPS_PER_CONCEPT))
+
+    fab_rows = [{
+        "fabId": f"FAB{f + 1}",
+        "fabLocation": "Dresden, Germany",
+        "fabCapacity": 75000,
+        "operationalStatus": "ACTIVE",
+        "syntheticFleet": True,
+    } for f in range(fabs)]
+
+    area_rows = [{
+        "areaId": f"{AREA_TYPES[a % len(AREA_TYPES)]}_{a:04d}",
+        "fabId": fab_rows[a // AREAS_PER_FAB]["fabId"],
+        "cleanClass": "ISO4",
+        "syntheticFleet": True,
+    } for a in range(areas)]
+
+    tool_rows = [{
+        "toolId": f"{TOOL_TYPES[t % len(TOOL_TYPES)].upper()}_{t:05d}",
+        "areaId": area_rows[t // TOOLS_PER_AREA]["areaId"],
+        "toolType": TOOL_TYPES[t % len(TOOL_TYPES)],
+        "toolState": "PRODUCTIVE",
+        "utilization": round(float(rng.uniform(0.6, 0.95)), 3),
+        "syntheticFleet": True,
+    } for t in range(tools)]
+
+    chamber_rows = [{
+        "chamberId": f"CH{c:06d}",
+        "toolId": tool_rows[c // CHAMBERS_PER_TOOL]["toolId"],
+        "chamberType": "Process",
+        "processEnvironment": "Vacuum",
+        "processingState": "READY",
+        "syntheticFleet": True,
+    } for c in range(chambers)]
+
+    # P002: ρ = 1.68, β = 612.35, age = 285 days, RUL = 142 days, health 0.28
+    shape = np.clip(rng.normal(1.68, 0.25, pumps), 0.8, None)
+    scale = np.clip(rng.normal(612.35, 120.0, pumps), 150.0, None)
+    age = rng.uniform(0, 900, pumps).round()
+    rul = np.clip(rng.normal(142.0, 60.0, pumps), 1.0, None).round(1)
+    health = rng.uniform(0.05, 0.95, pumps).round(3)
+    quality = rng.uniform(0.7, 1.0, pumps).round(3)
+    models = rng.integers(len(PUMP_MODELS), size=pumps)
+    criticality = rng.integers(len(CRITICALITY_LEVELS), size=pumps)
+    telemetry_offsets = rng.integers(0, 6 * 3600, size=pumps)
+
+    pump_rows, weibull_rows, rul_rows = [], [], []
+    pump_concepts = {}
+    for i in range(pumps):
+        pump_id = f"P{i + 1:06d}"
+        model, manufacturer, speed = PUMP_MODELS[models[i]]
+        pump_rows.append({
+            "pumpIdentifier": pump_id,
+            "chamberId": chamber_rows[i // PUMPS_PER_CHAMBER]["chamberId"],
+            "pumpModel": model,
+            "manufacturer": manufacturer,
+            "currentAge": float(age[i]),
+            "criticalityLevel": CRITICALITY_LEVELS[criticality[i]],
+            "serviceRole": "Primary" if i % PUMPS_PER_CHAMBER == 0 else "Backup",
+            "isOperational": True,
+            "pumpingSpeed": speed,
+            "syntheticFleet": True,
+        })
+        weibull_rows.append({
+            "modelId": f"WEIBULL_{pump_id}_v2.1",
+            "pumpIdentifier": pump_id,
+            "weibullShape": round(float(shape[i]), 4),
+            "weibullScale": round(float(scale[i]), 2),
+            "weibullLocation": 0.0,
+            "parameterConfidence": 0.91,
+            "modelFitDate": BASE_TIME - timedelta(days=151),
+            "modelVersion": "v2.1",
+            "fittingMethod": "MaximumLikelihood",
+            "syntheticFleet": True,
+        })
+        rul_rows.append({
+            "rulId": f"RUL_{pump_id}_20250721",
+            "pumpIdentifier": pump_id,
+            "remainingUsefulLife": float(rul[i]),
+            "healthIndex": float(health[i]),
+            "dataQualityScore": float(quality[i]),
+            "lastTelemetryUpdate": BASE_TIME - timedelta(seconds=int(telemetry_offsets[i])),
+            "assessmentMethod": "TelemetryBased",
+            "syntheticFleet": True,
+        })
+        pump_concepts[pump_id] = f"SYN_CONCEPT_{i % concepts:06d}"
+
+    concept_rows = []
+    for c in range(concepts):
+        subject = CONCEPT_SUBJECTS[c % len(CONCEPT_SUBJECTS)]
+        condition = CONCEPT_CONDITIONS[(c // len(CONCEPT_SUBJECTS)) % len(CONCEPT_CONDITIONS)]
+        label, definition = concept_text(subject, condition, c)
+        concept_rows.append({
+            "conceptId": f"SYN_CONCEPT_{c:06d}",
+            "label": label,
+            "definition": definition,
+            "domain": CONCEPT_DOMAINS[c % len(CONCEPT_DOMAINS)],
+            "text": f"{label}. {definition}",
+            "syntheticFleet": True,
+        })
+
+    return {
+        "entities": {
+            "fabs": fab_rows,
+            "areas": area_rows,
+            "tools": tool_rows,
+            "chambers": chamber_rows,
+            "pumps": pump_rows,
+            "weibull_models": weibull_rows,
+            "rul_assessments": rul_rows,
+        },
+        "concepts": concept_rows,
+        "pump_concepts": pump_concepts,
+    }
+
+
+def fleet_arrays(fleet, blending_weight=0.3):
+    """Hazard inputs in the array layout returned by FleetHazardEngine.load_fleet()"""
+    entities = fleet["entities"]
+    pumps = entities["pumps"]
+    return {
+        "pump_id": np.array([p["pumpIdentifier"] for p in pumps], dtype=object),
+        "model_id": np.array([w["modelId"] for w in entities["weibull_models"]], dtype=object),
+        "rul_id": np.array([r["rulId"] for r in entities["rul_assessments"]], dtype=object),
+        "current_age": np.array([p["currentAge"] for p in pumps], dtype=np.float64),
+        "weibull_shape": np.array(
+            [w["weibullShape"] for w in entities["weibull_models"]], dtype=np.float64
+        ),
+        "weibull_scale": np.array(
+            [w["weibullScale"] for w in entities["weibull_models"]], dtype=np.float64
+        ),
+        "remaining_useful_life": np.array(
+            [r["remainingUsefulLife"] for r in entities["rul_assessments"]], dtype=np.float64
+        ),
+        "blending_weight": np.full(len(pumps), blending_weight, dtype=np.float64),
+    }
@@ -0,0 +1,451 @@
+"""
+telemetry_ingest.py
+Streaming telemetry ingestion with incremental RUL / hazard updates
+
+An asyncio consumer reads condition-monitoring readings (one JSON object per
+line) from a file, a TCP socket or any producer feeding an asyncio.Queue:
+
+    {"pump_id": "P002", "timestamp": "2025-07-20T09:45:00Z",
+     "remaining_useful_life": 142.0, "health_index": 0.72, "data_quality_score": 0.95}
+
+Readings are micro-batched: within each flush interval only the latest reading
+per pump is kept. Pumps whose RUL moved by more than `rul_tolerance` days get
+λ_R, H_30 and P_30 recomputed with the vectorized fleet_hazard math (Weibull
+inputs are cached in memory from one FleetHazardEngine.load_fleet() call) and
+are written as a RemainingUsefulLife node (telemetry_update_idx) plus the
+BlendedHazardFunction / ThirtyDayFailureProbability pair. Pumps whose RUL did
+not change are not touched.
+
+Backpressure: the reading queue and the write queue are both bounded. A single
+writer task applies batches in order; when Neo4j falls behind the write queue
+fills, the consumer stops draining readings and producers block on put().
+
+USAGE:
+    ingestor = TelemetryIngestor(driver)
+    await ingestor.run_file("telemetry.jsonl")
+    await ingestor.run_socket(port=9099)           # newline-delimited JSON over TCP
+
+SETUP:
+1. Create .env file with NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD
+2. Install: pip install -r requirements.txt
+3. Run: python telemetry_ingest.py --file telemetry.jsonl
+        python telemetry_ingest.py --port 9099
+        python telemetry_ingest.py --synthetic 500000 --pumps 10000   # no database
+
+--rollups also refreshes the risk rollups and top-K leaderboard of every
+changed pump (see risk_rollups.py).
+"""
+
+import asyncio
+from datetime import datetime, timezone
+import json
+import math
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from bulk_graph_writer import BulkGraphWriter
+from fleet_hazard import FleetHazardEngine, compute_fleet_hazard
+from synthetic_fleet import fleet_arrays, generate_fleet
+
+ASSESSMENT_METHOD = "StreamingTelemetry_v1.0"
+_STOP = object()
+
+
+def _optional_number(value):
+    if value is None:
+        return None
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"not a finite number: {value!r}")
+    return number
+
+
+def parse_reading(line):
+    """Parse one JSON telemetry line; returns None for blank or malformed lines"""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        reading = json.loads(line)
+        pump_id = reading["pump_id"]
+        remaining_useful_life = float(reading["remaining_useful_life"])
+        if not isinstance(pump_id, str) or not remaining_useful_life >= 0 \
+                or not math.isfinite(remaining_useful_life):
+            return None
+        return {
+            "pump_id": pump_id,
+            # Normalized to UTC ISO-8601 so readings order correctly within a batch
+            "timestamp": parse_timestamp(reading["timestamp"]).isoformat(),
+            "remaining_useful_life": remaining_useful_life,
+            "health_index": _optional_number(reading.get("health_index")),
+            "data_quality_score": _optional_number(reading.get("data_quality_score")),
+        }
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def parse_timestamp(value):
+    """ISO-8601 timestamp as an aware UTC datetime (naive values are taken as UTC)"""
+    timestamp = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc)
+
+
+class TelemetryIngestor:
+    """Micro-batching telemetry consumer that recomputes P_30 only for changed pumps"""
+
+    def __init__(self, driver, flush_interval=0.5, max_batch=50000, queue_size=100000,
+                 max_pending_batches=2, rul_tolerance=0.5, chunk_size=1000,
+                 write=True, history=None, rollups=None, database=None):
+        self.driver = driver
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.rul_tolerance = rul_tolerance
+        self.write = write
+        self.database = database
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self._write_queue = asyncio.Queue(maxsize=max_pending_batches)
+        self.engine = FleetHazardEngine(driver, chunk_size=chunk_size, history=history,
+                                        rollups=rollups, database=database)
+        self.writer = BulkGraphWriter(driver, chunk_size=chunk_size, database=database)
+        self.fleet = None
+        self._index = {}
+        self.stats = {
+            "readings": 0,
+            "malformed": 0,
+            "unknown_pumps": 0,
+            "batches": 0,
+            "failed_batches": 0,
+            "pumps_changed": 0,
+            "pumps_unchanged": 0,
+            "write_batches": 0,
+            "failed_writes": 0,
+            "write_seconds": 0.0,
+            "nodes_created": 0,
+            "elapsed_seconds": 0.0,
+            "readings_per_second": 0.0,
+        }
+
+    def load_state(self, fleet=None):
+        """Cache Weibull inputs, blending weights and last known RUL for every pump"""
+        self.fleet = fleet if fleet is not None else self.engine.load_fleet()
+        self._index = {pump_id: i for i, pump_id in enumerate(self.fleet["pump_id"])}
+        print(f"   ✅ Cached hazard inputs for {len(self._index)} pumps")
+
+    # ------------------------------------------------------------------
+    # Producers
+    # ------------------------------------------------------------------
+
+    async def put_line(self, line):
+        reading = parse_reading(line)
+        if reading is None:
+            self.stats["malformed"] += 1
+            return
+        # Blocks when the consumer is behind - this is the backpressure point
+        await self.queue.put(reading)
+
+    async def produce_file(self, path, follow=False, poll_interval=0.2):
+        """Feed readings from a JSONL file (optionally tailing it like `tail -f`)"""
+        with open(path) as f:
+            while True:
+                line = f.readline()
+                if line:
+                    await self.put_line(line)
+                elif follow:
+                    await asyncio.sleep(poll_interval)
+                else:
+                    return
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            # The reader is not drained while put() blocks, so TCP flow control
+            # pushes backpressure all the way to the sender
+            async for line in reader:
+                await self.put_line(line.decode())
+        finally:
+            writer.close()
+
+    # ------------------------------------------------------------------
+    # Consumer
+    # ------------------------------------------------------------------
+
+    async def _next_batch(self):
+        """Collect readings until flush_interval passes or max_batch is reached"""
+        latest = {}
+        count = 0
+        stop = False
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+
+        while count < self.max_batch:
+            if self.queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    reading = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                reading = self.queue.get_nowait()
+
+            if reading is _STOP:
+                stop = True
+                break
+            count += 1
+            # Keep only the newest reading per pump within the micro-batch
+            previous = latest.get(reading["pump_id"])
+            if previous is None or reading["timestamp"] >= previous["timestamp"]:
+                latest[reading["pump_id"]] = reading
+
+        return latest, count, stop
+
+    def changed_pumps(self, latest):
+        """Fleet indexes and readings of pumps whose RUL moved beyond the tolerance"""
+        indexes, readings = [], []
+        for pump_id, reading in latest.items():
+            i = self._index.get(pump_id)
+            if i is None:
+                self.stats["unknown_pumps"] += 1
+                continue
+            indexes.append(i)
+            readings.append(reading)
+        if not indexes:
+            return np.array([], dtype=np.int64), []
+
+        indexes = np.array(indexes, dtype=np.int64)
+        new_rul = np.array([r["remaining_useful_life"] for r in readings], dtype=np.float64)
+        changed = np.abs(new_rul - self.fleet["remaining_useful_life"][indexes]) > self.rul_tolerance
+        self.stats["pumps_unchanged"] += int((~changed).sum())
+        return indexes[changed], [r for r, c in zip(readings, changed) if c]
+
+    def recompute(self, indexes, readings, timestamp):
+        """Recompute λ_R / H_30 / P_30 for the changed pumps and build write rows"""
+        stamp = timestamp.strftime("%Y%m%d%H%M")
+        subset = {name: values[indexes] for name, values in self.fleet.items()}
+        subset["remaining_useful_life"] = np.array(
+            [r["remaining_useful_life"] for r in readings], dtype=np.float64
+        )
+        subset["rul_id"] = np.array([f"RUL_{r['pump_id']}_{stamp}" for r in readings], dtype=object)
+
+        results = compute_fleet_hazard(
+            subset["weibull_shape"], subset["weibull_scale"], subset["current_age"],
+            subset["remaining_useful_life"], subset["blending_weight"],
+            horizon=self.engine.horizon_days,
+        )
+        assessments = []
+        for reading, rul_id in zip(readings, subset["rul_id"]):
+            assessment = {
+                "rulId": rul_id,
+                "pumpIdentifier": reading["pump_id"],
+                "remainingUsefulLife": reading["remaining_useful_life"],
+                "lastTelemetryUpdate": parse_timestamp(reading["timestamp"]),
+                "assessmentMethod": ASSESSMENT_METHOD,
+            }
+            if reading["health_index"] is not None:
+                assessment["healthIndex"] = float(reading["health_index"])
+            if reading["data_quality_score"] is not None:
+                assessment["dataQualityScore"] = float(reading["data_quality_score"])
+            assessments.append(assessment)
+
+        predictions = self.engine.prediction_rows(subset, results, timestamp)
+        return subset, assessments, predictions
+
+    def _apply(self, indexes, subset, assessments, predictions):
+        """Blocking Neo4j write of one recomputed batch (runs in a worker thread)"""
+        if self.write:
+            rul_totals = self.writer.write_rul_assessments(assessments)
+            prediction_totals = self.writer.write(self.engine.WRITE_PREDICTIONS_QUERY, predictions)
+            if self.engine.history is not None:
+                self.engine.history.record(predictions)
+            if self.engine.rollups is not None:
+                self.engine.rollups.update(predictions)
+            self.stats["nodes_created"] += (
+                rul_totals["nodes_created"] + prediction_totals["nodes_created"]
+            )
+        # Only advance the cached RUL once the batch is durable
+        self.fleet["remaining_useful_life"][indexes] = subset["remaining_useful_life"]
+        self.fleet["rul_id"][indexes] = subset["rul_id"]
+
+    async def _writer_loop(self):
+        while True:
+            item = await self._write_queue.get()
+            if item is _STOP:
+                return
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._apply, *item)
+                self.stats["write_batches"] += 1
+            except Exception as e:
+                self.stats["failed_writes"] += 1
+                print(f"   ❌ ERROR writing telemetry batch of {len(item[0])} pumps: {e}")
+            self.stats["write_seconds"] += time.perf_counter() - started
+
+    async def consume(self):
+        """Drain the reading queue until a stop marker arrives"""
+        if self.fleet is None:
+            self.load_state()
+
+        writer_task = asyncio.create_task(self._writer_loop())
+        started = time.perf_counter()
+        try:
+            stop = False
+            while not stop:
+                latest, count, stop = await self._next_batch()
+                if not count:
+                    continue
+                self.stats["readings"] += count
+                self.stats["batches"] += 1
+
+                indexes, readings = self.changed_pumps(latest)
+                if len(indexes):
+                    try:
+                        batch = self.recompute(indexes, readings, datetime.now(timezone.utc))
+                    except Exception as e:
+                        # Skip the batch rather than killing the consumer (producers would block)
+                        self.stats["failed_batches"] += 1
+                        print(f"   ❌ ERROR recomputing telemetry batch of {len(indexes)} pumps: {e}")
+                        continue
+                    self.stats["pumps_changed"] += len(indexes)
+                    # Blocks while max_pending_batches writes are queued
+                    await self._write_queue.put((indexes, *batch))
+        finally:
+            await self._write_queue.put(_STOP)
+            await writer_task
+            elapsed = time.perf_counter() - started
+            self.stats["elapsed_seconds"] = elapsed
+            self.stats["readings_per_second"] = self.stats["readings"] / elapsed if elapsed else 0.0
+
+    async def stop(self):
+        await self.queue.put(_STOP)
+
+    # ------------------------------------------------------------------
+    # Entry points
+    # ------------------------------------------------------------------
+
+    async def run_file(self, path, follow=False):
+        """Ingest a JSONL file; with follow=True keep tailing until cancelled"""
+        consumer = asyncio.create_task(self.consume())
+        try:
+            await self.produce_file(path, follow=follow)
+        finally:
+            await self.stop()
+            await consumer
+        return self.stats
+
+    async def run_socket(self, host="127.0.0.1", port=9099):
+        """Accept newline-delimited JSON readings over TCP until cancelled"""
+        consumer = asyncio.create_task(self.consume())
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        print(f"   📡 Listening for telemetry on {host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.stop()
+            await consumer
+        return self.stats
+
+    def report(self):
+        s = self.stats
+        print("\n📊 Telemetry ingestion summary:")
+        print(f"   Readings: {s['readings']} ({s['malformed']} malformed, "
+              f"{s['unknown_pumps']} from unknown pumps)")
+        print(f"   Micro-batches: {s['batches']} ({s['failed_batches']} failed), "
+              f"write batches: {s['write_batches']} ({s['failed_writes']} failed)")
+        print(f"   Pumps recomputed: {s['pumps_changed']}, unchanged: {s['pumps_unchanged']}")
+        print(f"   Nodes created: {s['nodes_created']}")
+        print(f"   Throughput: {s['readings_per_second']:.0f} readings/sec "
+              f"over {s['elapsed_seconds']:.2f}s (write time {s['write_seconds']:.2f}s)")
+
+
+async def produce_synthetic(ingestor, readings, pumps):
+    """Random-walk RUL readings for a synthetic fleet, as fast as the queue accepts them"""
+    rul = dict(zip(ingestor.fleet["pump_id"], ingestor.fleet["remaining_useful_life"]))
+    pump_ids = list(rul)
+    timestamp = datetime.now(timezone.utc).isoformat()
+    for n in range(readings):
+        pump_id = pump_ids[random.randrange(pumps)]
+        rul[pump_id] = max(0.0, rul[pump_id] + random.uniform(-1.0, 0.2))
+        await ingestor.queue.put({
+            "pump_id": pump_id,
+            "timestamp": timestamp,
+            "remaining_useful_life": rul[pump_id],
+            "health_index": None,
+            "data_quality_score": None,
+        })
+    await ingestor.stop()
+
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+if __name__ == "__main__":
+    dry_run = "--dry-run" in sys.argv
+
+    def argument(flag, default=None):
+        return sys.argv[sys.argv.index(flag) + 1] if flag in sys.argv else default
+
+    if "--synthetic" in sys.argv:
+        readings = int(argument("--synthetic"))
+        pumps = int(argument("--pumps", 10000))
+        print(f"\n🧪 Synthetic ingestion: {readings} readings across {pumps} pumps (no database)")
+
+        async def main():
+            ingestor = TelemetryIngestor(None, write=False)
+            ingestor.load_state(fleet_arrays(generate_fleet(pumps)))
+            consumer = asyncio.create_task(ingestor.consume())
+            await produce_synthetic(ingestor, readings, pumps)
+            await consumer
+            ingestor.report()
+
+        asyncio.run(main())
+        sys.exit(0)
+
+    from dotenv import load_dotenv
+    from neo4j import GraphDatabase
+
+    load_dotenv()
+
+    password = os.getenv("NEO4J_PASSWORD")
+    if not password:
+        print("❌ ERROR: NEO4J_PASSWORD is not set - create a .env file first")
+        sys.exit(1)
+
+    driver = GraphDatabase.driver(
+        os.getenv("NEO4J_URI", "neo4j://localhost:7687"),
+        auth=(os.getenv("NEO4J_USERNAME", "neo4j"), password),
+    )
+
+    rollups = None
+    if "--rollups" in sys.argv:
+        from risk_rollups import FleetRiskRollups
+        rollups = FleetRiskRollups(driver)
+        rollups.ensure_schema()
+
+    async def main():
+        ingestor = TelemetryIngestor(driver, write=not dry_run, rollups=rollups)
+        print("\n📡 Starting telemetry ingestion...")
+        ingestor.load_state()
+        try:
+            if "--file" in sys.argv:
+                await ingestor.run_file(argument("--file"), follow="--follow" in sys.argv)
+            else:
+                await ingestor.run_socket(port=int(argument("--port", 9099)))
+        finally:
+            ingestor.report()
+            if rollups is not None:
+                rollups.report()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        driver.close()
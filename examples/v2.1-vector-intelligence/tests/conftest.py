@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The example modules are flat files in the directory above
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,89 @@
+"""LocalVectorIndex recall, tombstones and compaction"""
+
+import numpy as np
+import pytest
+
+from ann_index import LocalVectorIndex
+
+DIMENSIONS = 16
+ROWS = 1200
+IVF_THRESHOLD = 200
+
+
+def clustered_vectors(count, seed=0, clusters=24):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, DIMENSIONS))
+    labels = rng.integers(clusters, size=count)
+    return (centers[labels] + 0.3 * rng.normal(size=(count, DIMENSIONS))).astype(np.float32)
+
+
+def rows_for(vectors, prefix="c"):
+    return [
+        {"concept_id": f"{prefix}{i}", "label": f"concept {i}", "domain": "test",
+         "source": "stub", "text_hash": f"h{i}", "embedding": vector.tolist()}
+        for i, vector in enumerate(vectors)
+    ]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = LocalVectorIndex(str(tmp_path / "ann"), n_probe=4, ivf_threshold=IVF_THRESHOLD)
+    index.upsert(rows_for(clustered_vectors(ROWS)))
+    index.train()
+    return index
+
+
+def test_ivf_recall_against_brute_force(index):
+    assert index.centroids is not None
+    queries = clustered_vectors(50, seed=1)
+
+    assert index.recall_at_k(queries, k=10) >= 0.8
+    # Probing every partition is an exhaustive scan
+    assert index.recall_at_k(queries, k=10, n_probe=len(index.centroids)) == 1.0
+
+
+def test_replaced_and_deleted_rows_are_tombstoned(index):
+    target = np.ones(DIMENSIONS, dtype=np.float32)
+    index.upsert([{"concept_id": "c0", "label": "moved", "embedding": target.tolist()}])
+    index.delete(["c1"])
+
+    assert len(index) == ROWS - 1
+    assert index.alive.sum() == ROWS - 1
+    hits = index.brute_force(target, k=ROWS)
+    ids = [hit["concept_id"] for hit in hits]
+    assert "c1" not in ids
+    assert ids.count("c0") == 1
+    assert hits[0]["concept_id"] == "c0" and hits[0]["label"] == "moved"
+
+
+def test_duplicate_concept_id_in_one_batch_keeps_last_row(index):
+    first, last = np.eye(DIMENSIONS, dtype=np.float32)[:2]
+    index.upsert([
+        {"concept_id": "dup", "label": "first", "embedding": first.tolist()},
+        {"concept_id": "dup", "label": "last", "embedding": last.tolist()},
+    ])
+
+    assert len(index) == ROWS + 1
+    assert index.alive.sum() == ROWS + 1
+    ids = [hit["concept_id"] for hit in index.brute_force(first, k=ROWS + 2)]
+    assert ids.count("dup") == 1
+    assert index.metadata[index.row_of["dup"]]["label"] == "last"
+
+
+def test_compaction_drops_tombstones_and_reloads(index):
+    index.delete([f"c{i}" for i in range(0, ROWS, 2)])
+    index.compact()
+
+    assert len(index.metadata) == len(index) == ROWS // 2
+    assert index.alive.all()
+    assert all(index.metadata[row]["concept_id"] == cid for cid, row in index.row_of.items())
+    original = clustered_vectors(ROWS)[1]
+    np.testing.assert_allclose(index.matrix[index.row_of["c1"]],
+                               original / np.linalg.norm(original), rtol=1e-5)
+
+    index._save()
+    reloaded = LocalVectorIndex(index.directory, ivf_threshold=IVF_THRESHOLD)
+    assert reloaded.row_of == index.row_of
+    assert reloaded.matrix.shape == (ROWS // 2, DIMENSIONS)
+    query = clustered_vectors(1, seed=2)[0]
+    assert reloaded.brute_force(query, k=5) == index.brute_force(query, k=5)
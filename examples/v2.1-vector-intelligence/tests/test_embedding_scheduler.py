@@ -0,0 +1,83 @@
+"""EmbeddingScheduler against the local stub embedding server"""
+
+import numpy as np
+import pytest
+
+from embedding_cache import EmbeddingCache
+from embedding_scheduler import EmbeddingScheduler
+from stub_embedding_server import FakeEmbeddings, HttpEmbeddingClient, StubEmbeddingServer
+
+DIMENSIONS = 16
+TEXTS = [f"dry pump {i} vacuum degradation" for i in range(10)]
+
+
+@pytest.fixture
+def server():
+    with StubEmbeddingServer(dimensions=DIMENSIONS) as stub:
+        yield stub
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), model="stub")
+    yield cache
+    cache.close()
+
+
+def scheduler(embed_documents, cache=None, **options):
+    options = {"batch_size": 2, "max_concurrency": 1, "backoff_base": 0.01, **options}
+    return EmbeddingScheduler(embed_documents, cache=cache, **options)
+
+
+def test_retries_injected_429s(server):
+    server.fail_every = 3
+    client = HttpEmbeddingClient(server.url)
+
+    runner = scheduler(client.embed_documents, max_concurrency=2)
+    vectors = runner.embed(TEXTS)
+
+    assert runner.stats["retries"] > 0
+    assert runner.stats["failed_batches"] == 0
+    assert runner.stats["embedded"] == len(TEXTS)
+    expected = FakeEmbeddings(DIMENSIONS).embed_documents(TEXTS)
+    np.testing.assert_allclose(vectors, expected, rtol=1e-6)
+
+
+def test_failed_batch_is_resumed_from_checkpoint(server, cache):
+    client = HttpEmbeddingClient(server.url)
+    poisoned = TEXTS[6]
+
+    def flaky(texts):
+        if poisoned in texts:
+            raise ConnectionError("connection reset")
+        return client.embed_documents(texts)
+
+    first = scheduler(flaky, cache, max_retries=0)
+    with pytest.raises(RuntimeError, match="1 of 5 embedding batches failed"):
+        first.embed(TEXTS)
+    # Every completed batch was written to the cache with put_many
+    assert len(cache) == len(TEXTS) - 2
+
+    requests = server.requests
+    second = scheduler(client.embed_documents, cache)
+    vectors = second.embed(TEXTS)
+
+    assert second.stats["cached"] == len(TEXTS) - 2
+    assert second.stats["embedded"] == 2
+    assert server.requests == requests + 1
+    assert all(vector is not None for vector in vectors)
+
+
+def test_rerun_is_served_from_cache(server, cache):
+    client = HttpEmbeddingClient(server.url)
+    first = scheduler(client.embed_documents, cache).embed(TEXTS)
+    requests = server.requests
+
+    runner = scheduler(client.embed_documents, cache)
+    second = runner.embed(TEXTS + TEXTS[:3])
+
+    assert server.requests == requests
+    assert runner.stats["cached"] == len(TEXTS)
+    assert runner.stats["embedded"] == 0
+    assert runner.stats["texts_per_second"] == 0
+    np.testing.assert_allclose(second[:len(TEXTS)], first, rtol=1e-6)
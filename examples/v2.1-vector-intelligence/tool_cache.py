@@ -0,0 +1,271 @@
+"""
+tool_cache.py
+Two-level cache for the GraphRAG agent tools
+
+Level 1 - CachedQueryEmbeddings: LRU of normalized query text → embedding,
+wrapping any LangChain Embeddings object, so repeated questions such as
+"vacuum pump equipment failure" are embedded once.
+
+Level 2 - ToolResultCache: (tool name, normalized query) → tool result with a
+TTL. Each entry remembers the pump identifiers it mentions; when a pump's
+ThirtyDayFailureProbability nodes change, its entries (and any fleet-wide
+entries that mention no pump at all) are invalidated. PredictionChangeWatcher
+polls predictionTimestamp (prediction_timestamp_idx) to detect those changes;
+it re-reads the watermark timestamp itself (>=) and skips the predictionIds it
+already saw there, so predictions stamped in the same second as the last poll
+are not missed.
+
+Both levels expose hit/miss counters via stats() for sizing.
+
+USAGE:
+    embeddings = CachedQueryEmbeddings(OpenAIEmbeddings(), maxsize=1024)
+    result_cache = ToolResultCache(ttl_seconds=300)
+    watcher = PredictionChangeWatcher(driver, result_cache, poll_interval=30)
+    tools = cache_tools(create_enhanced_neo4j_tools(), result_cache, watcher)
+"""
+
+from collections import OrderedDict
+import re
+import threading
+import time
+
+PUMP_ID_PATTERN = re.compile(r"\bP\d{2,}\b", re.IGNORECASE)
+
+
+def normalize_query(text):
+    """Case-fold, collapse whitespace and drop trailing punctuation"""
+    return re.sub(r"\s+", " ", str(text)).strip().rstrip("?!.").strip().lower()
+
+
+def mentioned_pumps(*texts):
+    """Pump identifiers (P002, P1234, ...) mentioned in any of the texts"""
+    pumps = set()
+    for text in texts:
+        pumps.update(match.upper() for match in PUMP_ID_PATTERN.findall(str(text)))
+    return frozenset(pumps)
+
+
+class CachedQueryEmbeddings:
+    """LangChain Embeddings wrapper with an LRU cache on embed_query"""
+
+    def __init__(self, embeddings, maxsize=1024):
+        self.embeddings = embeddings
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # Delegate model name and other attributes to the wrapped embeddings
+        if name == "embeddings":
+            raise AttributeError(name)
+        return getattr(self.embeddings, name)
+
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+            return None
+
+    def _store(self, key, vector):
+        with self._lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def embed_query(self, text):
+        key = normalize_query(text)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self._store(key, vector)
+        return vector
+
+    async def aembed_query(self, text):
+        key = normalize_query(text)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            self._store(key, vector)
+        return vector
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts):
+        return await self.embeddings.aembed_documents(texts)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class ToolResultCache:
+    """TTL cache of tool results, invalidated per pump when predictions change"""
+
+    def __init__(self, ttl_seconds=300, maxsize=2048):
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidated = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, tool_name, query):
+        """Cached result for (tool, query), or None"""
+        key = (tool_name, normalize_query(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, tool_name, query, result):
+        """Store a result, tagging it with the pumps named in the query or result"""
+        key = (tool_name, normalize_query(query))
+        pumps = mentioned_pumps(query, result)
+        with self._lock:
+            self._entries[key] = (result, time.monotonic() + self.ttl_seconds, pumps)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_pumps(self, pump_ids):
+        """Drop entries mentioning any of the pumps, plus fleet-wide entries"""
+        pump_ids = {pump_id.upper() for pump_id in pump_ids}
+        if not pump_ids:
+            return 0
+        with self._lock:
+            stale = [key for key, (_, _, pumps) in self._entries.items()
+                     if not pumps or pumps & pump_ids]
+            for key in stale:
+                del self._entries[key]
+            self.invalidated += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.invalidated += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "expired": self.expired,
+            "invalidated": self.invalidated,
+        }
+
+
+class PredictionChangeWatcher:
+    """Poll for new or updated ThirtyDayFailureProbability nodes and invalidate their pumps"""
+
+    CHANGED_PUMPS_QUERY = """
+    MATCH (p:DryPump)-[:HAS_FAILURE_PREDICTION]->(pred:ThirtyDayFailureProbability)
+    WHERE pred.predictionTimestamp IS NOT NULL
+      AND ($since IS NULL OR pred.predictionTimestamp >= $since)
+    RETURN p.pumpIdentifier AS pump_id, pred.predictionId AS prediction_id,
+           pred.predictionTimestamp AS latest
+    """
+
+    WATERMARK_QUERY = """
+    MATCH (pred:ThirtyDayFailureProbability)
+    WITH max(pred.predictionTimestamp) AS latest
+    OPTIONAL MATCH (pred:ThirtyDayFailureProbability {predictionTimestamp: latest})
+    RETURN latest, collect(pred.predictionId) AS prediction_ids
+    """
+
+    def __init__(self, driver, cache, poll_interval=30.0, database=None):
+        self.driver = driver
+        self.cache = cache
+        self.poll_interval = poll_interval
+        self.database = database
+        self.watermark = None
+        # predictionIds stamped exactly at the watermark, already accounted for
+        self._seen_at_watermark = set()
+        self._initialized = False
+        self._last_poll = 0.0
+        self._lock = threading.Lock()
+
+    def poll(self):
+        """Invalidate cache entries for pumps with predictions newer than the watermark"""
+        with self.driver.session(database=self.database) as session:
+            if not self._initialized:
+                # First poll only establishes the watermark
+                record = session.run(self.WATERMARK_QUERY).single()
+                self.watermark = record["latest"]
+                self._seen_at_watermark = set(record["prediction_ids"])
+                self._initialized = True
+                return set()
+            records = list(session.run(self.CHANGED_PUMPS_QUERY, since=self.watermark))
+
+        new = [record for record in records
+               if not (record["latest"] == self.watermark
+                       and record["prediction_id"] in self._seen_at_watermark)]
+        changed = {record["pump_id"] for record in new if record["pump_id"]}
+        if new:
+            # Every prediction at or after the old watermark was returned, so the ids at
+            # the new watermark are complete
+            self.watermark = max(record["latest"] for record in records)
+            self._seen_at_watermark = {record["prediction_id"] for record in records
+                                       if record["latest"] == self.watermark}
+            self.cache.invalidate_pumps(changed)
+        return changed
+
+    def maybe_poll(self):
+        """Poll at most once per poll_interval; never let a failed poll break a tool call"""
+        now = time.monotonic()
+        if now - self._last_poll < self.poll_interval or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._last_poll = now
+            self.poll()
+        except Exception as e:
+            print(f"⚠️  Prediction change poll failed (cached results kept): {type(e).__name__}: {e}")
+        finally:
+            self._lock.release()
+
+
+def cache_tools(tools, cache, watcher=None, uncached=()):
+    """Wrap each LangChain Tool's func with the result cache (in place) and return the tools"""
+    for tool in tools:
+        if tool.name in uncached:
+            continue
+
+        def cached_func(query, _func=tool.func, _name=tool.name):
+            if watcher is not None:
+                watcher.maybe_poll()
+            result = cache.get(_name, query)
+            if result is None:
+                result = _func(query)
+                # Error strings are returned, not raised, by the agent tools - never cache them
+                if not str(result).startswith("Error"):
+                    cache.put(_name, query, result)
+            return result
+
+        tool.func = cached_func
+    return tools
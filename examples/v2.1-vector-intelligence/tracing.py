@@ -0,0 +1,584 @@
+"""
+tracing.py
+Nested span tracing with Neo4j result-summary capture and sampled PROFILE plans
+
+Records where the time goes in an agent answer or a vectorizer run:
+
+- Tracer.span()        nested spans (contextvars) with timings and attributes
+- TracedDriver         wraps a neo4j Driver; every query becomes a neo4j.query span
+                       with rows, counters and server time (result_available_after
+                       + result_consumed_after). Records stream through unbuffered;
+                       the span ends when the result is exhausted, consumed or its
+                       session/transaction closes. With profile_sample_rate > 0 a
+                       sample of queries runs under PROFILE and the span stores the
+                       plan, total db hits and any label/all-node scans
+- TracedEmbeddings     embed_query / embed_documents spans with token estimates
+- trace_tools()        one span per agent tool call
+- trace_methods()      one span per SemanticVectorizer.step* call
+- llm_callback()       LangChain callback handler: LLM spans with token usage
+
+Finished spans go to a sink. JsonlSpanSink writes one OTLP/JSON
+ExportTraceServiceRequest per line (the OpenTelemetry Collector otlpjsonfile
+format); `python tracing.py traces.jsonl` lists the slowest queries and the
+sampled plans that scanned instead of using an index.
+
+USAGE:
+    tracer = Tracer(JsonlSpanSink("traces.jsonl"), profile_sample_rate=0.05)
+    driver = TracedDriver(GraphDatabase.driver(uri, auth=auth), tracer)
+    tools = trace_tools(create_enhanced_neo4j_tools(), tracer)
+    with tracer.span("agent.search", query=question):
+        graph.invoke(inputs, config={"callbacks": [llm_callback(tracer)]})
+"""
+
+from contextlib import contextmanager
+import contextvars
+import functools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+from embedding_scheduler import estimate_tokens
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+STATUS_OK = 1
+STATUS_ERROR = 2
+MAX_STATEMENT_LENGTH = 4000
+
+# Schema commands cannot run under PROFILE
+UNPROFILABLE_PATTERN = re.compile(
+    r"^\s*(PROFILE|EXPLAIN|SHOW|DROP|CREATE\s+(\w+\s+)?(INDEX|CONSTRAINT)|CALL\s+db\.await)",
+    re.IGNORECASE,
+)
+SCAN_OPERATORS = ("AllNodesScan", "NodeByLabelScan", "DirectedAllRelationshipsScan",
+                  "UndirectedAllRelationshipsScan")
+COUNTER_NAMES = (
+    "nodes_created", "nodes_deleted", "relationships_created", "relationships_deleted",
+    "properties_set", "labels_added", "indexes_added", "constraints_added",
+)
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, str):
+        return {"stringValue": value}
+    return {"stringValue": json.dumps(value, default=str)}
+
+
+def _plain_value(value):
+    kind, raw = next(iter(value.items()))
+    return int(raw) if kind == "intValue" else raw
+
+
+class Span:
+    """One timed operation; ended spans are exported to the tracer's sink"""
+
+    def __init__(self, tracer, name, parent=None, attributes=None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent.span_id if parent else None
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.status = STATUS_OK
+        self.status_message = ""
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self._started = time.perf_counter_ns()
+
+    def set(self, **attributes):
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    def add_event(self, name, **attributes):
+        self.events.append({"name": name, "time_ns": time.time_ns(), "attributes": attributes})
+
+    def record_exception(self, error):
+        self.status = STATUS_ERROR
+        self.status_message = str(error)
+        self.add_event("exception", **{"exception.type": type(error).__name__,
+                                       "exception.message": str(error)})
+
+    @property
+    def duration_ms(self):
+        return None if self.end_ns is None else (self.end_ns - self.start_ns) / 1e6
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = self.start_ns + (time.perf_counter_ns() - self._started)
+            self.tracer.export(self)
+
+    def to_otlp(self):
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in self.attributes.items()],
+            "events": [{
+                "name": e["name"],
+                "timeUnixNano": str(e["time_ns"]),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in e["attributes"].items()],
+            } for e in self.events],
+            "status": {"code": self.status, "message": self.status_message},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        return span
+
+
+class JsonlSpanSink:
+    """Append finished spans as OTLP/JSON lines (one ExportTraceServiceRequest each)"""
+
+    def __init__(self, path="traces.jsonl", service_name="graphrag"):
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def emit(self, span):
+        line = json.dumps({"resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": self.service_name}}
+            ]},
+            "scopeSpans": [{"scope": {"name": "graphrag.tracing"}, "spans": [span.to_otlp()]}],
+        }]})
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Tracer:
+    """Creates nested spans and decides which queries are PROFILEd"""
+
+    def __init__(self, sink=None, profile_sample_rate=0.0):
+        self.sink = sink
+        self.profile_sample_rate = profile_sample_rate
+
+    def start_span(self, name, parent=None, **attributes):
+        return Span(self, name, parent or _current_span.get(), attributes)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def wrap(self, func, name, **attributes):
+        """Decorate `func` so each call runs inside a span"""
+        @functools.wraps(func)
+        def traced(*args, **kwargs):
+            with self.span(name, **attributes):
+                return func(*args, **kwargs)
+        return traced
+
+    def export(self, span):
+        if self.sink is not None:
+            self.sink.emit(span)
+
+    def should_profile(self, statement):
+        return (self.profile_sample_rate > 0
+                and random.random() < self.profile_sample_rate
+                and not UNPROFILABLE_PATTERN.match(statement))
+
+    def run_query(self, runner, query, parameters=None, **kwargs):
+        """Run a query through `runner` (session.run / tx.run) inside a neo4j.query span"""
+        statement = getattr(query, "text", query)
+        profile = self.should_profile(statement)
+        if profile:
+            query = profiled(query)
+
+        span = self.start_span("neo4j.query", **{
+            "db.system": "neo4j",
+            "db.statement": statement[:MAX_STATEMENT_LENGTH],
+            "db.profiled": profile,
+        })
+        try:
+            result = runner(query, parameters, **kwargs)
+        except BaseException as e:
+            span.record_exception(e)
+            span.end()
+            raise
+        # Records stream through; the span ends when the result is consumed or exhausted
+        return TracedResult(result, span)
+
+    def close(self):
+        if self.sink is not None and hasattr(self.sink, "close"):
+            self.sink.close()
+
+
+def profiled(query):
+    """Prefix a query (string or neo4j.Query) with PROFILE"""
+    if isinstance(query, str):
+        return f"PROFILE {query}"
+    from neo4j import Query
+    return Query(f"PROFILE {query.text}", metadata=query.metadata, timeout=query.timeout)
+
+
+def plan_tree(plan):
+    """Compact operator tree from summary.profile"""
+    args = plan.get("args", {})
+    return {
+        "operator": plan.get("operatorType"),
+        "rows": plan.get("rows"),
+        "db_hits": plan.get("dbHits"),
+        "details": args.get("Details"),
+        "children": [plan_tree(child) for child in plan.get("children", [])],
+    }
+
+
+def _walk(tree):
+    yield tree
+    for child in tree["children"]:
+        yield from _walk(child)
+
+
+def record_summary(span, summary, rows):
+    """Copy ResultSummary timings, counters, notifications and profile into span attributes"""
+    counters = summary.counters
+    available = summary.result_available_after or 0
+    consumed = summary.result_consumed_after or 0
+    span.set(**{
+        "db.rows": rows,
+        "db.query_type": summary.query_type,
+        "db.server_time_ms": available + consumed,
+        "db.result_available_after_ms": available,
+        "db.result_consumed_after_ms": consumed,
+    })
+    span.set(**{f"db.counters.{name}": getattr(counters, name)
+                for name in COUNTER_NAMES if getattr(counters, name, 0)})
+
+    notifications = [
+        {"code": n.get("code"), "description": n.get("description")}
+        for n in (summary.notifications or [])
+    ]
+    if notifications:
+        span.set(**{"db.notifications": notifications})
+
+    if summary.profile:
+        tree = plan_tree(summary.profile)
+        operators = list(_walk(tree))
+        scans = [f"{op['operator']}: {op['details']}" for op in operators
+                 if (op["operator"] or "").split("@")[0] in SCAN_OPERATORS]
+        span.set(**{
+            "db.hits": sum(op["db_hits"] or 0 for op in operators),
+            "db.plan": tree,
+            "db.scans": scans or None,
+        })
+
+
+class TracedResult:
+    """
+    Streaming wrapper around a neo4j Result that ends its neo4j.query span lazily
+
+    Nothing is buffered: rows are counted as they are iterated, and the summary is
+    recorded once the result is exhausted or consume()d. data(), single(), value()
+    and values() go through the same iteration; anything else is delegated.
+    """
+
+    def __init__(self, result, span):
+        self._result = result
+        self._span = span
+        self._rows = 0
+        self._summary = None
+
+    def __iter__(self):
+        try:
+            for record in self._result:
+                self._rows += 1
+                yield record
+        except BaseException as e:
+            self._span.record_exception(e)
+            self._span.end()
+            raise
+        self._finish()
+
+    def _finish(self):
+        if self._summary is None:
+            try:
+                self._summary = self._result.consume()
+            except BaseException as e:
+                self._span.record_exception(e)
+                self._span.end()
+                raise
+            record_summary(self._span, self._summary, self._rows)
+            self._span.end()
+        return self._summary
+
+    @property
+    def finished(self):
+        return self._span.end_ns is not None
+
+    def consume(self):
+        return self._finish()
+
+    def data(self, *keys):
+        return [record.data(*keys) for record in self]
+
+    def single(self, strict=False):
+        records = list(self)
+        if not records:
+            if strict:
+                raise ValueError("No records found")
+            return None
+        if strict and len(records) > 1:
+            raise ValueError(f"Expected a single record, found {len(records)}")
+        return records[0]
+
+    def value(self, key=0, default=None):
+        return [record.value(key, default) for record in self]
+
+    def values(self, *keys):
+        return [record.values(*keys) for record in self]
+
+    def __getattr__(self, name):
+        return getattr(self._result, name)
+
+
+def _finish_all(results):
+    """End the spans of results the caller never consumed (the driver discards them too)"""
+    for result in results:
+        if not result.finished:
+            result.consume()
+    results.clear()
+
+
+class TracedTransaction:
+    def __init__(self, tx, tracer):
+        self._tx = tx
+        self._tracer = tracer
+        self._results = []
+
+    def run(self, query, parameters=None, **kwargs):
+        result = self._tracer.run_query(self._tx.run, query, parameters, **kwargs)
+        self._results.append(result)
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._tx, name)
+
+
+class TracedSession:
+    def __init__(self, session, tracer):
+        self._session = session
+        self._tracer = tracer
+        self._results = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        try:
+            _finish_all(self._results)
+        finally:
+            self._session.close()
+
+    def run(self, query, parameters=None, **kwargs):
+        # The driver buffers an open previous result here, so it stays readable; only
+        # results still open when the session closes are ended in close()
+        result = self._tracer.run_query(self._session.run, query, parameters, **kwargs)
+        self._results = [r for r in self._results if not r.finished] + [result]
+        return result
+
+    def _wrap_work(self, work):
+        @functools.wraps(work)
+        def traced_work(tx, *args, **kwargs):
+            traced_tx = TracedTransaction(tx, self._tracer)
+            try:
+                return work(traced_tx, *args, **kwargs)
+            finally:
+                # Managed transaction results are only valid inside the work function
+                _finish_all(traced_tx._results)
+        return traced_work
+
+    def execute_read(self, work, *args, **kwargs):
+        return self._session.execute_read(self._wrap_work(work), *args, **kwargs)
+
+    def execute_write(self, work, *args, **kwargs):
+        return self._session.execute_write(self._wrap_work(work), *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+class TracedDriver:
+    """neo4j Driver wrapper whose sessions trace every query"""
+
+    def __init__(self, driver, tracer):
+        self._driver = driver
+        self.tracer = tracer
+
+    def session(self, **config):
+        return TracedSession(self._driver.session(**config), self.tracer)
+
+    def __getattr__(self, name):
+        if name == "_driver":
+            raise AttributeError(name)
+        return getattr(self._driver, name)
+
+
+class TracedEmbeddings:
+    """Embeddings wrapper emitting embedding spans with token estimates"""
+
+    def __init__(self, embeddings, tracer):
+        self.embeddings = embeddings
+        self.tracer = tracer
+
+    def __getattr__(self, name):
+        if name == "embeddings":
+            raise AttributeError(name)
+        return getattr(self.embeddings, name)
+
+    def embed_query(self, text):
+        with self.tracer.span("embedding.query", **{"embedding.tokens_estimated": estimate_tokens(text)}):
+            return self.embeddings.embed_query(text)
+
+    def embed_documents(self, texts):
+        with self.tracer.span("embedding.documents", **{
+            "embedding.texts": len(texts),
+            "embedding.tokens_estimated": sum(estimate_tokens(t) for t in texts),
+        }):
+            return self.embeddings.embed_documents(texts)
+
+    async def aembed_query(self, text):
+        with self.tracer.span("embedding.query", **{"embedding.tokens_estimated": estimate_tokens(text)}):
+            return await self.embeddings.aembed_query(text)
+
+    async def aembed_documents(self, texts):
+        with self.tracer.span("embedding.documents", **{"embedding.texts": len(texts)}):
+            return await self.embeddings.aembed_documents(texts)
+
+
+def trace_tools(tools, tracer):
+    """Wrap each LangChain Tool's func in a tool.<name> span (in place) and return the tools"""
+    for tool in tools:
+        def traced_func(query, _func=tool.func, _name=tool.name):
+            with tracer.span(f"tool.{_name}", **{"tool.input_chars": len(str(query))}) as span:
+                result = _func(query)
+                span.set(**{"tool.output_chars": len(str(result)),
+                            "tool.error": str(result).startswith("Error")})
+                return result
+
+        tool.func = traced_func
+    return tools
+
+
+def trace_methods(obj, tracer, prefixes=("step",), span_prefix=None):
+    """Replace matching bound methods of `obj` with traced versions"""
+    span_prefix = span_prefix or type(obj).__name__
+    for name in dir(type(obj)):
+        if name.startswith(prefixes) and callable(getattr(obj, name)):
+            setattr(obj, name, tracer.wrap(getattr(obj, name), f"{span_prefix}.{name}"))
+    return obj
+
+
+def llm_callback(tracer):
+    """LangChain callback handler producing llm spans with token usage (imports langchain lazily)"""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class TracingCallbackHandler(BaseCallbackHandler):
+        def __init__(self):
+            self.spans = {}
+
+        def _start(self, run_id, serialized, **attributes):
+            name = (serialized or {}).get("name") or "llm"
+            self.spans[run_id] = tracer.start_span(f"llm.{name}", **attributes)
+
+        def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+            self._start(run_id, serialized, **{"llm.prompt_chars": sum(len(p) for p in prompts)})
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            chars = sum(len(str(m.content)) for batch in messages for m in batch)
+            self._start(run_id, serialized, **{"llm.prompt_chars": chars})
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            span = self.spans.pop(run_id, None)
+            if span is None:
+                return
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            span.set(**{
+                "llm.prompt_tokens": usage.get("prompt_tokens"),
+                "llm.completion_tokens": usage.get("completion_tokens"),
+                "llm.total_tokens": usage.get("total_tokens"),
+                "llm.model": (response.llm_output or {}).get("model_name"),
+            })
+            span.end()
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            span = self.spans.pop(run_id, None)
+            if span is not None:
+                span.record_exception(error)
+                span.end()
+
+    return TracingCallbackHandler()
+
+
+def read_spans(path):
+    """Flatten a JSONL trace file into span dicts with plain attribute values"""
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for resource in json.loads(line)["resourceSpans"]:
+                for scope in resource["scopeSpans"]:
+                    for span in scope["spans"]:
+                        span["attributes"] = {a["key"]: _plain_value(a["value"])
+                                              for a in span["attributes"]}
+                        span["duration_ms"] = (int(span["endTimeUnixNano"])
+                                               - int(span["startTimeUnixNano"])) / 1e6
+                        spans.append(span)
+    return spans
+
+
+def report(path, top=10):
+    """Print the slowest queries and the profiled queries that scanned instead of seeking"""
+    spans = read_spans(path)
+    queries = sorted((s for s in spans if s["name"] == "neo4j.query"),
+                     key=lambda s: s["duration_ms"], reverse=True)
+    print(f"\n🔎 {len(spans)} spans, {len(queries)} Neo4j queries in {path}")
+
+    print(f"\n🐢 Slowest {min(top, len(queries))} queries:")
+    for s in queries[:top]:
+        a = s["attributes"]
+        statement = " ".join(a.get("db.statement", "").split())[:120]
+        print(f"   {s['duration_ms']:>9.1f}ms  server {a.get('db.server_time_ms', '?')}ms  "
+              f"rows {a.get('db.rows', '?')}  {statement}")
+
+    scans = [s for s in queries if s["attributes"].get("db.scans")]
+    print(f"\n📋 Profiled queries with label/all-node scans: {len(scans)}")
+    for s in scans[:top]:
+        a = s["attributes"]
+        statement = " ".join(a.get("db.statement", "").split())[:120]
+        print(f"   db hits {a.get('db.hits')}  {statement}")
+        for scan in json.loads(a["db.scans"]):
+            print(f"      • {scan}")
+
+
+if __name__ == "__main__":
+    report(sys.argv[1] if len(sys.argv) > 1 else "traces.jsonl")
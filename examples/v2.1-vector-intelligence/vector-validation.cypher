@@ -214,8 +214,8 @@ RETURN
   sv.label as concept_label,
   sv.domain as domain,
   substring(sv.text, 0, 150) + "..." as embedding_text_sample,
-  CASE WHEN sv.embedding IS NOT NULL 
-    THEN "✅ Embedded (" + toString(size(sv.embedding)) + " dims)"
+  CASE WHEN sv.embedding IS NOT NULL OR sv.embedding_q IS NOT NULL
+    THEN "✅ Embedded (" + toString(coalesce(sv.embedding_dimensions, size(sv.embedding))) + " dims)"
     ELSE "⏳ Pending" 
   END as embedding_status
 ORDER BY sv.concept_id